@@ -0,0 +1,68 @@
+import json
+import math
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter
+
+from atomic_write import atomic_write_json
+from metrics import get_metrics
+from work_dir import WORK_DIR
+
+LATENCY_HISTORY_FILE = WORK_DIR / "latency_history.json"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class AdaptiveTimeouts:
+    """
+    Per-step timeouts derived from a rolling history of observed latencies.
+
+    Until a step has `min_samples` observations its default timeout is used. After that the timeout is
+    the p99 latency times `margin`, clamped to the bounds given by the caller.
+    """
+
+    def __init__(self, history_file: Path = LATENCY_HISTORY_FILE, window: int = 50, margin: float = 3.0, min_samples: int = 5) -> None:
+        self.history_file = history_file
+        self.window = window
+        self.margin = margin
+        self.min_samples = min_samples
+        self.history: dict[str, list[float]] = self._load()
+
+    def _load(self) -> dict[str, list[float]]:
+        if not self.history_file.exists():
+            return {}
+        try:
+            with self.history_file.open(encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A corrupt history only costs us the learned timeouts, start over
+            return {}
+
+    def save(self) -> None:
+        atomic_write_json(self.history_file, self.history)
+
+    def record(self, step: str, duration_ms: float) -> None:
+        samples = self.history.setdefault(step, [])
+        samples.append(round(duration_ms, 1))
+        del samples[: -self.window]
+        get_metrics().observe("olympos_robot_step_duration_seconds", duration_ms / 1000, {"step": step})
+
+    @contextmanager
+    def measure(self, step: str) -> Iterator[None]:
+        """Record the duration of the block for the step. Failed steps are not recorded, they say nothing about latency."""
+        start = perf_counter()
+        yield
+        self.record(step, (perf_counter() - start) * 1000)
+
+    def timeout(self, step: str, default_ms: float, minimum_ms: float = 0, maximum_ms: float = 60000) -> float:
+        """Timeout in ms for the step."""
+        samples = self.history.get(step, [])
+        if len(samples) < self.min_samples:
+            return default_ms
+        return min(maximum_ms, max(minimum_ms, percentile(samples, 99) * self.margin))
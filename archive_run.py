@@ -0,0 +1,217 @@
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+OUTPUT_DIR = Path("output")
+LOGS_DIR = Path("logs")
+# Run directories copied by the old xcopy script, e.g. logs/20250616_201500_FAIL
+LEGACY_RUN_DIR = re.compile(r"(?P<timestamp>\d{8}_\d{6})_(?P<status>\w+)")
+
+
+class RunArchive:
+    """
+    Archive of robot runs in logs_dir.
+
+    Each file is stored once, gzip compressed and named by the hash of its content, so artifacts that are identical
+    across runs take no extra space. Every run has a manifest listing its files, and index.jsonl has one line per run,
+    so runs can be found without scanning the directory.
+    """
+
+    def __init__(self, logs_dir: Path = LOGS_DIR) -> None:
+        self.logs_dir = logs_dir
+        self.objects_dir = logs_dir / "objects"
+        self.runs_dir = logs_dir / "runs"
+        self.index_file = logs_dir / "index.jsonl"
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.gz"
+
+    def _store(self, file: Path) -> tuple[str, int]:
+        """Store the file content if it is not stored yet. Returns hash and size of the content."""
+        sha = hashlib.sha256()
+        with file.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = object_path.with_suffix(".tmp")
+            with file.open("rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            tmp_path.replace(object_path)
+        return digest, file.stat().st_size
+
+    def read_index(self) -> list[dict]:
+        if not self.index_file.exists():
+            return []
+        with self.index_file.open(encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _write_index(self, runs: list[dict]) -> None:
+        tmp_path = self.index_file.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.writelines(json.dumps(run) + "\n" for run in runs)
+        tmp_path.replace(self.index_file)
+
+    def archive(self, output_dir: Path = OUTPUT_DIR, status: str | None = None, now: datetime | None = None) -> dict:
+        """Archive all files in output_dir as a new run. Returns the index entry of the run."""
+        now = now or datetime.now()
+        if status is None:
+            status_file = output_dir / "status.txt"
+            status = status_file.read_text().strip() if status_file.exists() else "UNKNOWN"
+        run_id = self._unique_run_id(f"{now.strftime('%Y%m%d_%H%M%S')}_{status}")
+
+        files = {}
+        for file in sorted(output_dir.rglob("*")):
+            if file.is_file():
+                digest, size = self._store(file)
+                files[file.relative_to(output_dir).as_posix()] = {"sha256": digest, "size": size}
+
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {"run_id": run_id, "timestamp": now.isoformat(timespec="seconds"), "status": status, "files": files}
+        with (self.runs_dir / f"{run_id}.json").open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        entry = {
+            "run_id": run_id,
+            "timestamp": manifest["timestamp"],
+            "status": status,
+            "files": len(files),
+            "size": sum(file["size"] for file in files.values()),
+        }
+        with self.index_file.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def _unique_run_id(self, run_id: str) -> str:
+        """The run id, with a counter added if a run with the same second and status was archived already."""
+        unique_id, count = run_id, 1
+        while (self.runs_dir / f"{unique_id}.json").exists():
+            count += 1
+            unique_id = f"{run_id}_{count}"
+        return unique_id
+
+    def import_legacy_runs(self) -> list[str]:
+        """Archive the run directories of the old xcopy script as runs, so retention covers them. Returns the new run ids."""
+        if not self.logs_dir.exists():
+            return []
+        imported = []
+        for run_dir in sorted(self.logs_dir.iterdir()):
+            match = LEGACY_RUN_DIR.fullmatch(run_dir.name)
+            if not run_dir.is_dir() or match is None:
+                continue
+            now = datetime.strptime(match["timestamp"], "%Y%m%d_%H%M%S")
+            imported.append(self.archive(run_dir, status=match["status"], now=now)["run_id"])
+            shutil.rmtree(run_dir)
+        if imported:
+            # Retention removes runs from the start of the index, so keep it in time order
+            self._write_index(sorted(self.read_index(), key=lambda run: run["timestamp"]))
+        return imported
+
+    def find(self, status: str | None = None, since: datetime | None = None) -> list[dict]:
+        runs = self.read_index()
+        if status is not None:
+            runs = [run for run in runs if run["status"] == status]
+        if since is not None:
+            runs = [run for run in runs if datetime.fromisoformat(run["timestamp"]) >= since]
+        return runs
+
+    def restore(self, run_id: str, target_dir: Path) -> None:
+        with (self.runs_dir / f"{run_id}.json").open(encoding="utf-8") as f:
+            manifest = json.load(f)
+        for name, file in manifest["files"].items():
+            target = target_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with gzip.open(self._object_path(file["sha256"]), "rb") as src, target.open("wb") as dst:
+                shutil.copyfileobj(src, dst)
+
+    def stored_size(self) -> int:
+        """Bytes on disk used by the stored (compressed) files."""
+        return sum(path.stat().st_size for path in self.objects_dir.rglob("*.gz"))
+
+    def apply_retention(self, max_age_days: float | None = None, max_runs: int | None = None, max_size_mb: float | None = None, now: datetime | None = None) -> list[str]:
+        """Remove the oldest runs until all limits hold, then the files no remaining run refers to. Returns the removed run ids."""
+        now = now or datetime.now()
+        runs = self.read_index()
+        removed = []
+
+        def remove_oldest() -> None:
+            run = runs.pop(0)
+            (self.runs_dir / f"{run['run_id']}.json").unlink(missing_ok=True)
+            removed.append(run["run_id"])
+
+        if max_age_days is not None:
+            while runs and datetime.fromisoformat(runs[0]["timestamp"]) < now - timedelta(days=max_age_days):
+                remove_oldest()
+        if max_runs is not None:
+            while len(runs) > max_runs:
+                remove_oldest()
+        if removed:
+            self._write_index(runs)
+            self._collect_garbage()
+        if max_size_mb is not None:
+            while len(runs) > 1 and self.stored_size() > max_size_mb * 1024 * 1024:
+                remove_oldest()
+                self._write_index(runs)
+                self._collect_garbage()
+        return removed
+
+    def _collect_garbage(self) -> None:
+        referenced = set()
+        for manifest_file in self.runs_dir.glob("*.json"):
+            with manifest_file.open(encoding="utf-8") as f:
+                referenced.update(file["sha256"] for file in json.load(f)["files"].values())
+        for object_path in self.objects_dir.rglob("*.gz"):
+            if object_path.name.removesuffix(".gz") not in referenced:
+                object_path.unlink()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Archive robot runs")
+    parser.add_argument("--logs-dir", type=Path, default=LOGS_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    archive_parser = subparsers.add_parser("archive", help="Archive the output directory and clean it up")
+    archive_parser.add_argument("--output-dir", type=Path, default=OUTPUT_DIR)
+    archive_parser.add_argument("--keep-output", action="store_true", help="Do not remove the output directory after archiving")
+    archive_parser.add_argument("--max-age-days", type=float, default=90)
+    archive_parser.add_argument("--max-runs", type=int)
+    archive_parser.add_argument("--max-size-mb", type=float)
+
+    list_parser = subparsers.add_parser("list", help="List archived runs")
+    list_parser.add_argument("--status", help="e.g. SUCCESS or FAIL")
+    list_parser.add_argument("--since", type=datetime.fromisoformat, help="e.g. 2025-06-01")
+
+    restore_parser = subparsers.add_parser("restore", help="Restore the files of a run")
+    restore_parser.add_argument("run_id")
+    restore_parser.add_argument("target_dir", type=Path)
+
+    args = parser.parse_args(argv)
+    archive = RunArchive(args.logs_dir)
+    if args.command == "archive":
+        if not args.output_dir.exists():
+            print(f"[WARN] Output directory {args.output_dir} not found, nothing to archive.")  # noqa: T201
+            return
+        for run_id in archive.import_legacy_runs():
+            print(f"[INFO] Imported run {run_id} from the old archive layout.")  # noqa: T201
+        entry = archive.archive(args.output_dir)
+        print(f"[INFO] Archived run {entry['run_id']} ({entry['files']} files).")  # noqa: T201
+        for run_id in archive.apply_retention(max_age_days=args.max_age_days, max_runs=args.max_runs, max_size_mb=args.max_size_mb):
+            print(f"[INFO] Removed run {run_id} (retention).")  # noqa: T201
+        if not args.keep_output:
+            shutil.rmtree(args.output_dir)
+    elif args.command == "list":
+        for run in archive.find(status=args.status, since=args.since):
+            print(f"{run['run_id']}\t{run['files']} files\t{run['size']} bytes")  # noqa: T201
+    elif args.command == "restore":
+        archive.restore(args.run_id, args.target_dir)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Replace the file with the text, so that it holds either the old or the new content, even when the process is
+    killed halfway or the machine loses power.
+
+    The text goes to a temporary file next to it, which is flushed to disk and then renamed over the file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        Path(tmp_name).replace(path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    if os.name == "posix":
+        # Persist the rename itself. Windows has no way to fsync a directory, there the rename is journaled by NTFS.
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(path: Path, data: Any, indent: int | None = None) -> None:
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+class WriteCoalescer:
+    """
+    Collects writes of state files and performs them once, on flush or at the end of the with block.
+
+    Only the last write per file is kept, and data is serialized at flush time, so a list that is saved after every
+    change is written once with its final content.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[Path, Callable[[], None]] = {}
+
+    def write_text(self, path: Path, text: str) -> None:
+        self._pending[path] = lambda: atomic_write_text(path, text)
+
+    def write_json(self, path: Path, data: Any, indent: int | None = None) -> None:
+        self._pending[path] = lambda: atomic_write_json(path, data, indent=indent)
+
+    @property
+    def pending(self) -> list[Path]:
+        return list(self._pending)
+
+    def flush(self) -> None:
+        while self._pending:
+            path = next(iter(self._pending))
+            self._pending.pop(path)()
+
+    def __enter__(self) -> "WriteCoalescer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Also after an exception, the state collected so far is what the next run needs
+        self.flush()
@@ -0,0 +1,172 @@
+import json
+import os
+import statistics
+import sys
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import psutil
+from playwright.sync_api import BrowserContext
+
+# Lean launch options are on unless OLYMPOS_LEAN_BROWSER=0
+LEAN_BROWSER = os.environ.get("OLYMPOS_LEAN_BROWSER", "1") != "0"
+# Unset decides like robocorp: a visible browser, unless there is no display
+HEADLESS = {"1": True, "0": False}.get(os.environ.get("OLYMPOS_HEADLESS", ""))
+# Replace the browser context after this many registrations or when the browser uses more memory, 0 means never
+CONTEXT_MAX_JOBS = int(os.environ.get("OLYMPOS_CONTEXT_MAX_JOBS", "20"))
+CONTEXT_MAX_RSS_MB = float(os.environ.get("OLYMPOS_CONTEXT_MAX_RSS_MB", "1500"))
+
+# Nothing the robot needs: no GPU, extensions, background services or sizeable caches
+LEAN_LAUNCH_ARGS = (
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disk-cache-size=16777216",
+    "--media-cache-size=1",
+    "--renderer-process-limit=2",
+)
+
+MB = 1024 * 1024
+
+
+def auto_headless() -> bool:
+    """Headless as robocorp.browser decides it: RPA_HEADLESS_MODE if set, otherwise only on Linux without a display."""
+    if "RPA_HEADLESS_MODE" in os.environ:
+        return bool(int(os.environ["RPA_HEADLESS_MODE"]))
+    return sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def launch_options(lean: bool = LEAN_BROWSER, headless: bool | None = HEADLESS) -> dict:
+    """
+    Keyword arguments for BrowserType.launch. robocorp.browser.browser() takes no launch options, so the robot launches
+    the browser itself with these.
+
+    Headless Chromium runs as Playwright's headless shell, which leaves out the browser UI altogether.
+    """
+    options: dict = {"headless": auto_headless() if headless is None else headless}
+    if lean:
+        options["args"] = list(LEAN_LAUNCH_ARGS)
+    return options
+
+
+@dataclass(frozen=True)
+class RssSample:
+    python_bytes: int
+    browser_bytes: int  # Playwright driver and browser processes, all children of the robot
+
+
+def _rss(process: psutil.Process) -> int:
+    try:
+        return process.memory_info().rss
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        # Exited between listing and measuring
+        return 0
+
+
+class RssMonitor:
+    """
+    Resident memory of the robot and the browser it started, sampled at the moments the robot chooses.
+
+    The report gives the peak and the steady state, the median of the second half of the samples, when start-up is over.
+    """
+
+    def __init__(self, process: psutil.Process | None = None) -> None:
+        self.process = process if process is not None else psutil.Process()
+        self.samples: list[RssSample] = []
+
+    def sample(self) -> RssSample:
+        try:
+            children = self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            children = []
+        sample = RssSample(_rss(self.process), sum(_rss(child) for child in children))
+        self.samples.append(sample)
+        return sample
+
+    def report(self) -> dict:
+        report: dict = {"samples": len(self.samples)}
+        steady = self.samples[len(self.samples) // 2 :]
+        for name, values, steady_values in (
+            ("python", [s.python_bytes for s in self.samples], [s.python_bytes for s in steady]),
+            ("browser", [s.browser_bytes for s in self.samples], [s.browser_bytes for s in steady]),
+        ):
+            report[name] = {
+                "peak_mb": round(max(values, default=0) / MB, 1),
+                "steady_mb": round(statistics.median(steady_values) / MB, 1) if steady_values else 0.0,
+            }
+        return report
+
+    def write_report(self, report_file: Path) -> dict:
+        self.sample()
+        report = self.report()
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        with report_file.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+@cache
+def get_rss_monitor() -> RssMonitor:
+    """Memory monitor of the current run."""
+    return RssMonitor()
+
+
+class ContextPool:
+    """
+    Hands out one browser context at a time and replaces it with a fresh one after max_jobs jobs, or when the browser
+    uses more than max_rss_mb at the start of a job. Pages, caches and leaked listeners go away with the old context.
+
+    before_recycle gets the old context first, to carry over what the next one needs, such as the cookies.
+    """
+
+    def __init__(
+        self,
+        new_context: Callable[[], BrowserContext],
+        max_jobs: int = CONTEXT_MAX_JOBS,
+        max_rss_mb: float = CONTEXT_MAX_RSS_MB,
+        monitor: RssMonitor | None = None,
+        before_recycle: Callable[[BrowserContext], None] | None = None,
+    ) -> None:
+        self.new_context = new_context
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.monitor = monitor if monitor is not None else get_rss_monitor()
+        self.before_recycle = before_recycle
+        self.jobs = 0  # jobs in the current context
+        self.recycles = 0
+        self._context: BrowserContext | None = None
+
+    def context(self) -> BrowserContext:
+        if self._context is None:
+            self._context = self.new_context()
+        return self._context
+
+    def should_recycle(self) -> bool:
+        if self.max_jobs and self.jobs >= self.max_jobs:
+            return True
+        return bool(self.max_rss_mb) and self.monitor.sample().browser_bytes > self.max_rss_mb * MB
+
+    def acquire(self) -> BrowserContext:
+        """The context for the next job, a fresh one if the current one is due."""
+        if self._context is not None and self.should_recycle():
+            if self.before_recycle is not None:
+                self.before_recycle(self._context)
+            self._context.close()
+            self._context = None
+            self.jobs = 0
+            self.recycles += 1
+        self.jobs += 1
+        return self.context()
+
+    def close(self) -> None:
+        """Close the current context, which also writes a recorded HAR."""
+        if self._context is not None:
+            self._context.close()
+            self._context = None
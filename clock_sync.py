@@ -0,0 +1,83 @@
+import math
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+
+OLYMPOS_URL = "https://www.olympos.nl/"
+# A missing or unparsable Date header and network problems
+CLOCK_SYNC_ERRORS = (requests.RequestException, KeyError, TypeError, ValueError)
+
+
+@dataclass(frozen=True)
+class ClockOffset:
+    offset: float  # seconds the server clock is ahead of the local clock
+    uncertainty: float  # the true offset lies within offset +/- uncertainty
+    samples: int
+
+
+LOCAL_CLOCK = ClockOffset(offset=0.0, uncertainty=0.0, samples=0)
+
+
+def sample_server_time(session: requests.Session, url: str, clock: Callable[[], float] = time.time) -> tuple[float, float, float]:
+    """One HEAD request. Returns local send time, local receive time and the server time from the Date header."""
+    t0 = clock()
+    response = session.head(url, timeout=10, allow_redirects=False)
+    t1 = clock()
+    server_time = parsedate_to_datetime(response.headers["Date"]).timestamp()
+    return t0, t1, server_time
+
+
+def estimate_server_offset(
+    url: str = OLYMPOS_URL,
+    samples: int = 8,
+    session: requests.Session | None = None,
+    clock: Callable[[], float] = time.time,
+    sleep: Callable[[float], None] = time.sleep,
+) -> ClockOffset:
+    """
+    Estimate the offset of the server clock from Date headers.
+
+    The Date header only has second resolution, so one sample bounds the offset to a window of about a second.
+    Samples are spread over a second, so the truncation points fall at different moments and the intersection
+    of the windows narrows down to roughly a second divided by the number of samples (plus round trip time).
+    """
+    session = session or requests.Session()
+    lower, upper = -math.inf, math.inf
+    midpoints = []
+    for i in range(samples):
+        if i > 0:
+            sleep(1 / samples)
+        t0, t1, server_time = sample_server_time(session, url, clock=clock)
+        # The server read its clock somewhere in [t0, t1] and truncated it to server_time
+        lower = max(lower, server_time - t1)
+        upper = min(upper, server_time + 1 - t0)
+        midpoints.append(server_time + 0.5 - (t0 + t1) / 2)
+
+    if lower > upper:
+        # Inconsistent samples (asymmetric network delays or a clock jump), fall back to a rough estimate
+        return ClockOffset(offset=statistics.median(midpoints), uncertainty=1.0, samples=samples)
+    return ClockOffset(offset=(lower + upper) / 2, uncertainty=(upper - lower) / 2, samples=samples)
+
+
+def corrected_release_time(release: datetime, clock_offset: ClockOffset) -> float:
+    """Local timestamp at which the server clock has certainly passed the release time."""
+    return release.timestamp() - clock_offset.offset + clock_offset.uncertainty
+
+
+def wait_until(
+    deadline: float,
+    keep_alive: Callable[[], None] | None = None,
+    keep_alive_interval: float = 20,
+    clock: Callable[[], float] = time.time,
+    sleep: Callable[[float], None] = time.sleep,
+) -> None:
+    """Sleep until the local deadline, calling keep_alive regularly so connections stay open."""
+    while (remaining := deadline - clock()) > 0:
+        if keep_alive is not None and remaining > keep_alive_interval / 2:
+            keep_alive()
+        sleep(min(remaining, keep_alive_interval))
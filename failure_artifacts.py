@@ -0,0 +1,159 @@
+import gzip
+import os
+import re
+import shutil
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from datetime import datetime
+from pathlib import Path
+
+from playwright.sync_api import BrowserContext, Page
+from playwright.sync_api import Error as PlaywrightError
+
+from log_attempt import ResultCode, outcome_from_exception
+from work_dir import WORK_DIR
+
+# Next to robot_attempts.html, so the report links to the artifacts with relative paths
+FAILURES_DIR = WORK_DIR / "failures"
+# Oldest failures are removed once all of them together take more than this
+MAX_TOTAL_BYTES = int(float(os.environ.get("OLYMPOS_FAILURE_ARTIFACTS_MB", "200")) * 1024 * 1024)
+# A larger trace is not kept, the screenshot and DOM usually tell enough
+MAX_TRACE_BYTES = 25 * 1024 * 1024
+SCREENSHOT_QUALITY = 50
+# Outcomes of a working robot, nothing to diagnose
+EXPECTED_CODES = frozenset({ResultCode.ALREADY_FULL, ResultCode.NOT_FOUND})
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def _size(failure_dir: Path) -> int:
+    return sum(file.stat().st_size for file in failure_dir.iterdir())
+
+
+class FailureArtifacts:
+    """
+    Keeps a Playwright trace of each step in memory and only writes it to disk, with a screenshot and the DOM, when the
+    step fails.
+
+    Every step is a trace chunk. A chunk that ends without an error is dropped without being written, so successful
+    steps only pay for the recording. Artifacts are compressed, a trace above max_trace_bytes is left out, and the
+    oldest failures are removed when all of them together exceed max_total_bytes.
+    """
+
+    def __init__(
+        self, directory: Path = FAILURES_DIR, max_total_bytes: int = MAX_TOTAL_BYTES, max_trace_bytes: int = MAX_TRACE_BYTES, clock: Callable[[], datetime] = datetime.now
+    ) -> None:
+        self.directory = directory
+        self.max_total_bytes = max_total_bytes
+        self.max_trace_bytes = max_trace_bytes
+        self.clock = clock
+        self._traced: list[BrowserContext] = []
+
+    def start(self, context: BrowserContext) -> None:
+        """Start recording the context. Without a recording, failures still get a screenshot and the DOM."""
+        if context in self._traced:
+            return
+        try:
+            context.tracing.start(screenshots=True, snapshots=True)
+        except PlaywrightError:
+            # E.g. an attached browser that is still being traced by an earlier run
+            return
+        self._traced.append(context)
+
+    def stop(self, context: BrowserContext) -> None:
+        """Stop recording the context, so a browser that keeps running is not left tracing."""
+        if context not in self._traced:
+            return
+        self._traced.remove(context)
+        with suppress(PlaywrightError):
+            context.tracing.stop()
+
+    @contextmanager
+    def capture(self, step: str, page: Callable[[], Page | None]) -> Iterator[None]:
+        """
+        Run a step, saving its artifacts if it raises. Their paths are set on the exception as `artifacts`, where
+        outcome_from_exception picks them up for the attempts log.
+        """
+        current = page()
+        context = current.context if current is not None else None
+        chunk = context if context in self._traced and self._start_chunk(context, step) else None
+        try:
+            yield
+        except Exception as e:
+            if outcome_from_exception(e).code in EXPECTED_CODES:
+                self._stop_chunk(chunk)
+                raise
+            e.artifacts = self.save(step, page(), chunk)  # type: ignore[attr-defined]
+            raise
+        self._stop_chunk(chunk)
+
+    def _start_chunk(self, context: BrowserContext, step: str) -> bool:
+        try:
+            context.tracing.start_chunk(title=step)
+        except PlaywrightError:
+            return False
+        return True
+
+    def _stop_chunk(self, context: BrowserContext | None, path: Path | None = None) -> bool:
+        if context is None:
+            return False
+        try:
+            # Without a path the chunk is discarded
+            context.tracing.stop_chunk(path=path)
+        except PlaywrightError:
+            return False
+        return True
+
+    def save(self, step: str, page: Page | None, chunk: BrowserContext | None) -> list[str]:
+        """Write the artifacts of a failed step. Returns their paths relative to the parent of the failures directory."""
+        failure_dir = self._new_failure_dir(f"{self.clock():%Y%m%dT%H%M%S}_{_slug(step)}")
+        trace_file = failure_dir / "trace.zip"
+        if self._stop_chunk(chunk, trace_file) and trace_file.exists() and trace_file.stat().st_size > self.max_trace_bytes:
+            trace_file.unlink()
+        if page is not None and not page.is_closed():
+            # Whatever can be captured, the page may be in a bad state after the failure
+            with suppress(PlaywrightError):
+                page.screenshot(path=failure_dir / "screenshot.jpg", type="jpeg", quality=SCREENSHOT_QUALITY, timeout=5000)
+            with suppress(PlaywrightError):
+                (failure_dir / "dom.html.gz").write_bytes(gzip.compress(page.content().encode("utf-8")))
+        artifacts = sorted(file.relative_to(self.directory.parent).as_posix() for file in failure_dir.iterdir())
+        self.prune(keep=failure_dir)
+        return artifacts
+
+    def _new_failure_dir(self, name: str) -> Path:
+        """A directory of its own, also for the same step failing twice within a second."""
+        failure_dir, attempt = self.directory / name, 1
+        while True:
+            try:
+                failure_dir.mkdir(parents=True)
+            except FileExistsError:
+                attempt += 1
+                failure_dir = self.directory / f"{name}_{attempt}"
+            else:
+                return failure_dir
+
+    def prune(self, keep: Path | None = None) -> None:
+        """
+        Remove the oldest failures until all of them fit in max_total_bytes. The newest failure, or keep, is never
+        removed; if it does not fit on its own, its trace is dropped instead.
+        """
+        if not self.directory.exists():
+            return
+        failures = sorted(failure_dir for failure_dir in self.directory.iterdir() if failure_dir.is_dir())
+        if not failures:
+            return
+        keep = keep or failures[-1]
+        trace_file = keep / "trace.zip"
+        if _size(keep) > self.max_total_bytes and trace_file.exists():
+            trace_file.unlink()
+        sizes = {failure_dir: _size(failure_dir) for failure_dir in failures}
+        total = sum(sizes.values())
+        for failure_dir in failures:
+            if total <= self.max_total_bytes:
+                break
+            if failure_dir == keep:
+                continue
+            shutil.rmtree(failure_dir, ignore_errors=True)
+            total -= sizes[failure_dir]
@@ -0,0 +1,189 @@
+import argparse
+import json
+import statistics
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from atomic_write import atomic_write_json
+from lesson_config import load_lessons
+from log_attempt import ATTEMPT_LOG, ResultCode, entry_code
+from work_dir import WORK_DIR
+
+FILL_ANALYTICS_FILE = WORK_DIR / "fill_analytics.json"
+
+# The lesson was bookable or full at the attempt, so its booking window was open
+OPEN_CODES = frozenset({ResultCode.REGISTERED, ResultCode.ALREADY_FULL})
+# The lesson was not listed yet, so its booking window was still closed
+CLOSED_CODES = frozenset({ResultCode.NOT_FOUND})
+
+
+def lesson_key(lesson: dict) -> str:
+    """Key of a weekly lesson, the same for all its occurrences."""
+    return f"{lesson.get('lesson_type')}|{lesson.get('name')}|{lesson.get('day')}|{lesson.get('time')}"
+
+
+def _median(values: list[float]) -> float | None:
+    return statistics.median(values) if values else None
+
+
+class FillAnalytics:
+    """
+    Estimates per lesson when its booking window opens and how fast it fills, from the outcomes in the attempts log.
+
+    Every attempt is an observation at a lead time (hours before the lesson): registered or full means the window was
+    open, not found means it was not. Per occurrence this bounds the moment the window opens, and the first time it
+    was seen full bounds how long spots last. The log is read incrementally, only new lines are processed on update.
+    """
+
+    def __init__(self, state_file: Path = FILL_ANALYTICS_FILE, attempts_file: Path = ATTEMPT_LOG) -> None:
+        self.state_file = state_file
+        self.attempts_file = attempts_file
+        self.offset = 0
+        # lesson key -> occurrence datetime -> {"open": max lead seen open, "closed": leads seen closed, "full": max lead seen full}
+        self.occurrences: dict[str, dict[str, dict]] = {}
+        if state_file.exists():
+            try:
+                with state_file.open(encoding="utf-8") as f:
+                    state = json.load(f)
+                self.offset = state["offset"]
+                self.occurrences = state["occurrences"]
+            except (OSError, json.JSONDecodeError, KeyError):
+                # Rebuilt from the full log on the next update
+                pass
+
+    def save(self) -> None:
+        atomic_write_json(self.state_file, {"offset": self.offset, "occurrences": self.occurrences})
+
+    def observe(self, entry: dict) -> None:
+        action = entry.get("action", {})
+        code = entry_code(entry)
+        # Lessons skipped because of the negative cache were not looked at. Older skips carry the cached code instead of SKIPPED.
+        if entry.get("outcome", {}).get("error_code") == "NEGATIVE_CACHE" or code not in OPEN_CODES | CLOSED_CODES or "datetime" not in action:
+            return
+        try:
+            lead = (datetime.fromisoformat(action["datetime"]) - datetime.fromisoformat(entry["timestamp"])).total_seconds() / 3600
+        except (KeyError, ValueError):
+            return
+        occurrence = self.occurrences.setdefault(lesson_key(action), {}).setdefault(action["datetime"], {"open": None, "closed": [], "full": None})
+        if code in CLOSED_CODES:
+            occurrence["closed"].append(round(lead, 3))
+            return
+        occurrence["open"] = max(lead, occurrence["open"] or lead)
+        if code == ResultCode.ALREADY_FULL:
+            occurrence["full"] = max(lead, occurrence["full"] or lead)
+
+    def update(self) -> "FillAnalytics":
+        """Process the attempts logged since the last update and save the state."""
+        if not self.attempts_file.exists():
+            return self
+        size = self.attempts_file.stat().st_size
+        if size < self.offset:
+            # The log was rewritten, start over
+            self.offset, self.occurrences = 0, {}
+        with self.attempts_file.open("rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        complete = data[: data.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8").splitlines():
+            try:
+                self.observe(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        self.offset += len(complete)
+        self.save()
+        return self
+
+    def opens_before_hours(self, key: str) -> float | None:
+        """Estimated hours before the lesson that the booking window opens."""
+        estimates = []
+        for occurrence in self.occurrences.get(key, {}).values():
+            lower = occurrence["open"]
+            if lower is None:
+                continue
+            upper = min((lead for lead in occurrence["closed"] if lead > lower), default=None)
+            estimates.append(lower if upper is None else (lower + upper) / 2)
+        estimate = _median(estimates)
+        return None if estimate is None else round(estimate, 2)
+
+    def fill_minutes(self, key: str) -> float | None:
+        """Estimated minutes after the window opens that the lesson is full. An upper bound, runs only see it afterwards."""
+        opens_before = self.opens_before_hours(key)
+        if opens_before is None:
+            return None
+        fills = [max(0.0, opens_before - occurrence["full"]) * 60 for occurrence in self.occurrences.get(key, {}).values() if occurrence["full"] is not None]
+        fill = _median(fills)
+        return None if fill is None else round(fill, 1)
+
+    def recommend(self, lessons: list[dict], resolve_datetime: Callable[[dict], str], lead_time: timedelta = timedelta(minutes=2)) -> list[dict]:
+        """Per lesson with an estimated window: the next release and the moments to run for it."""
+        recommendations = []
+        for lesson in lessons:
+            key = lesson_key(lesson)
+            opens_before = lesson.get("opens_before_hours", self.opens_before_hours(key))
+            if opens_before is None:
+                continue
+            release = datetime.fromisoformat(resolve_datetime(lesson)) - timedelta(hours=opens_before)
+            fill = self.fill_minutes(key)
+            runs = [release - lead_time]
+            if fill:
+                # A second chance halfway the time spots usually last, for when the first run was unlucky
+                runs.append(release + timedelta(minutes=fill / 2))
+            recommendations.append(
+                {
+                    "lesson": key,
+                    "opens_before_hours": opens_before,
+                    "configured": "opens_before_hours" in lesson,
+                    "fill_minutes": fill,
+                    "release": release.isoformat(timespec="seconds"),
+                    "runs": [run.isoformat(timespec="seconds") for run in runs],
+                }
+            )
+        return sorted(recommendations, key=lambda recommendation: recommendation["release"])
+
+
+def with_estimated_windows(lessons: list[dict], analytics: FillAnalytics) -> list[dict]:
+    """The lessons, with the estimated opens_before_hours for those that do not configure it."""
+    estimated = []
+    for lesson in lessons:
+        opens_before = None if "opens_before_hours" in lesson else analytics.opens_before_hours(lesson_key(lesson))
+        estimated.append(lesson if opens_before is None else {**lesson, "opens_before_hours": opens_before})
+    return estimated
+
+
+def with_estimated_releases(plan: list[dict], analytics: FillAnalytics) -> list[dict]:
+    """
+    The compiled lessons of a run, with release_at from the estimated window for those without a configured one, so
+    the run waits for the same moment the scheduler started it for.
+    """
+    estimated = []
+    for lesson in plan:
+        opens_before = None if "release_at" in lesson else analytics.opens_before_hours(lesson_key(lesson))
+        if opens_before is None:
+            estimated.append(lesson)
+            continue
+        release_at = datetime.fromisoformat(lesson["datetime"]) - timedelta(hours=opens_before)
+        estimated.append({**lesson, "release_at": release_at.isoformat()})
+    return estimated
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Estimate when booking windows open and fill, and when to run for them")
+    parser.add_argument("--json", action="store_true", help="Print the recommendations as JSON")
+    args = parser.parse_args(argv)
+    # tasks uses this module, so only import it when running on its own
+    from tasks import determine_next_datetime  # noqa: PLC0415
+
+    recommendations = FillAnalytics().update().recommend(load_lessons(), determine_next_datetime)
+    if args.json:
+        print(json.dumps(recommendations, indent=2))  # noqa: T201
+        return
+    for recommendation in recommendations:
+        source = "configured" if recommendation["configured"] else "estimated"
+        fill = f"fills in ~{recommendation['fill_minutes']:.0f} min" if recommendation["fill_minutes"] is not None else "fill time unknown"
+        print(f"{recommendation['lesson']}: opens {recommendation['opens_before_hours']} h before ({source}), {fill}")  # noqa: T201
+        print(f"    release {recommendation['release']}, run at {', '.join(recommendation['runs'])}")  # noqa: T201
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
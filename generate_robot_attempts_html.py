@@ -4,15 +4,13 @@ from pathlib import Path
 
 from robocorp import log
 
-INPUT_FILE = Path("work_directory/robot_attempts.jsonl")
-OUTPUT_FILE = Path("work_directory/robot_attempts.html")
+from log_attempt import ResultCode, entry_code
+from work_dir import WORK_DIR
 
-HTML_HEADER = """<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <title>Robot Attempts Log</title>
-    <style>
+INPUT_FILE = WORK_DIR / "robot_attempts.jsonl"
+OUTPUT_FILE = WORK_DIR / "robot_attempts.html"
+
+HTML_STYLE = """    <style>
         body { font-family: Arial, sans-serif; margin: 2em; background: #f9f9f9; }
         h1 { color: #333; }
         table { border-collapse: collapse; width: 100%; background: #fff; }
@@ -27,12 +25,14 @@ HTML_HEADER = """<!DOCTYPE html>
         .result-BusinessException { background: #fd7e14; color: #ffffff; font-weight: bold; }
         .result-Timeout { background: #6f42c1; color: #ffffff; font-weight: bold; }
         .result-TooManyFailures { background: #e83e8c; color: #ffffff; font-weight: bold; }
+        .result-Unverified { background: #cce5ff; color: #004085; }
+        .result-Skipped { background: #e2e3e5; color: #383d41; }
+        .artifacts { font-size: 0.85em; }
         .success-cell { font-size: 1.5em; text-align: center; color: #28a745; }
     </style>
-</head>
-<body>
-    <h1>Robot Attempts Log</h1>
-    <table>
+"""
+
+HTML_TABLE_HEADER = """    <table>
         <thead>
             <tr>
                 <th>Timestamp</th>
@@ -50,6 +50,21 @@ HTML_HEADER = """<!DOCTYPE html>
         <tbody>
 """
 
+HTML_HEADER = (
+    """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Robot Attempts Log</title>
+"""
+    + HTML_STYLE
+    + """</head>
+<body>
+    <h1>Robot Attempts Log</h1>
+"""
+    + HTML_TABLE_HEADER
+)
+
 HTML_FOOTER = """        </tbody>
     </table>
 </body>
@@ -73,26 +88,26 @@ def parse_lesson_datetime(dt_str):
         return dt_str, ""
 
 
-def get_result_class(result):
-    if result == "Registered":
-        return "result-Registered"
-    if result.startswith("Already"):
-        return "result-Already"
-    if result.startswith("Not"):
-        return "result-Not"
-    if result == "Too many failed attempts today.":
-        return "result-TooManyFailures"
-    if result.startswith("BusinessException:"):
-        return "result-BusinessException"
-    if "Timeout" in result and "Exception:" in result:
-        return "result-Timeout"
-    if result.startswith("Exception:"):
-        return "result-Exception"
-    return ""
+RESULT_CLASSES = {
+    ResultCode.REGISTERED: "result-Registered",
+    ResultCode.ALREADY_REGISTERED: "result-Already",
+    ResultCode.ALREADY_FULL: "result-Already",
+    ResultCode.NOT_FOUND: "result-Not",
+    ResultCode.TOO_MANY_FAILURES: "result-TooManyFailures",
+    ResultCode.BUSINESS_EXCEPTION: "result-BusinessException",
+    ResultCode.TIMEOUT: "result-Timeout",
+    ResultCode.EXCEPTION: "result-Exception",
+    ResultCode.UNVERIFIED: "result-Unverified",
+    ResultCode.SKIPPED: "result-Skipped",
+}
+
+
+def get_result_class(code):
+    return RESULT_CLASSES.get(code, "")
 
 
-def get_success_mark(result):
-    return "✔️" if result == "Registered" else ""
+def get_success_mark(code):
+    return "✔️" if code == ResultCode.REGISTERED else ""
 
 
 def truncate_result_for_display(result, max_length=100):
@@ -102,30 +117,25 @@ def truncate_result_for_display(result, max_length=100):
     return result[:max_length] + "..."
 
 
-def generate_robot_attempts_html():
-    rows = []
-    if not INPUT_FILE.exists():
-        log.warn(f"Input file {INPUT_FILE} not found.")
-        return
-
-    with INPUT_FILE.open(encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip()]
-        # Reverse the lines so newest entries are first
-        lines = lines[::-1]
-        for line in lines:
-            entry = json.loads(line)
-            action = entry.get("action", {})
-            # Parse main timestamp
-            date, time = parse_datetime(entry.get("timestamp", ""))
-            # Parse lesson datetime
-            lesson_date, lesson_time = parse_lesson_datetime(action.get("datetime", ""))
-            result = entry.get("result", "")
-            result_class = get_result_class(result)
-            success_mark = get_success_mark(result)
-            truncated_result = truncate_result_for_display(result)
-            # Escape HTML characters in result for title attribute
-            result_title = result.replace('"', "&quot;").replace("<", "&lt;").replace(">", "&gt;")
-            rows.append(f"""<tr>
+def render_row(entry: dict) -> str:
+    """Table row of a logged attempt."""
+    action = entry.get("action", {})
+    # Parse main timestamp
+    date, time = parse_datetime(entry.get("timestamp", ""))
+    # Parse lesson datetime
+    lesson_date, lesson_time = parse_lesson_datetime(action.get("datetime", ""))
+    result = entry.get("result", "")
+    code = entry_code(entry)
+    result_class = get_result_class(code)
+    success_mark = get_success_mark(code)
+    truncated_result = truncate_result_for_display(result)
+    # Escape HTML characters in result for title attribute
+    result_title = result.replace('"', "&quot;").replace("<", "&lt;").replace(">", "&gt;")
+    # Trace, screenshot and DOM of a failure, next to this report
+    artifact_links = " ".join(f'<a href="{artifact}">{artifact.rsplit("/", 1)[-1]}</a>' for artifact in entry.get("outcome", {}).get("artifacts", []))
+    if artifact_links:
+        truncated_result += f'<br><span class="artifacts">{artifact_links}</span>'
+    return f"""<tr>
                 <td>{entry.get("timestamp", "")}</td>
                 <td>{date}</td>
                 <td>{time}</td>
@@ -136,9 +146,24 @@ def generate_robot_attempts_html():
                 <td>{action.get("day", "")}</td>
                 <td>{action.get("time", "")}</td>
                 <td>{lesson_date} {lesson_time}</td>
-            </tr>""")
+            </tr>"""
+
+
+def generate_robot_attempts_html(input_file: Path | None = None, output_file: Path | None = None):
+    input_file = input_file if input_file is not None else INPUT_FILE
+    output_file = output_file if output_file is not None else OUTPUT_FILE
+    rows = []
+    if not input_file.exists():
+        log.warn(f"Input file {input_file} not found.")
+        return
+
+    with input_file.open(encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+        # Reverse the lines so newest entries are first
+        lines = lines[::-1]
+        rows.extend(render_row(json.loads(line)) for line in lines)
 
-    with OUTPUT_FILE.open("w", encoding="utf-8") as f:
+    with output_file.open("w", encoding="utf-8") as f:
         f.write(HTML_HEADER)
         for row in rows:
             f.write(row + "\n")
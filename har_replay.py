@@ -0,0 +1,62 @@
+import base64
+import json
+from collections import defaultdict, deque
+from pathlib import Path
+from time import sleep
+
+from playwright.sync_api import BrowserContext, Route
+
+HAR_FILE = Path("output/olympos.har")
+HAR_MODES = ("record", "replay")
+HAR_LATENCIES = ("zero", "original")
+
+
+def record_context_kwargs(har_path: Path = HAR_FILE) -> dict:
+    """Context arguments to record all traffic to har_path. Playwright writes the file when the context is closed."""
+    har_path.parent.mkdir(parents=True, exist_ok=True)
+    return {"record_har_path": str(har_path), "record_har_content": "embed"}
+
+
+class HarReplayer:
+    """
+    Serves recorded responses in the order they were recorded, waiting the recorded time of each response.
+
+    Playwright's sync API handles routes one at a time, so concurrent requests are served one after another.
+    That makes timings repeatable, but slower than the original run when the page loaded resources in parallel.
+    """
+
+    def __init__(self, har_path: Path) -> None:
+        with har_path.open(encoding="utf-8") as f:
+            entries = json.load(f)["log"]["entries"]
+        self.entries: dict[tuple[str, str], deque[dict]] = defaultdict(deque)
+        for entry in entries:
+            self.entries[(entry["request"]["method"], entry["request"]["url"])].append(entry)
+
+    def handle(self, route: Route) -> None:
+        key = (route.request.method, route.request.url)
+        recorded = self.entries.get(key)
+        if not recorded:
+            route.abort()
+            return
+        entry = recorded[0]
+        if len(recorded) > 1:
+            # Keep the last response for requests that were repeated more often than recorded
+            recorded.popleft()
+
+        sleep(max(0, entry.get("time", 0)) / 1000)
+        response = entry["response"]
+        content = response.get("content", {})
+        body = content.get("text", "")
+        body_bytes = base64.b64decode(body) if content.get("encoding") == "base64" else body.encode()
+        headers = {header["name"]: header["value"] for header in response.get("headers", []) if header["name"].lower() != "content-encoding"}
+        route.fulfill(status=response["status"], headers=headers, body=body_bytes)
+
+
+def replay(context: BrowserContext, har_path: Path = HAR_FILE, latency: str = "zero") -> None:
+    """Serve all traffic of the context from the recorded HAR file. Requests that were not recorded are aborted."""
+    if not har_path.exists():
+        raise ValueError(f"HAR file {har_path} not found. Record one first with OLYMPOS_HAR_MODE=record.")
+    if latency == "zero":
+        context.route_from_har(har_path, not_found="abort")
+    else:
+        context.route("**/*", HarReplayer(har_path).handle)
@@ -0,0 +1,95 @@
+import os
+import random
+import statistics
+from dataclasses import dataclass
+from itertools import accumulate
+
+from playwright.sync_api import Locator
+
+# Typing in the page is off unless OLYMPOS_IN_PAGE_TYPING=1. Its events are dispatched by a script, so they have
+# isTrusted false, which anti-bot scripts look for. Switch it on only while the detections metric stays at zero.
+IN_PAGE_TYPING = os.environ.get("OLYMPOS_IN_PAGE_TYPING", "0") == "1"
+
+# Types the text into the element one key at a time, waiting the scheduled delay after each key, and returns when
+# each key was typed. Runs as one evaluate, so the delays are kept by the page instead of by round trips to the driver.
+TYPE_IN_PAGE_JS = """
+async (element, {text, delays}) => {
+    const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+    // The native setter, so frameworks that track the value see the change
+    const setValue = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(element), "value")?.set;
+    const initial = element.value;
+    element.focus();
+    const start = performance.now();
+    const times = [];
+    for (let i = 0; i < text.length; i++) {
+        const key = text[i];
+        times.push(performance.now() - start);
+        element.dispatchEvent(new KeyboardEvent("keydown", {key, bubbles: true, cancelable: true}));
+        element.dispatchEvent(new KeyboardEvent("keypress", {key, bubbles: true, cancelable: true}));
+        if (setValue) {
+            setValue.call(element, element.value + key);
+        } else {
+            element.value += key;
+        }
+        element.dispatchEvent(new InputEvent("input", {data: key, inputType: "insertText", bubbles: true}));
+        element.dispatchEvent(new KeyboardEvent("keyup", {key, bubbles: true, cancelable: true}));
+        if (i < text.length - 1) {
+            await sleep(delays[i]);
+        }
+    }
+    element.dispatchEvent(new Event("change", {bubbles: true}));
+    return {times, initial, value: element.value};
+}
+"""
+
+
+def typing_schedule(length: int, min_delay: int = 40, max_delay: int = 120, rng: random.Random | None = None) -> list[float]:
+    """Delays in ms after each key, normally distributed around the middle of min_delay and max_delay, as press_sequentially_random."""
+    rng = rng if rng is not None else random.Random()  # noqa: S311 - timing jitter, not security
+    mean_delay = (min_delay + max_delay) / 2
+    stddev_delay = (max_delay - min_delay) / 6
+    return [max(0.0, rng.normalvariate(mean_delay, stddev_delay)) for _ in range(length)]
+
+
+@dataclass(frozen=True)
+class TypingReport:
+    scheduled_ms: list[float]  # offset of each key from the first one, as scheduled
+    achieved_ms: list[float]  # the same, as measured in the page
+
+    @property
+    def intervals(self) -> list[tuple[float, float]]:
+        return [
+            (scheduled_next - scheduled, achieved_next - achieved)
+            for scheduled, scheduled_next, achieved, achieved_next in zip(self.scheduled_ms, self.scheduled_ms[1:], self.achieved_ms, self.achieved_ms[1:], strict=False)
+        ]
+
+    @property
+    def mean_error_ms(self) -> float:
+        """Mean difference between the achieved and the scheduled time between two keys."""
+        return statistics.fmean(abs(achieved - scheduled) for scheduled, achieved in self.intervals) if self.intervals else 0.0
+
+    @property
+    def max_error_ms(self) -> float:
+        return max((abs(achieved - scheduled) for scheduled, achieved in self.intervals), default=0.0)
+
+    def summary(self) -> str:
+        duration = self.achieved_ms[-1] if self.achieved_ms else 0.0
+        return f"Typed {len(self.achieved_ms)} keys in {duration:.0f} ms, {self.mean_error_ms:.1f} ms mean and {self.max_error_ms:.1f} ms max deviation from the schedule."
+
+
+class TypingError(Exception):
+    """The field does not hold the typed text afterwards, e.g. because the page rejects synthetic key events."""
+
+
+def type_humanized(locator: Locator, text: str, min_delay: int = 40, max_delay: int = 120, rng: random.Random | None = None) -> TypingReport:
+    """
+    Type the text into the field with human-like delays between keys, in a single call to the page.
+
+    Raises TypingError when the field does not end up with the text appended.
+    """
+    delays = typing_schedule(len(text), min_delay, max_delay, rng)
+    result = locator.evaluate(TYPE_IN_PAGE_JS, {"text": text, "delays": delays})
+    if result["value"] != result["initial"] + text:
+        raise TypingError("The field did not accept the typed text.")
+    scheduled = [0.0, *accumulate(delays[: len(text) - 1])] if text else []
+    return TypingReport(scheduled, result["times"])
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import re
+import tomllib
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from functools import cache
+from pathlib import Path
+
+from atomic_write import atomic_write_json
+
+LESSON_CONFIG_FILE = Path("lessons.toml")
+LESSON_PLAN_CACHE = Path("work_directory/lesson_plan_cache.json")
+
+LESSON_TYPES = ("GROUPLESSON", "COURSE")
+DAYS = ("Ma", "Di", "Wo", "Do", "Vr", "Za", "Zo")
+TIME_PATTERN = re.compile(r"^\d{2}:\d{2}$")
+
+# Name of the course on the tickets page, if it differs from the lesson name
+DESCRIPTION_MAP = {
+    "AERIAL ACROBATIEK": "Aerial acrobatiek",
+    "POLESPORTS": "Polesports",
+    "CHEERLEADING": "Cheerleading",
+}
+# Weekday abbreviations as used in the course options on the tickets page
+COURSE_DAY_MAP = {0: "ma", 1: "di", 2: "we", 3: "do", 4: "vr", 5: "za", 6: "zo"}
+
+REQUIRED_FIELDS = ("name", "lesson_type", "day", "time")
+OPTIONAL_FIELDS = ("description", "opens_before_hours", "priority")
+
+
+def config_hash(config_file: Path) -> str:
+    return hashlib.sha256(config_file.read_bytes()).hexdigest()
+
+
+def validate_lessons(lessons: list) -> list[dict]:
+    """Validate the raw lessons from the config file. Raises ValueError listing all problems at once."""
+    errors = []
+    for i, lesson in enumerate(lessons):
+        if not isinstance(lesson, dict):
+            errors.append(f"lesson {i}: expected a table, got {type(lesson).__name__}")
+            continue
+        missing = [field for field in REQUIRED_FIELDS if field not in lesson]
+        if missing:
+            errors.append(f"lesson {i}: missing field(s) {', '.join(missing)}")
+        unknown = [field for field in lesson if field not in REQUIRED_FIELDS + OPTIONAL_FIELDS]
+        if unknown:
+            errors.append(f"lesson {i}: unknown field(s) {', '.join(unknown)}")
+        if "lesson_type" in lesson and lesson["lesson_type"] not in LESSON_TYPES:
+            errors.append(f"lesson {i}: lesson_type must be one of {', '.join(LESSON_TYPES)}")
+        if "day" in lesson and lesson["day"] not in DAYS:
+            errors.append(f"lesson {i}: day must be one of {', '.join(DAYS)}")
+        if "time" in lesson and not TIME_PATTERN.match(str(lesson["time"])):
+            errors.append(f"lesson {i}: time must be formatted as HH:MM")
+        if "opens_before_hours" in lesson and (not isinstance(lesson["opens_before_hours"], int | float) or lesson["opens_before_hours"] <= 0):
+            errors.append(f"lesson {i}: opens_before_hours must be a positive number")
+        if "priority" in lesson and (not isinstance(lesson["priority"], int | float) or lesson["priority"] <= 0):
+            errors.append(f"lesson {i}: priority must be a positive number")
+    if errors:
+        raise ValueError("Invalid lesson config:\n" + "\n".join(errors))
+    return lessons
+
+
+@cache
+def course_option_pattern(pattern: str) -> re.Pattern:
+    """Compiled pattern for a course option. Cached, so each pattern is compiled once per process."""
+    return re.compile(pattern, re.IGNORECASE)
+
+
+def compile_lesson(lesson: dict, resolve_datetime: Callable[[dict], str]) -> dict:
+    """Resolve everything that is needed to register into the lesson."""
+    compiled = {
+        "name": lesson["name"],
+        "lesson_type": lesson["lesson_type"],
+        "day": lesson["day"],
+        "time": lesson["time"],
+        "datetime": resolve_datetime(lesson),
+    }
+    if lesson["lesson_type"] == "COURSE":
+        weekday_abbr = COURSE_DAY_MAP[datetime.fromisoformat(compiled["datetime"]).weekday()]
+        compiled["description"] = lesson.get("description", DESCRIPTION_MAP.get(lesson["name"], lesson["name"]))
+        # Match course name and weekday abbreviation (do not escape spaces)
+        compiled["option_pattern"] = rf"{lesson['name']}.*\b{weekday_abbr}\b.*"
+    if "priority" in lesson:
+        compiled["priority"] = lesson["priority"]
+    if "opens_before_hours" in lesson:
+        # Moment the booking window for this occurrence opens, in server time
+        release_at = datetime.fromisoformat(compiled["datetime"]) - timedelta(hours=lesson["opens_before_hours"])
+        compiled["release_at"] = release_at.isoformat()
+    return compiled
+
+
+def load_lessons(config_file: Path = LESSON_CONFIG_FILE) -> list[dict]:
+    """Validated lessons as written in the config file."""
+    with config_file.open("rb") as f:
+        config = tomllib.load(f)
+    return validate_lessons(config.get("lessons", []))
+
+
+def compile_plan(config_file: Path, resolve_datetime: Callable[[dict], str]) -> list[dict]:
+    return [compile_lesson(lesson, resolve_datetime) for lesson in load_lessons(config_file)]
+
+
+def _load_cached_plan(plan_cache: Path, expected_hash: str) -> list[dict] | None:
+    """Cached plan, if it belongs to the current config and none of its lessons have passed yet."""
+    if not plan_cache.exists():
+        return None
+    try:
+        with plan_cache.open(encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if cached.get("config_hash") != expected_hash:
+        return None
+    now = datetime.now()
+    lessons = cached.get("lessons", [])
+    if any(datetime.fromisoformat(lesson["datetime"]) <= now for lesson in lessons):
+        return None
+    return lessons
+
+
+def load_lesson_plan(resolve_datetime: Callable[[dict], str], config_file: Path = LESSON_CONFIG_FILE, plan_cache: Path = LESSON_PLAN_CACHE) -> list[dict]:
+    """
+    Load the execution plan for the lessons in the config file.
+
+    The plan is cached by hash of the config file and recompiled when the config changes or
+    when one of the resolved datetimes has passed.
+    """
+    if not config_file.exists():
+        raise ValueError(f"Lesson config {config_file} not found.")
+
+    current_hash = config_hash(config_file)
+    lessons = _load_cached_plan(plan_cache, current_hash)
+    if lessons is None:
+        lessons = compile_plan(config_file, resolve_datetime)
+        atomic_write_json(plan_cache, {"config_hash": current_hash, "lessons": lessons}, indent=2)
+
+    for lesson in lessons:
+        if "option_pattern" in lesson:
+            course_option_pattern(lesson["option_pattern"])
+    return lessons
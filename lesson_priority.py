@@ -0,0 +1,36 @@
+import heapq
+from collections.abc import Callable
+from datetime import datetime
+
+DEFAULT_PRIORITY = 1.0
+# A lesson that fills in this many minutes counts double for scarcity, one that fills twice as fast triple, etc.
+SCARCITY_MINUTES = 30.0
+# Hours until the lesson at which urgency has halved
+URGENCY_HALF_HOURS = 24.0
+
+
+def priority_score(lesson: dict, now: datetime, fill_minutes: float | None = None) -> float:
+    """
+    Higher is tried first: the configured priority, times how soon the lesson is, times how fast it usually fills.
+
+    A lesson whose spots never ran out, or that has no history yet, gets no scarcity bonus.
+    """
+    hours_until = max(0.0, (datetime.fromisoformat(lesson["datetime"]) - now).total_seconds() / 3600)
+    urgency = 1 / (1 + hours_until / URGENCY_HALF_HOURS)
+    scarcity = 1.0 if fill_minutes is None else 1 + SCARCITY_MINUTES / max(fill_minutes, 1.0)
+    return lesson.get("priority", DEFAULT_PRIORITY) * urgency * scarcity
+
+
+class LessonPriority:
+    """Orders lessons with a priority queue, most contested first. Scores are computed at every call, so each retry pass is ordered again."""
+
+    def __init__(self, fill_minutes: Callable[[dict], float | None] = lambda _lesson: None, clock: Callable[[], datetime] = datetime.now) -> None:
+        self.fill_minutes = fill_minutes
+        self.clock = clock
+
+    def order(self, lessons: list[dict]) -> list[dict]:
+        now = self.clock()
+        # The index keeps equal scores in config order and keeps dicts out of the comparison
+        queue = [(-priority_score(lesson, now, self.fill_minutes(lesson)), index, lesson) for index, lesson in enumerate(lessons)]
+        heapq.heapify(queue)
+        return [heapq.heappop(queue)[2] for _ in range(len(queue))]
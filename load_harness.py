@@ -0,0 +1,238 @@
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from robocorp.workitems import BusinessException
+
+from browser_footprint import MB, RssMonitor
+from generate_robot_attempts_html import generate_robot_attempts_html
+from lesson_config import DAYS, DESCRIPTION_MAP
+from log_attempt import Outcome, ResultCode, log_attempt
+from tasks import append_registered, is_registered, process_lessons
+
+# Share of each outcome in the generated attempt history, the rest registered
+HISTORY_OUTCOMES = ((ResultCode.ALREADY_FULL, 0.3), (ResultCode.NOT_FOUND, 0.2), (ResultCode.ALREADY_REGISTERED, 0.2), (ResultCode.EXCEPTION, 0.05))
+
+
+@dataclass
+class Scale:
+    lessons: int = 1000
+    registrations: int = 1000
+    attempts: int = 100_000
+    history_days: int = 730
+    latency_ms: float = 0.0  # per registration in the fake Olympos
+    full_rate: float = 0.2
+    not_found_rate: float = 0.1
+    error_rate: float = 0.05
+    seed: int = 0
+
+
+def generate_lessons(count: int, rng: random.Random, start: datetime | None = None) -> list[dict]:
+    """Distinct weekly lessons, named after the real ones first, with the datetime of their next occurrence."""
+    start = start if start is not None else datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    names = list(DESCRIPTION_MAP)
+    lessons = []
+    for index in range(count):
+        day_index = index % len(DAYS)
+        slot = index // len(DAYS)
+        lesson_datetime = start + timedelta(days=day_index, hours=6 + (slot * 15 // 60) % 16, minutes=slot * 15 % 60)
+        name = names[index % len(names)] if index < len(names) else f"LESSON_{index:05d}"
+        lesson_type = "COURSE" if rng.random() < 0.1 else "GROUPLESSON"
+        lessons.append(
+            {
+                "name": name,
+                "lesson_type": lesson_type,
+                "day": DAYS[lesson_datetime.weekday()],
+                "time": lesson_datetime.strftime("%H:%M"),
+                "datetime": lesson_datetime.isoformat(),
+            }
+        )
+    return lessons
+
+
+def generate_registrations(lessons: list[dict], count: int, rng: random.Random) -> list[dict]:
+    """Registrations for a random part of the lessons, plus lessons that are not in the plan anymore."""
+    known = rng.sample(lessons, min(count // 2, len(lessons)))
+    extra = generate_lessons(count - len(known), rng, start=datetime.now() + timedelta(days=30))
+    return [{**lesson, "name": f"OLD_{lesson['name']}"} for lesson in extra] + known
+
+
+def generate_attempts(attempts_file: Path, count: int, lessons: list[dict], rng: random.Random, history_days: int = 730) -> None:
+    """An attempts log in the format of log_attempt, spread evenly over the history in chronological order."""
+    now = datetime.now()
+    first = now - timedelta(days=history_days)
+    step = (now - first) / max(1, count)
+    with attempts_file.open("w", encoding="utf-8") as f:
+        for index in range(count):
+            lesson = rng.choice(lessons)
+            timestamp = first + step * index
+            code, draw = ResultCode.REGISTERED, rng.random()
+            for outcome_code, share in HISTORY_OUTCOMES:
+                if draw < share:
+                    code = outcome_code
+                    break
+                draw -= share
+            entry = {
+                "timestamp": timestamp.isoformat(timespec="seconds"),
+                "result": str(code),
+                "action": {**lesson, "datetime": (timestamp + timedelta(days=2)).isoformat(timespec="minutes")},
+                "outcome": {"code": str(code), "duration": round(rng.uniform(0.5, 5), 3)},
+            }
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class FakeOlympos:
+    """Stands in for Olympos in process_lessons: waits the latency, then registers or fails at the configured rates."""
+
+    def __init__(
+        self, latency_ms: float = 0.0, full_rate: float = 0.0, not_found_rate: float = 0.0, error_rate: float = 0.0, seed: int = 0, sleep: Callable[[float], None] = time.sleep
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.full_rate = full_rate
+        self.not_found_rate = not_found_rate
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)  # noqa: S311 - reproducible synthetic data
+        self.sleep = sleep
+        self.calls = 0
+
+    def _register(self, name: str) -> str:
+        self.calls += 1
+        if self.latency_ms:
+            self.sleep(self.latency_ms / 1000)
+        draw = self.rng.random()
+        if draw < self.full_rate:
+            raise BusinessException(f"Les {name} is vol.", code="LESSON_FULL")
+        draw -= self.full_rate
+        if draw < self.not_found_rate:
+            raise BusinessException(f"Les {name} is niet aanwezig.", code="LESSON_NOT_FOUND")
+        draw -= self.not_found_rate
+        if draw < self.error_rate:
+            raise RuntimeError(f"Synthetic failure registering {name}")
+        return "Registered"
+
+    def register_into_course(self, name: str, lesson_datetime: datetime, description: str | None = None, option_pattern: str | None = None) -> str:
+        return self._register(name)
+
+    def register_into_group_lesson(self, name: str, time: str, lesson_datetime: datetime | None = None) -> str:
+        return self._register(name)
+
+
+@dataclass
+class PhaseUsage:
+    seconds: float
+    peak_traced_mb: float  # Python allocations during the phase, from tracemalloc. Not traced while generating the data.
+    rss_mb: float  # resident memory of the process after the phase
+
+
+class LoadRun:
+    """Times phases and records their memory use."""
+
+    def __init__(self, monitor: RssMonitor | None = None) -> None:
+        self.monitor = monitor if monitor is not None else RssMonitor()
+        self.phases: dict[str, PhaseUsage] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+            self.phases[name] = PhaseUsage(round(seconds, 4), round(peak / MB, 1), round(self.monitor.sample().python_bytes / MB, 1))
+
+
+def run_load(scale: Scale, work_dir: Path) -> dict:
+    """
+    Drive the registration pipeline with synthetic data at the given scale: filtering the registered lessons,
+    process_lessons against a FakeOlympos, storing the registrations and generating the report.
+    """
+    rng = random.Random(scale.seed)  # noqa: S311 - reproducible synthetic data
+    attempts_file = work_dir / "robot_attempts.jsonl"
+    run = LoadRun()
+    with run.phase("generate"):
+        lessons = generate_lessons(scale.lessons, rng)
+        registrations = generate_registrations(lessons, scale.registrations, rng)
+        generate_attempts(attempts_file, scale.attempts, lessons, rng, history_days=scale.history_days)
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        with run.phase("filter_registered"):
+            lessons_to_process = [lesson for lesson in lessons if not is_registered(lesson, registrations)]
+
+        olympos = FakeOlympos(scale.latency_ms, scale.full_rate, scale.not_found_rate, scale.error_rate, seed=scale.seed)
+        registered: list[dict] = []
+        outcomes: dict[str, int] = {}
+
+        def log_synthetic_attempt(lesson: dict, result: str, outcome: Outcome | None = None) -> None:
+            if outcome is not None:
+                outcomes[str(outcome.code)] = outcomes.get(str(outcome.code), 0) + 1
+            log_attempt(lesson, result, outcome, attempt_log=attempts_file)
+
+        with run.phase("process_lessons"):
+            process_lessons(olympos, lessons_to_process, 0, registered, log_attempt_func=log_synthetic_attempt, max_retries=1)  # type: ignore[arg-type]
+
+        with run.phase("append_registered"):
+            registrations = append_registered(registered, registrations)
+
+        with run.phase("report"):
+            generate_robot_attempts_html(attempts_file, work_dir / "robot_attempts.html")
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    process_seconds = run.phases["process_lessons"].seconds
+    report_seconds = run.phases["report"].seconds
+    attempts_in_report = scale.attempts + sum(outcomes.values())
+    return {
+        "scale": asdict(scale),
+        "phases": {name: asdict(usage) for name, usage in run.phases.items()},
+        "throughput": {
+            "lessons_per_second": round(olympos.calls / process_seconds, 1) if process_seconds else None,
+            "report_attempts_per_second": round(attempts_in_report / report_seconds, 1) if report_seconds else None,
+        },
+        "counts": {"lessons_processed": len(lessons_to_process), "registration_calls": olympos.calls, "registrations": len(registrations), "outcomes": outcomes},
+        "memory": run.monitor.report(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = Scale()
+    parser = argparse.ArgumentParser(description="Run the registration pipeline on synthetic lessons, registrations and attempts")
+    for field, value in asdict(defaults).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--work-dir", type=Path, help="Keep the generated files here instead of in a temporary directory")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = vars(parser.parse_args(argv))
+    work_dir, as_json = args.pop("work_dir"), args.pop("json")
+    scale = Scale(**args)
+
+    if work_dir is not None:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        report = run_load(scale, work_dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_load(scale, Path(tmp_dir))
+
+    if as_json:
+        print(json.dumps(report, indent=2))  # noqa: T201
+        return
+    for name, usage in report["phases"].items():
+        print(f"{name:<20} {usage['seconds']:>9.3f} s {usage['peak_traced_mb']:>8.1f} MB peak allocated {usage['rss_mb']:>8.1f} MB RSS")  # noqa: T201
+    print(f"{report['throughput']['lessons_per_second']} lessons/s, {report['throughput']['report_attempts_per_second']} report attempts/s")  # noqa: T201
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
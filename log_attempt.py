@@ -1,16 +1,123 @@
 import json
+from dataclasses import dataclass
 from datetime import datetime
+from enum import StrEnum
 from pathlib import Path
 
-ATTEMPT_LOG = Path("work_directory/robot_attempts.jsonl")
+from metrics import get_metrics
+from work_dir import WORK_DIR
 
+ATTEMPT_LOG = WORK_DIR / "robot_attempts.jsonl"
 
-def log_attempt(action: dict, result: str) -> None:
-    ATTEMPT_LOG.parent.mkdir(parents=True, exist_ok=True)
+
+class ResultCode(StrEnum):
+    REGISTERED = "REGISTERED"
+    ALREADY_REGISTERED = "ALREADY_REGISTERED"
+    ALREADY_FULL = "ALREADY_FULL"
+    NOT_FOUND = "NOT_FOUND"
+    BUSINESS_EXCEPTION = "BUSINESS_EXCEPTION"
+    TIMEOUT = "TIMEOUT"
+    EXCEPTION = "EXCEPTION"
+    TOO_MANY_FAILURES = "TOO_MANY_FAILURES"
+    UNVERIFIED = "UNVERIFIED"  # checked out, but not found on the products page afterwards
+    SKIPPED = "SKIPPED"  # not tried, the negative cache remembers it as full or not found
+
+
+# Outcomes that count towards the daily failure limit
+FAILURE_CODES = frozenset({ResultCode.BUSINESS_EXCEPTION, ResultCode.TIMEOUT, ResultCode.EXCEPTION})
+
+# BusinessException codes raised by Olympos with a dedicated outcome
+BUSINESS_EXCEPTION_CODES = {
+    "LESSON_FULL": ResultCode.ALREADY_FULL,
+    "COURSE_FULL": ResultCode.ALREADY_FULL,
+    "LESSON_NOT_FOUND": ResultCode.NOT_FOUND,
+    "COURSE_NOT_FOUND": ResultCode.NOT_FOUND,
+    "REGISTRATION_UNVERIFIED": ResultCode.UNVERIFIED,
+}
+
+
+@dataclass(frozen=True)
+class Outcome:
+    code: ResultCode
+    error_class: str | None = None
+    error_code: str | None = None  # BusinessException.code
+    duration: float | None = None  # seconds
+    artifacts: tuple[str, ...] = ()  # trace, screenshot and DOM of a failure, relative to the attempts log
+
+    def to_dict(self) -> dict:
+        outcome = {"code": str(self.code), "error_class": self.error_class, "error_code": self.error_code, "duration": self.duration, "artifacts": list(self.artifacts) or None}
+        return {key: value for key, value in outcome.items() if value is not None}
+
+
+def outcome_from_exception(exception: Exception, duration: float | None = None) -> Outcome:
+    error_class = type(exception).__name__
+    error_code = getattr(exception, "code", None)
+    if error_class == "BusinessException":
+        code = BUSINESS_EXCEPTION_CODES.get(str(error_code))
+        if code is None:
+            # Exceptions raised without one of the known codes, classified by their message as before
+            message = str(exception).lower()
+            if "vol" in message:
+                code = ResultCode.ALREADY_FULL
+            elif "niet aanwezig" in message:
+                code = ResultCode.NOT_FOUND
+            else:
+                code = ResultCode.BUSINESS_EXCEPTION
+    elif "Timeout" in error_class:
+        code = ResultCode.TIMEOUT
+    else:
+        code = ResultCode.EXCEPTION
+    return Outcome(
+        code=code,
+        error_class=error_class,
+        error_code=str(error_code) if error_code is not None else None,
+        duration=duration,
+        artifacts=tuple(getattr(exception, "artifacts", ())),
+    )
+
+
+def classify_result(result: str) -> ResultCode | None:
+    """Result code for a free-text result. Only needed for entries logged before outcomes were recorded."""
+    if result == "Registered":
+        return ResultCode.REGISTERED
+    if result == "Already registered":
+        return ResultCode.ALREADY_REGISTERED
+    if result.startswith("Already"):
+        return ResultCode.ALREADY_FULL
+    if result.startswith("Not"):
+        return ResultCode.NOT_FOUND
+    if result == "Too many failed attempts today.":
+        return ResultCode.TOO_MANY_FAILURES
+    if result.startswith("BusinessException:"):
+        return ResultCode.BUSINESS_EXCEPTION
+    if "Timeout" in result and "Exception:" in result:
+        return ResultCode.TIMEOUT
+    if "Exception:" in result:
+        return ResultCode.EXCEPTION
+    return None
+
+
+def entry_code(entry: dict) -> ResultCode | None:
+    """Result code of a logged attempt."""
+    outcome = entry.get("outcome")
+    if outcome:
+        return ResultCode(outcome["code"])
+    return classify_result(entry.get("result", ""))
+
+
+def log_attempt(action: dict, result: str, outcome: Outcome | None = None, attempt_log: Path | None = None) -> None:
+    attempt_log = attempt_log if attempt_log is not None else ATTEMPT_LOG
+    attempt_log.parent.mkdir(parents=True, exist_ok=True)
     log_entry = {
         "timestamp": datetime.now().isoformat(timespec="seconds"),
         "result": result,
         "action": action,
     }
-    with ATTEMPT_LOG.open("a", encoding="utf-8") as file:
+    if outcome is None:
+        code = classify_result(result)
+        outcome = Outcome(code=code) if code is not None else None
+    if outcome is not None:
+        log_entry["outcome"] = outcome.to_dict()
+        get_metrics().inc("olympos_robot_attempts_total", {"code": str(outcome.code)})
+    with attempt_log.open("a", encoding="utf-8") as file:
         file.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
@@ -0,0 +1,111 @@
+import json
+import os
+from functools import cache
+from pathlib import Path
+
+from atomic_write import atomic_write_json, atomic_write_text
+from work_dir import WORK_DIR
+
+METRICS_STATE_FILE = WORK_DIR / "metrics_state.json"
+METRICS_TEXTFILE = Path(os.environ.get("METRICS_TEXTFILE", WORK_DIR / "olympos_robot.prom"))
+
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "olympos_robot_runs_total": ("counter", "Robot runs by final status."),
+    "olympos_robot_attempts_total": ("counter", "Logged registration attempts by result code."),
+    "olympos_robot_retries_total": ("counter", "Lessons retried after an exception."),
+    "olympos_robot_logins_total": ("counter", "Sessions by login method: reused cookies or password login."),
+    "olympos_robot_detections_total": ("counter", "Logins refused as a robot, by the way the credentials were typed."),
+    "olympos_robot_negative_cache_total": ("counter", "Negative cache lookups of full or missing lessons, by hit or miss."),
+    "olympos_robot_last_run_timestamp_seconds": ("gauge", "Unix time the last run finished."),
+    "olympos_robot_phase_duration_seconds": ("gauge", "Seconds of the run budget used per phase in the last run."),
+    "olympos_robot_memory_megabytes": ("gauge", "Peak and steady-state resident memory of the robot and its browser in the last run."),
+    "olympos_robot_step_duration_seconds": ("histogram", "Duration of browser steps."),
+}
+
+
+def _label_key(labels: dict[str, str] | None) -> str:
+    return json.dumps(labels or {}, sort_keys=True)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms that persist between runs.
+
+    Values are updated in place as events happen and written as a Prometheus textfile at the end of a run,
+    so nothing has to be recomputed from the attempts log.
+    """
+
+    def __init__(self, state_file: Path = METRICS_STATE_FILE) -> None:
+        self.state_file = state_file
+        self.values: dict[str, dict[str, float]] = {}
+        self.histograms: dict[str, dict[str, dict]] = {}
+        if state_file.exists():
+            try:
+                with state_file.open(encoding="utf-8") as f:
+                    state = json.load(f)
+                self.values = state.get("values", {})
+                self.histograms = state.get("histograms", {})
+            except (OSError, json.JSONDecodeError):
+                # Counters restart from zero, which Prometheus handles as a counter reset
+                pass
+
+    def inc(self, name: str, labels: dict[str, str] | None = None, amount: float = 1) -> None:
+        series = self.values.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, labels: dict[str, str] | None = None) -> None:
+        self.values.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: dict[str, str] | None = None) -> None:
+        series = self.histograms.setdefault(name, {})
+        histogram = series.setdefault(_label_key(labels), {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+    def save(self) -> None:
+        atomic_write_json(self.state_file, {"values": self.values, "histograms": self.histograms})
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self.values.items()):
+            metric_type, help_text = HELP.get(name, ("untyped", name))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+            lines += [f"{name}{_format_labels(json.loads(key))} {value}" for key, value in sorted(series.items())]
+        for name, series in sorted(self.histograms.items()):
+            _, help_text = HELP.get(name, ("histogram", name))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, histogram in sorted(series.items()):
+                labels = json.loads(key)
+                # observe() counts a value in every bucket it fits in, so the buckets are already cumulative
+                for bound, count in zip(DURATION_BUCKETS, histogram["buckets"], strict=True):
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': str(bound)})} {count}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path = METRICS_TEXTFILE) -> None:
+        """Write the textfile for a node-exporter textfile collector. Written atomically, so it is never read half-written."""
+        atomic_write_text(path, self.render())
+
+
+@cache
+def get_metrics() -> Metrics:
+    """Metrics of this process, loaded on first use."""
+    return Metrics()
@@ -0,0 +1,99 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from atomic_write import atomic_write_json
+from log_attempt import Outcome, ResultCode
+from metrics import get_metrics
+from work_dir import WORK_DIR
+
+NEGATIVE_CACHE_FILE = WORK_DIR / "negative_cache.json"
+
+# How long an answer is trusted. A full lesson can get a free spot when someone cancels, a missing lesson rarely appears.
+DEFAULT_TTLS = {
+    ResultCode.ALREADY_FULL: timedelta(minutes=30),
+    ResultCode.NOT_FOUND: timedelta(hours=6),
+}
+# Before its booking window opens a lesson is not found either, so this is only remembered once the window is known to be open
+OPEN_WINDOW_CODES = frozenset({ResultCode.NOT_FOUND})
+
+
+def cache_key(lesson: dict) -> str:
+    """Key of a single occurrence of a lesson."""
+    return f"{lesson.get('lesson_type')}|{lesson.get('name')}|{lesson.get('datetime')}"
+
+
+class NegativeCache:
+    """
+    Remembers lesson occurrences that were full or not found, so later runs do not repeat the browser flow for them.
+
+    An entry is dropped when its TTL expires, or earlier when the booking window of the lesson (release_at) opened
+    after the entry was written, because then the answer is likely different. A lesson that was not found is only
+    remembered when its booking window opened before, without a known window it may simply not be open yet. Hits and misses are counted in the
+    cache file and in the metrics.
+    """
+
+    def __init__(self, cache_file: Path = NEGATIVE_CACHE_FILE, ttls: dict[ResultCode, timedelta] | None = None) -> None:
+        self.cache_file = cache_file
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.entries: dict[str, dict] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        if cache_file.exists():
+            try:
+                with cache_file.open(encoding="utf-8") as f:
+                    state = json.load(f)
+                self.entries = state.get("entries", {})
+                self.stats.update(state.get("stats", {}))
+            except (OSError, json.JSONDecodeError):
+                # Losing the cache only costs a run of the full flow per lesson
+                pass
+
+    def save(self, now: datetime | None = None) -> None:
+        now = now or datetime.now()
+        self.entries = {key: entry for key, entry in self.entries.items() if datetime.fromisoformat(entry["expires_at"]) > now}
+        atomic_write_json(self.cache_file, {"entries": self.entries, "stats": self.stats}, indent=2)
+
+    def add(self, lesson: dict, outcome: Outcome, now: datetime | None = None) -> None:
+        """Remember the outcome of the lesson, if it is one worth remembering."""
+        ttl = self.ttls.get(outcome.code)
+        if ttl is None:
+            return
+        now = now or datetime.now()
+        if outcome.code in OPEN_WINDOW_CODES and ("release_at" not in lesson or datetime.fromisoformat(lesson["release_at"]) > now):
+            return
+        self.entries[cache_key(lesson)] = {
+            "code": outcome.code.value,
+            "cached_at": now.isoformat(timespec="seconds"),
+            "expires_at": (now + ttl).isoformat(timespec="seconds"),
+        }
+
+    def remove(self, lesson: dict) -> None:
+        self.entries.pop(cache_key(lesson), None)
+
+    def lookup(self, lesson: dict, now: datetime | None = None) -> ResultCode | None:
+        """Cached outcome of the lesson, or None if it has to be tried."""
+        now = now or datetime.now()
+        key = cache_key(lesson)
+        entry = self.entries.get(key)
+        if entry is not None and not self._valid(entry, lesson, now):
+            del self.entries[key]
+            entry = None
+
+        self.stats["misses" if entry is None else "hits"] += 1
+        get_metrics().inc("olympos_robot_negative_cache_total", {"result": "miss" if entry is None else "hit"})
+        return None if entry is None else ResultCode(entry["code"])
+
+    @staticmethod
+    def _valid(entry: dict, lesson: dict, now: datetime) -> bool:
+        if datetime.fromisoformat(entry["expires_at"]) <= now:
+            return False
+        # Cheap availability check: a booking window that opened since the entry was written makes it outdated
+        if "release_at" in lesson:
+            release = datetime.fromisoformat(lesson["release_at"])
+            if datetime.fromisoformat(entry["cached_at"]) < release <= now:
+                return False
+        return True
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
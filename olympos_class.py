@@ -1,17 +1,32 @@
 import os
 import random
 import re
+import statistics
+from collections.abc import Callable
 from datetime import datetime
+from functools import wraps
 from pathlib import Path
-from time import sleep
-from typing import cast
+from time import perf_counter, sleep
+from typing import TypeVar, cast
 
-from playwright.sync_api import Locator, Page, expect
+from playwright.sync_api import Browser, BrowserContext, Locator, Page, expect
+from playwright.sync_api import Error as PlaywrightError
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError  # rename to avoid conflict with built-in TimeoutError
-from playwright_stealth import StealthConfig, stealth_sync  # type: ignore
 from robocorp import browser, log
 from robocorp.workitems import ApplicationException, BusinessException
 
+from adaptive_timeouts import AdaptiveTimeouts
+from atomic_write import atomic_write_json
+from browser_footprint import LEAN_BROWSER, ContextPool, launch_options
+from failure_artifacts import FailureArtifacts
+from har_replay import HAR_FILE, HAR_LATENCIES, HAR_MODES, record_context_kwargs, replay
+from humanized_typing import IN_PAGE_TYPING, TypingError, type_humanized
+from lesson_config import COURSE_DAY_MAP, DESCRIPTION_MAP, course_option_pattern
+from metrics import get_metrics
+from reservation_parser import parse_reservation_texts, reservation_text_pattern
+from run_budget import RunBudget, get_run_budget
+from stealth_bundle import apply_stealth
+
 
 def press_sequentially_random(locator: Locator, input_text: str, min_delay: int = 40, max_delay: int = 120):
     """
@@ -31,25 +46,251 @@ def press_sequentially_random(locator: Locator, input_text: str, min_delay: int
         sleep(max(0, delay_ms / 1000.0))
 
 
+StepMethod = TypeVar("StepMethod", bound=Callable)
+
+
+def step(name: str, job: bool = False) -> Callable[[StepMethod], StepMethod]:
+    """
+    Decorator for the steps of a run: a job may first get a fresh browser context, the run budget is checked, and a
+    failure is saved with its trace, screenshot and DOM.
+    """
+
+    def decorator(method: StepMethod) -> StepMethod:
+        @wraps(method)
+        def wrapper(self: "Olympos", *args, **kwargs):
+            if job:
+                self._next_job()
+            self._check_budget(name)
+            with self.failure_artifacts.capture(name, lambda: self.page):
+                return method(self, *args, **kwargs)
+
+        return cast(StepMethod, wrapper)
+
+    return decorator
+
+
 class Olympos:
     PLAYWRIGHT_AUTH_STATE_PATH = "work_directory/state.json"
-
-    def __init__(self, dummy_run: bool) -> None:
+    LOGIN_URL = "https://www.olympos.nl/inloggen"
+    TICKETS_URL = "https://www.olympos.nl/tickets"
+    GROUP_LESSONS_URL = "https://www.olympos.nl/groepslessen"
+    SHOPPING_CART_URL = "https://www.olympos.nl/bestellen/winkelwagen"
+    PRODUCTS_URL = "https://www.olympos.nl/mijn-actieve-producten"
+    PREFETCH_MAX_AGE = 30  # seconds a prefetched page may be used without reloading it
+
+    def __init__(
+        self,
+        dummy_run: bool,
+        timeouts: AdaptiveTimeouts | None = None,
+        cdp_url: str | None = None,
+        har_mode: str | None = None,
+        har_path: Path = HAR_FILE,
+        har_latency: str = "zero",
+        budget: RunBudget | None = None,
+        lean: bool = LEAN_BROWSER,
+        failure_artifacts: FailureArtifacts | None = None,
+        in_page_typing: bool = IN_PAGE_TYPING,
+    ) -> None:
+        if har_mode and har_mode not in HAR_MODES:
+            raise ValueError(f"Invalid HAR mode {har_mode}, expected one of {', '.join(HAR_MODES)}.")
+        if har_latency not in HAR_LATENCIES:
+            raise ValueError(f"Invalid HAR latency {har_latency}, expected one of {', '.join(HAR_LATENCIES)}.")
         self.dummy_run: bool = dummy_run
         self.page: Page | None = None
+        self.timeouts: AdaptiveTimeouts = timeouts if timeouts is not None else AdaptiveTimeouts()
+        self.budget: RunBudget = budget if budget is not None else get_run_budget()
+        self.cdp_url: str | None = cdp_url  # e.g. http://localhost:9222 for a Chrome started with --remote-debugging-port=9222
+        self.har_mode: str | None = har_mode  # "record" the traffic of this run to har_path, or "replay" it from there
+        self.har_path: Path = har_path
+        self.har_latency: str = har_latency  # "zero" or "original" latency when replaying
+        self._prefetched: dict[str, tuple[Page, float]] = {}  # url -> (background tab, moment navigation started)
+        self.login_method: str | None = None  # "cookies" or "password", once logged in
+        self.lean: bool = lean  # launch with the lean options of browser_footprint
+        self.context_pool: ContextPool | None = None  # only for a browser of our own
+        self._browser: Browser | None = None  # the browser launched by the robot, not an attached one
+        self.failure_artifacts: FailureArtifacts = failure_artifacts if failure_artifacts is not None else FailureArtifacts()
+        self.in_page_typing: bool = in_page_typing  # type in one call to the page instead of with trusted key presses
+
+    def _timeout(self, step: str, default_ms: float, minimum_ms: float = 0, maximum_ms: float = 60000) -> float:
+        """Adaptive timeout for the step, shortened when the run budget is running out."""
+        return self.budget.timeout_ms(self.timeouts.timeout(step, default_ms, minimum_ms=minimum_ms, maximum_ms=maximum_ms), minimum_ms=minimum_ms)
+
+    def _check_budget(self, step: str) -> None:
+        """Refuse to start a step when the run budget is used up, otherwise shorten the default timeout to what is left."""
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+        if self.budget.exhausted():
+            raise ApplicationException(code="RUN_BUDGET_EXHAUSTED", message=f"No run budget left for {step}.")
+        self.page.set_default_timeout(self._timeout("navigation", 60000, minimum_ms=10000))
 
     def _start(self) -> None:
-        """Start the Olympos browser."""
-        if Path(self.PLAYWRIGHT_AUTH_STATE_PATH).exists():
-            self.page = browser.context(storage_state=self.PLAYWRIGHT_AUTH_STATE_PATH).new_page()
+        """Start the Olympos browser, or attach to an already running one if a CDP url is set."""
+        start = perf_counter()
+        # Recording and replaying need a context of our own
+        page = self._attach_over_cdp() if self.cdp_url and not self.har_mode else None
+        step = "browser_attach"
+        if page is None:
+            page = self._launch()
+            step = "browser_launch"
+        self.timeouts.record(step, (perf_counter() - start) * 1000)
+        self._log_browser_startup(step)
+
+        with self.timeouts.measure("navigation"):
+            page.goto(self.LOGIN_URL)
+        page.set_default_timeout(self._timeout("navigation", 60000, minimum_ms=10000))
+        self.page = page
+
+    def _launch(self) -> Page:
+        """Launch a fresh browser, reusing the saved cookies if there are any."""
+        self._browser = self._launch_browser()
+        # A recorded HAR belongs to one context, so keep that one for the whole run
+        self.context_pool = ContextPool(self._new_context, max_jobs=0, max_rss_mb=0) if self.har_mode == "record" else ContextPool(self._new_context)
+        self.context_pool.before_recycle = self._before_recycle
+        page = self._new_page(self.context_pool.context())
+        self.context_pool.monitor.sample()
+        return page
+
+    def _launch_browser(self) -> Browser:
+        """Launch Chromium with the footprint options, which robocorp's browser() does not take."""
+        chromium = browser.playwright().chromium
+        options = launch_options(lean=self.lean)
+        try:
+            return chromium.launch(**options)
+        except PlaywrightError as e:
+            if "executable doesn't exist" not in e.message.lower():
+                raise
+        # Like robocorp.browser, install the browser when it is missing
+        log.info("Browser not installed, installing it.")
+        browser.install("chromium")
+        return chromium.launch(**options)
+
+    def _new_context(self) -> BrowserContext:
+        if self._browser is None:
+            raise ApplicationException(code="BROWSER_NOT_LAUNCHED", message="No browser of our own to open a context in.")
+        context_kwargs = {"storage_state": self.PLAYWRIGHT_AUTH_STATE_PATH} if Path(self.PLAYWRIGHT_AUTH_STATE_PATH).exists() else {}
+        if self.har_mode == "record":
+            context_kwargs.update(record_context_kwargs(self.har_path))
+        context = self._browser.new_context(**context_kwargs)
+        if self.har_mode == "replay":
+            replay(context, self.har_path, latency=self.har_latency)
+        apply_stealth(context)
+        self.failure_artifacts.start(context)
+        return context
+
+    def _new_page(self, context: BrowserContext) -> Page:
+        # The stealth patches are registered on the context
+        return context.new_page()
+
+    def _before_recycle(self, context: BrowserContext) -> None:
+        """Carry the session over to the next context. Prefetched tabs close with the old one."""
+        atomic_write_json(Path(self.PLAYWRIGHT_AUTH_STATE_PATH), context.storage_state())
+        self._prefetched.clear()
+
+    def _next_job(self) -> None:
+        """Start a registration in a fresh context when the current one has done enough work or the browser grew too large."""
+        if self.context_pool is None or self.page is None:
+            return
+        context = self.context_pool.acquire()
+        if context is not self.page.context:
+            log.info(f"Recycled the browser context (recycle {self.context_pool.recycles}).")
+            self.page = self._new_page(context)
+
+    def close(self) -> None:
+        """Close the browser launched by the robot, writing a recorded HAR. An attached browser is left running."""
+        if self.context_pool is not None:
+            self.context_pool.close()
+        if self._browser is None and self.page is not None:
+            # The attached browser keeps running, without our trace recording
+            self.failure_artifacts.stop(self.page.context)
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+
+    def _attach_over_cdp(self) -> Page | None:
+        """Attach to a running browser over the Chrome DevTools Protocol. Returns None if no browser is reachable."""
+        try:
+            cdp_browser = browser.playwright().chromium.connect_over_cdp(cast(str, self.cdp_url), timeout=5000)
+        except PlaywrightError:
+            log.warn(f"No browser reachable at {self.cdp_url}, launching a new one.")
+            return None
+
+        context: BrowserContext = cdp_browser.contexts[0] if cdp_browser.contexts else cdp_browser.new_context()
+        # Also for pages that are already open, from their next navigation on
+        apply_stealth(context)
+        self.failure_artifacts.start(context)
+        # Reuse a page that is already open on Olympos
+        for page in context.pages:
+            if page.url.startswith("https://www.olympos.nl"):
+                return page
+        return context.new_page()
+
+    def _log_browser_startup(self, step: str) -> None:
+        startup_ms = self.timeouts.history[step][-1]
+        launch_history = self.timeouts.history.get("browser_launch", [])
+        if step == "browser_attach" and launch_history:
+            launch_ms = statistics.median(launch_history)
+            log.info(f"Attached to browser in {startup_ms:.0f} ms, saving {launch_ms - startup_ms:.0f} ms compared to a launch ({launch_ms:.0f} ms median).")
         else:
-            self.page = browser.context().new_page()
+            log.info(f"Browser ready in {startup_ms:.0f} ms ({step}).")
+
+    def _goto(self, url: str, max_age: float = PREFETCH_MAX_AGE) -> None:
+        """
+        Navigate to the url, recording the latency for the adaptive timeouts.
+
+        If the url was prefetched, its tab becomes the current page instead and the previous page is closed. It is
+        reloaded when it was loaded more than max_age seconds ago, which is still faster than a cold navigation.
+        """
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+
+        tab, loaded_at = self._prefetched.pop(url, (None, 0.0))
+        if tab is None or tab.is_closed():
+            with self.timeouts.measure("navigation"):
+                self.page.goto(url)
+            return
 
-        config = StealthConfig(navigator_user_agent=False)
-        stealth_sync(self.page, config)
+        with self.timeouts.measure("navigation_prefetched"):
+            if perf_counter() - loaded_at > max_age:
+                tab.reload()
+            else:
+                tab.wait_for_load_state()
+        tab.set_default_timeout(self._timeout("navigation", 60000, minimum_ms=10000))
+        tab.bring_to_front()
+        previous, self.page = self.page, tab
+        previous.close()
+
+    def prefetch(self, urls: list[str]) -> None:
+        """
+        Open background tabs for pages that will be needed later.
+
+        Only the start of each navigation is awaited, the pages finish loading while the robot continues in the current page.
+        """
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
 
-        self.page = browser.goto(url="https://www.olympos.nl/inloggen")
-        self.page.set_default_timeout(60000)
+        for url in urls:
+            if url in self._prefetched:
+                continue
+            tab = self.page.context.new_page()
+            try:
+                tab.goto(url, wait_until="commit")
+            except PlaywrightError as e:
+                # Prefetching is only an optimization, the page is loaded the normal way later on
+                log.warn(f"Prefetching {url} failed: {e}")
+                tab.close()
+                continue
+            self._prefetched[url] = (tab, perf_counter())
+        self.page.bring_to_front()
+
+    def prefetch_urls(self, lessons: list[dict]) -> list[str]:
+        """Pages needed to register into the lessons."""
+        urls = []
+        if any(lesson.get("lesson_type") == "COURSE" for lesson in lessons):
+            urls.append(self.TICKETS_URL)
+        if any(lesson.get("lesson_type") == "GROUPLESSON" for lesson in lessons):
+            urls.append(self.GROUP_LESSONS_URL)
+        # Not the shopping cart: it changes when something is added, so complete_shopping_cart always loads it fresh
+        return urls
 
     def _login(self) -> None:
         if self.page is None:
@@ -60,32 +301,57 @@ class Olympos:
 
         # weiger olympos cookies
         try:
-            expect(self.page.get_by_role("button", name="Weigeren")).to_be_visible(timeout=5000)
+            with self.timeouts.measure("cookie_banner"):
+                expect(self.page.get_by_role("button", name="Weigeren")).to_be_visible(timeout=self._timeout("cookie_banner", 5000, minimum_ms=1000, maximum_ms=10000))
             self.page.get_by_role("button", name="Weigeren").click()
         except AssertionError:
             pass
 
         # login
         sleep(0.5)
-        press_sequentially_random(self.page.get_by_role("textbox", name="E-mailadres"), olympos_username)
+        self._type(self.page.get_by_role("textbox", name="E-mailadres"), olympos_username)
         sleep(0.5)
-        press_sequentially_random(self.page.get_by_role("textbox", name="Wachtwoord"), olympos_password)
+        self._type(self.page.get_by_role("textbox", name="Wachtwoord"), olympos_password)
         sleep(0.5)
-        with self.page.expect_navigation():
-            self.page.get_by_role("button", name="Inloggen").click()
-
         try:
-            expect(self.page.get_by_role("heading", name="Mijn producten")).to_be_visible()
+            with self.timeouts.measure("login"):
+                with self.page.expect_navigation():
+                    self.page.get_by_role("button", name="Inloggen").click()
+                expect(self.page.get_by_role("heading", name="Mijn producten")).to_be_visible()
         except AssertionError as e:
             if self.page.get_by_role("alert").filter(has_text="robot").is_visible():
+                get_metrics().inc("olympos_robot_detections_total", {"typing": "in_page" if self.in_page_typing else "trusted"})
                 raise BusinessException(code="ROBOT_DETECTED", message="Robot detected.") from e
             raise ApplicationException(code="LOGIN_FAILED", message="Login failed.") from e
 
         # save cookies to login automatically next time
-        self.page.context.storage_state(path=self.PLAYWRIGHT_AUTH_STATE_PATH)
+        self._save_auth_state()
+
+    def _type(self, locator: Locator, text: str) -> None:
+        """
+        Type like a human, pressing each key through Playwright. With in-page typing, in one call to the page instead,
+        falling back to the key presses if the page does not take it.
+        """
+        if not self.in_page_typing:
+            press_sequentially_random(locator, text)
+            return
+        try:
+            report = type_humanized(locator, text)
+        except TypingError:
+            log.warn("Typing in the page failed, pressing the keys one by one instead.")
+            locator.fill("")
+            press_sequentially_random(locator, text)
+            return
+        log.info(report.summary())
 
-    def start_and_login(self) -> None:
-        """Go to Olympos web page and log in."""
+    def _save_auth_state(self) -> None:
+        """Save the cookies. Playwright writes the file in place, so take the state and write it atomically instead."""
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+        atomic_write_json(Path(self.PLAYWRIGHT_AUTH_STATE_PATH), self.page.context.storage_state())
+
+    def start_and_login(self, prefetch_urls: list[str] | None = None) -> None:
+        """Go to Olympos web page and log in. Afterwards the prefetch urls are loaded in background tabs."""
         self._start()
         self.page = cast(Page, self.page)  # tell pyright that page is not None
 
@@ -93,13 +359,24 @@ class Olympos:
             # Already logged in due to cookies?
             expect(self.page.get_by_role("heading", name="Mijn producten")).to_be_visible()
             # if so, save current cookies again in case they have changed
-            self.page.context.storage_state(path=self.PLAYWRIGHT_AUTH_STATE_PATH)
+            self._save_auth_state()
+            self.login_method = "cookies"
         except AssertionError:
             log.info("Not logged in, trying to log in...")
             with log.suppress_variables():
                 self._login()
+            self.login_method = "password"
+        get_metrics().inc("olympos_robot_logins_total", {"method": self.login_method})
 
         log.info("Browser succesfully started and logged in.")
+        if prefetch_urls:
+            self.prefetch(prefetch_urls)
+
+    def keep_alive(self) -> None:
+        """Keep the browser's connections to Olympos warm with a HEAD request from within the page."""
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+        self.page.evaluate("url => fetch(url, {method: 'HEAD', credentials: 'include'}).then(() => null, () => null)", "https://www.olympos.nl/")
 
     def _get_env(self, var: str) -> str:
         value: str | None = os.getenv(var)
@@ -107,20 +384,17 @@ class Olympos:
             raise ValueError(f"Please set env variable {var}")
         return value
 
-    def register_into_course(self, name: str, lesson_datetime: datetime) -> str:
-        """Register into a course."""
+    @step("course registration", job=True)
+    def register_into_course(self, name: str, lesson_datetime: datetime, description: str | None = None, option_pattern: str | None = None) -> str:
+        """Register into a course. Description and option pattern are taken from the lesson plan when given."""
         if self.page is None:
             raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
 
-        self.page.goto("https://www.olympos.nl/tickets")
-
-        description_map = {
-            "AERIAL ACROBATIEK": "Aerial acrobatiek",
-            "POLESPORTS": "Polesports",
-            "CHEERLEADING": "Cheerleading",
-        }
+        self._goto(self.TICKETS_URL)
 
-        button = self.page.get_by_role("link", name=f"Bestel nu Cursus {description_map.get(name, name)}")
+        if description is None:
+            description = DESCRIPTION_MAP.get(name, name)
+        button = self.page.get_by_role("link", name=f"Bestel nu Cursus {description}")
         # extra wait until enabled. Default actionability checks or to_be_enabled() do not work here.
         expect(button).not_to_have_class(re.compile(r".*\bdisabled\b.*"))
         button.click()
@@ -129,10 +403,11 @@ class Olympos:
         sleep(0.5)
 
         # Flexibly match course option using name and weekday abbreviation from lesson_datetime
-        day_map = {0: "ma", 1: "di", 2: "we", 3: "do", 4: "vr", 5: "za", 6: "zo"}
-        weekday_abbr = day_map[lesson_datetime.weekday()]
-        # Build regex pattern to match course name and weekday abbreviation (do not escape spaces)
-        pattern = re.compile(rf"{name}.*\b{weekday_abbr}\b.*", re.IGNORECASE)
+        weekday_abbr = COURSE_DAY_MAP[lesson_datetime.weekday()]
+        if option_pattern is None:
+            # Build regex pattern to match course name and weekday abbreviation (do not escape spaces)
+            option_pattern = rf"{name}.*\b{weekday_abbr}\b.*"
+        pattern = course_option_pattern(option_pattern)
         # Find all options in the combobox
         combobox = self.page.get_by_role("combobox", name="Inschrijven voor")
         options = combobox.locator("option").all()
@@ -159,18 +434,20 @@ class Olympos:
             log.info(comment)
             return comment
 
+        # Not verified: the reservation boxes on the products page only hold group lessons, a course is not among them
         self.complete_shopping_cart()
 
         comment = f"Registering into course {name} on {weekday_abbr}."
         log.info(comment)
         return comment
 
-    def register_into_group_lesson(self, name: str, time: str) -> None:
-        """Register into a group lesson."""
+    @step("group lesson registration", job=True)
+    def register_into_group_lesson(self, name: str, time: str, lesson_datetime: datetime | None = None) -> None:
+        """Register into a group lesson. With the datetime of the lesson, the booking is verified afterwards."""
         if self.page is None:
             raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
 
-        self.page.goto("https://www.olympos.nl/groepslessen")
+        self._goto(self.GROUP_LESSONS_URL)
 
         # Open select screen
         button = self.page.get_by_role("link", name="Reserveer nu Reserveren")
@@ -188,12 +465,15 @@ class Olympos:
         # select the right row/ exact lesson
         lesson = self.page.get_by_role("row").filter(has_text=re.compile(rf"^{re.escape(time)}.*"))
         try:
-            expect(lesson).to_be_visible()
+            with self.timeouts.measure("lesson_row"):
+                expect(lesson).to_be_visible()
         except AssertionError as e:
             raise BusinessException(code="LESSON_NOT_FOUND", message=f"{name} op {time} is niet aanwezig in de lijst.") from e
 
         try:
-            expect(lesson).not_to_have_class(re.compile(r".*\bdisabled\b.*"), timeout=500)  # if disabled, lesson is full
+            # if disabled, lesson is full. Timeout is learned from earlier checks, so a slow page is not mistaken for a full lesson
+            with self.timeouts.measure("lesson_row_enabled"):
+                expect(lesson).not_to_have_class(re.compile(r".*\bdisabled\b.*"), timeout=self._timeout("lesson_row_enabled", 500, minimum_ms=500, maximum_ms=5000))
         except AssertionError as e:
             raise BusinessException(code="LESSON_FULL", message=f"{name} op {time} is vol.") from e
 
@@ -209,14 +489,18 @@ class Olympos:
         log.info("Added to cart: group lesson %s at %s.", name, time)
 
         self.complete_shopping_cart()
+        if lesson_datetime is not None:
+            self.verify_booking({"name": name, "lesson_type": "GROUPLESSON", "datetime": lesson_datetime.isoformat()})
         log.info("Registered into group lesson %s at %s.", name, time)
 
     def complete_shopping_cart(self) -> None:
         """Complete the shopping cart."""
         if self.page is None:
             raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+        self._check_budget("checkout")
 
-        self.page.goto("https://www.olympos.nl/bestellen/winkelwagen")
+        # The cart changed since it was prefetched, so always reload it
+        self._goto(self.SHOPPING_CART_URL, max_age=0)
 
         # TODO: Check of item dubbel in winkelwagen voorkomt. Altijd 1 boeken en niet meer
 
@@ -224,52 +508,51 @@ class Olympos:
         # Click the label, because checkbox has overlay
         # Click on left top corner to avoid link in middle
         self.page.locator('label[for="ShoppingCartForm-UpdateHead-CONDITIONS"]').click(position={"x": 10, "y": 10})
-        self.page.get_by_role("button", name="Bestelling afronden").click()
-        expect(self.page.get_by_role("heading", name="Bedankt voor je bestelling!")).to_be_visible()
+        with self.timeouts.measure("checkout_confirmation"):
+            self.page.get_by_role("button", name="Bestelling afronden").click()
+            expect(self.page.get_by_role("heading", name="Bedankt voor je bestelling!")).to_be_visible(timeout=self._timeout("checkout_confirmation", 60000, minimum_ms=10000))
 
-    def scrape_registered_lessons(self) -> list[dict]:
-        """Scrape the registered lessons."""
+    def _reservation_boxes(self) -> Locator:
+        """The reservations on the products page."""
         if self.page is None:
             raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
-
-        if not self.page.url.startswith("https://www.olympos.nl/mijn-actieve-producten"):
-            self.page.goto("https://www.olympos.nl/mijn-actieve-producten")
-        expect(self.page.get_by_role("heading", name="Mijn producten")).to_be_visible()
-
         # Match group lesson boxes:
         # Anchor of group lesson boxes
         group_lesson_header = self.page.get_by_role("strong").get_by_text("Reserveren Groepsles")
         # Full group lesson box
         group_lesson_locator = group_lesson_header.locator("..").locator("..").filter(has_text="Reserveringen")
         # Actually interesting part of the box
-        group_lesson_geldigheid = group_lesson_locator.get_by_text("Geldigheid").locator("..")
-
-        group_lessons: list[dict] = []
-        for group_lesson in group_lesson_geldigheid.all():
-            group_lesson_text = group_lesson.get_by_role("definition").first.inner_text()
-            group_lessons.append(self.parse_group_lesson_text(group_lesson_text))
-
-        return group_lessons
-
-    @staticmethod
-    def parse_group_lesson_text(group_lesson_text: str) -> dict:
-        # Example input: "16 jun 2025 20:15 - 21:10 (POLESPORTS)"
-        pattern = r"(\d{1,2} \w+ \d{4}) (\d{2}:\d{2}) – (\d{2}:\d{2}) \((.+)\)"  # noqa: RUF001
-        match = re.match(pattern, group_lesson_text)
-        if not match:
-            raise ValueError(f"Could not parse group lesson text: {group_lesson_text}")
-
-        date_str, start_time, end_time, name = match.groups()
-        # Parse date and time
-        dt_start = datetime.strptime(f"{date_str} {start_time}", "%d %b %Y %H:%M")
-        # Get day as Dutch abbreviation (e.g., "Ma" for Monday)
-        day_map = {0: "Ma", 1: "Di", 2: "Wo", 3: "Do", 4: "Vr", 5: "Za", 6: "Zo"}
-        day = day_map[dt_start.weekday()]
-
-        return {
-            "name": name,
-            "lesson_type": "GROUPLESSON",
-            "day": day,
-            "time": start_time,
-            "datetime": dt_start.isoformat(),
-        }
+        return group_lesson_locator.get_by_text("Geldigheid").locator("..")
+
+    def verify_booking(self, lesson: dict) -> None:
+        """
+        Check that the group lesson just checked out shows up on the products page. Only that reservation is looked
+        for, the others are not read. Raises BusinessException REGISTRATION_UNVERIFIED when it does not show up.
+        """
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+        self._goto(self.PRODUCTS_URL, max_age=0)
+        booked = self._reservation_boxes().filter(has_text=reservation_text_pattern(lesson))
+        try:
+            with self.timeouts.measure("booking_verification"):
+                expect(booked.first).to_be_visible(timeout=self._timeout("booking_verification", 10000, minimum_ms=3000, maximum_ms=30000))
+        except AssertionError as e:
+            raise BusinessException(code="REGISTRATION_UNVERIFIED", message=f"Booking of {lesson['name']} not found on the products page.") from e
+        log.info(f"Booking of {lesson['name']} verified.")
+
+    @step("scrape")
+    def scrape_registered_lessons(self) -> list[dict]:
+        """Scrape the registered lessons."""
+        if self.page is None:
+            raise ApplicationException(code="PAGE_NOT_INITIALIZED", message="Page is not initialized. Please call start_and_login() first.")
+
+        if not self.page.url.startswith(self.PRODUCTS_URL):
+            self._goto(self.PRODUCTS_URL)
+        expect(self.page.get_by_role("heading", name="Mijn producten")).to_be_visible()
+
+        # Read all texts in one round trip and parse them in one pass
+        texts = self._reservation_boxes().evaluate_all("boxes => boxes.map(box => box.querySelector('dd, [role=definition]')?.innerText ?? '')")
+        parsed = parse_reservation_texts(texts)
+        for error in parsed.errors:
+            log.warn(f"Skipping reservation {error.index}: {error.error}")
+        return parsed.lessons
@@ -0,0 +1,94 @@
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from pathlib import Path
+from types import FrameType
+
+PROFILE_ENV = "OLYMPOS_PROFILE"
+
+
+def profiling_enabled(environ: Mapping[str, str] = os.environ) -> bool:
+    """
+    Profiling is switched on with OLYMPOS_PROFILE=1. Not with a command line flag, the robocorp.tasks command line
+    does not pass on arguments of its own to the task.
+    """
+    return environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    """Stack as 'outer;...;inner', the format flamegraph.pl and speedscope read."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class RunProfiler:
+    """
+    Profiles the thread that starts it, twice over:
+
+    - deterministic with cProfile, for exact call counts and Python-side cost (profile.prof, read with pstats or snakeviz)
+    - sampling the stack every interval, for wall-clock time including waits on the browser (profile.collapsed)
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._profile = cProfile.Profile()
+        self._stop = threading.Event()
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[collapse_stack(frame)] += 1
+
+    def start(self) -> None:
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self, output_dir: Path) -> list[Path]:
+        """Stop profiling and write the profile files to output_dir."""
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        profile_file = output_dir / "profile.prof"
+        self._profile.dump_stats(profile_file)
+        collapsed_file = output_dir / "profile.collapsed"
+        with collapsed_file.open("w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return [profile_file, collapsed_file]
+
+
+_active_profiler: RunProfiler | None = None
+
+
+def start_profiling() -> None:
+    global _active_profiler  # noqa: PLW0603
+    if _active_profiler is None:
+        _active_profiler = RunProfiler()
+        _active_profiler.start()
+
+
+def stop_profiling(output_dir: Path) -> list[Path]:
+    """Stop the profiler started by start_profiling, if any. Returns the written files."""
+    global _active_profiler  # noqa: PLW0603
+    if _active_profiler is None:
+        return []
+    files = _active_profiler.stop(output_dir)
+    _active_profiler = None
+    return files
@@ -0,0 +1,257 @@
+import argparse
+import bisect
+import html
+import json
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from generate_robot_attempts_html import HTML_FOOTER, HTML_STYLE, HTML_TABLE_HEADER, INPUT_FILE, render_row
+from log_attempt import ResultCode, entry_code
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORT_KEYS = {
+    "timestamp": lambda entry: entry.get("timestamp", ""),
+    "name": lambda entry: entry.get("action", {}).get("name", ""),
+    "type": lambda entry: entry.get("action", {}).get("lesson_type", ""),
+    "code": lambda entry: str(entry_code(entry) or ""),
+    "lesson_datetime": lambda entry: entry.get("action", {}).get("datetime", ""),
+}
+
+
+class AttemptIndex:
+    """
+    In-memory index of robot_attempts.jsonl.
+
+    The log is append-only, so after the first load only lines added since the previous request are read. Entries
+    keep the order of the file, which is chronological, so date ranges are found by bisecting the timestamps.
+    Name, type and result code each map to the positions of their entries.
+    """
+
+    def __init__(self, attempts_file: Path = INPUT_FILE) -> None:
+        self.attempts_file = attempts_file
+        self.entries: list[dict] = []
+        self.timestamps: list[str] = []
+        self.by_field: dict[str, dict[str, list[int]]] = {"name": {}, "type": {}, "code": {}}
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def _reset(self) -> None:
+        self.entries, self.timestamps, self._offset = [], [], 0
+        self.by_field = {"name": {}, "type": {}, "code": {}}
+
+    def _add(self, entry: dict) -> None:
+        position = len(self.entries)
+        self.entries.append(entry)
+        self.timestamps.append(entry.get("timestamp", ""))
+        action = entry.get("action", {})
+        for field, value in (("name", action.get("name")), ("type", action.get("lesson_type")), ("code", entry_code(entry))):
+            if value:
+                self.by_field[field].setdefault(str(value), []).append(position)
+
+    def refresh(self) -> None:
+        """Read the lines appended since the last refresh. A file that shrank was rotated or rewritten and is read again."""
+        with self._lock:
+            size = self.attempts_file.stat().st_size if self.attempts_file.exists() else 0
+            if size < self._offset:
+                self._reset()
+            if size == self._offset:
+                return
+            with self.attempts_file.open("rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+            # A line that is still being written is read on the next refresh
+            complete = data[: data.rfind(b"\n") + 1]
+            for line in complete.decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._add(json.loads(line))
+                except (json.JSONDecodeError, ValueError):
+                    continue
+            self._offset += len(complete)
+
+    def values(self, field: str) -> list[str]:
+        return sorted(self.by_field[field])
+
+    def query(
+        self,
+        name: str | None = None,
+        lesson_type: str | None = None,
+        code: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        sort: str = "timestamp",
+        descending: bool = True,
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> tuple[list[dict], int]:
+        """
+        Entries matching all given filters, sorted and paginated. Returns the page and the total number of matches.
+
+        since and until are ISO dates or timestamps, until is inclusive.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Invalid sort {sort}, expected one of {', '.join(SORT_KEYS)}.")
+        self.refresh()
+        with self._lock:
+            start = bisect.bisect_left(self.timestamps, since) if since else 0
+            # A date as until includes the whole day: "2025-06-16T99" sorts after every timestamp of that day
+            end = bisect.bisect_right(self.timestamps, until + "T99" if len(until) == 10 else until) if until else len(self.entries)
+            positions: list[int] | None = None
+            for field, value in (("name", name), ("type", lesson_type), ("code", code)):
+                if value:
+                    # Position lists are sorted, so the date range is a slice of them
+                    field_positions = self.by_field[field].get(value, [])
+                    in_range = field_positions[bisect.bisect_left(field_positions, start) : bisect.bisect_left(field_positions, end)]
+                    positions = in_range if positions is None else sorted(set(positions).intersection(in_range))
+            matches = [self.entries[position] for position in (range(start, end) if positions is None else positions)]
+
+        if sort == "timestamp":
+            # Already in file order
+            if descending:
+                matches.reverse()
+        else:
+            matches.sort(key=SORT_KEYS[sort], reverse=descending)
+        offset = (page - 1) * page_size
+        return matches[offset : offset + page_size], len(matches)
+
+
+def _param(params: dict[str, list[str]], key: str, default: str | None = None) -> str | None:
+    value = params.get(key, [""])[0].strip()
+    return value or default
+
+
+def parse_query(query_string: str) -> dict:
+    """Keyword arguments for AttemptIndex.query from a url query string."""
+    params = parse_qs(query_string)
+    return {
+        "name": _param(params, "name"),
+        "lesson_type": _param(params, "type"),
+        "code": _param(params, "code"),
+        "since": _param(params, "since"),
+        "until": _param(params, "until"),
+        "sort": _param(params, "sort", "timestamp"),
+        "descending": _param(params, "order", "desc") != "asc",
+        "page": max(1, int(_param(params, "page", "1"))),
+        "page_size": min(MAX_PAGE_SIZE, max(1, int(_param(params, "page_size", str(DEFAULT_PAGE_SIZE))))),
+    }
+
+
+def _select(name: str, options: list[str], selected: str | None, include_all: bool = True) -> str:
+    rendered = [f'<option value=""{"" if selected else " selected"}>all</option>'] if include_all else []
+    rendered += [f"<option{' selected' if option == selected else ''}>{html.escape(option)}</option>" for option in options]
+    return f'<select name="{name}">{"".join(rendered)}</select>'
+
+
+def render_page(index: AttemptIndex, query: dict) -> str:
+    rows, total = index.query(**query)
+    codes = [str(code) for code in ResultCode]
+    since, until = html.escape(query["since"] or ""), html.escape(query["until"] or "")
+    form = f"""    <form method="get">
+        Name {_select("name", index.values("name"), query["name"])}
+        Type {_select("type", index.values("type"), query["lesson_type"])}
+        Result {_select("code", codes, query["code"])}
+        From <input type="date" name="since" value="{since}">
+        To <input type="date" name="until" value="{until}">
+        Sort {_select("sort", list(SORT_KEYS), query["sort"], include_all=False)}
+        {_select("order", ["desc", "asc"], "desc" if query["descending"] else "asc", include_all=False)}
+        <button type="submit">Filter</button>
+    </form>
+"""
+    last_page = max(1, -(-total // query["page_size"]))
+    params = {
+        key: value for key, value in {"name": query["name"], "type": query["lesson_type"], "code": query["code"], "since": query["since"], "until": query["until"]}.items() if value
+    }
+    params |= {"sort": query["sort"], "order": "desc" if query["descending"] else "asc", "page_size": query["page_size"]}
+    links = []
+    if query["page"] > 1:
+        links.append(f'<a href="?{html.escape(urlencode({**params, "page": query["page"] - 1}))}">previous</a>')
+    if query["page"] < last_page:
+        links.append(f'<a href="?{html.escape(urlencode({**params, "page": query["page"] + 1}))}">next</a>')
+    pager = f"    <p>{total} attempts, page {query['page']} of {last_page} {' '.join(links)}</p>\n"
+    head = f'<!DOCTYPE html>\n<html lang="en">\n<head>\n    <meta charset="UTF-8">\n    <title>Robot Attempts</title>\n{HTML_STYLE}</head>\n<body>\n    <h1>Robot Attempts</h1>\n'
+    return head + form + pager + HTML_TABLE_HEADER + "\n".join(render_row(row) for row in rows) + "\n" + HTML_FOOTER
+
+
+def make_handler(index: AttemptIndex) -> type[BaseHTTPRequestHandler]:
+    # Failure artifacts are linked relative to the attempts log
+    artifacts_dir = (index.attempts_file.parent / "failures").resolve()
+
+    class ReportHandler(BaseHTTPRequestHandler):
+        def _send_artifact(self, url_path: str) -> None:
+            artifact = (artifacts_dir.parent / url_path.lstrip("/")).resolve()
+            if not artifact.is_relative_to(artifacts_dir) or not artifact.is_file():
+                self.send_error(404)
+                return
+            content_type, encoding = mimetypes.guess_type(artifact.name)
+            # dom.html.gz is downloaded as it is
+            content_type = "application/gzip" if encoding == "gzip" else content_type or "application/octet-stream"
+            data = artifact.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path.startswith("/failures/"):
+                self._send_artifact(url.path)
+                return
+            try:
+                query = parse_query(url.query)
+                if url.path == "/api/attempts":
+                    rows, total = index.query(**query)
+                    body = json.dumps({"total": total, "page": query["page"], "page_size": query["page_size"], "attempts": rows}, ensure_ascii=False)
+                    content_type = "application/json"
+                elif url.path == "/":
+                    body = render_page(index, query)
+                    content_type = "text/html"
+                else:
+                    self.send_error(404)
+                    return
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            encoded = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(encoded)))
+            self.end_headers()
+            self.wfile.write(encoded)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return ReportHandler
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, attempts_file: Path = INPUT_FILE) -> ThreadingHTTPServer:
+    index = AttemptIndex(attempts_file)
+    index.refresh()
+    return ThreadingHTTPServer((host, port), make_handler(index))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the robot attempts with filtering, sorting and pagination")
+    parser.add_argument("--host", default="127.0.0.1", help="Only reachable from this machine by default")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--attempts-file", type=Path, default=INPUT_FILE)
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.attempts_file)
+    print(f"[INFO] Serving robot attempts on http://{args.host}:{server.server_address[1]}/ (JSON at /api/attempts)")  # noqa: T201
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
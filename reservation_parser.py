@@ -0,0 +1,93 @@
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from lesson_config import DAYS, DESCRIPTION_MAP
+
+# Dutch month names by their first three letters, so "mrt", "maart" and "mei" all work without depending on the locale
+DUTCH_MONTHS = {
+    "jan": 1,
+    "feb": 2,
+    "mrt": 3,
+    "maa": 3,
+    "apr": 4,
+    "mei": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "okt": 10,
+    "nov": 11,
+    "dec": 12,
+}
+
+# Examples (the site uses an en dash between the times):
+# group lesson: "16 jun 2025 20:15 - 21:10 (POLESPORTS)"
+# course: "15 dec 2025 20:00 - 21:00 (Cursus Cheerleading)", the date being the last lesson of the course
+RESERVATION_PATTERN = re.compile(
+    r"^\s*(?P<day>\d{1,2}) (?P<month>[a-z]+)\.? (?P<year>\d{4}) (?P<start>\d{2}:\d{2})\s*[-–]\s*(?P<end>\d{2}:\d{2}) \((?P<course>Cursus )?(?P<name>.+)\)\s*$",  # noqa: RUF001
+    re.IGNORECASE,
+)
+LESSON_NAMES = {description.lower(): name for name, description in DESCRIPTION_MAP.items()}
+MONTH_ABBREVIATIONS = {month: [abbreviation for abbreviation, number in DUTCH_MONTHS.items() if number == month] for month in range(1, 13)}
+
+
+@dataclass(frozen=True)
+class ParseError:
+    index: int  # position of the text in the batch
+    text: str
+    error: str
+
+
+@dataclass
+class ParsedReservations:
+    lessons: list[dict] = field(default_factory=list)
+    errors: list[ParseError] = field(default_factory=list)
+
+
+def parse_reservation_text(text: str) -> dict:
+    """Parse one reservation text into a lesson. Raises ValueError if it cannot be parsed."""
+    match = RESERVATION_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Could not parse reservation text: {text}")
+
+    month = DUTCH_MONTHS.get(match["month"][:3].lower())
+    if month is None:
+        raise ValueError(f"Unknown month {match['month']} in reservation text: {text}")
+    hour, minute = map(int, match["start"].split(":"))
+    start = datetime(int(match["year"]), month, int(match["day"]), hour, minute)
+
+    name = match["name"].strip()
+    if match["course"]:
+        lesson_type = "COURSE"
+        name = LESSON_NAMES.get(name.lower(), name.upper())
+    else:
+        lesson_type = "GROUPLESSON"
+    return {
+        "name": name,
+        "lesson_type": lesson_type,
+        "day": DAYS[start.weekday()],
+        "time": match["start"],
+        "datetime": start.isoformat(),
+    }
+
+
+def reservation_text_pattern(lesson: dict) -> re.Pattern:
+    """
+    Pattern for the reservation text of a group lesson, matching date, time and name, to find that one reservation
+    without parsing all of them.
+    """
+    start = datetime.fromisoformat(lesson["datetime"])
+    months = "|".join(MONTH_ABBREVIATIONS[start.month])
+    return re.compile(rf"\b0?{start.day} (?:{months})[a-z]*\.? {start.year} {start:%H:%M}\s*[-–].*\({re.escape(lesson['name'])}\)", re.IGNORECASE)  # noqa: RUF001
+
+
+def parse_reservation_texts(texts: list[str]) -> ParsedReservations:
+    """Parse all texts of a scrape in one pass. Texts that cannot be parsed are reported in errors instead of failing the batch."""
+    result = ParsedReservations()
+    for index, text in enumerate(texts):
+        try:
+            result.lessons.append(parse_reservation_text(text))
+        except ValueError as e:
+            result.errors.append(ParseError(index, text, str(e)))
+    return result
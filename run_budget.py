@@ -0,0 +1,82 @@
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+
+import psutil
+
+# Task Scheduler stops the robot after 10 minutes. The budget ends earlier, so saving state and the teardown still fit.
+RUN_BUDGET_SECONDS = float(os.environ.get("RUN_BUDGET_SECONDS", "540"))
+# Time kept free at the end of the budget for saving state and the teardown
+SHUTDOWN_RESERVE_SECONDS = 20
+
+
+class RunBudget:
+    """
+    Deadline for a whole run, counted from the start of the process.
+
+    Steps ask for their timeout through `timeout_ms`, which shrinks as the deadline comes closer, and optional work
+    checks `can_afford` first. Time spent per phase is recorded for the report at the end of the run.
+    """
+
+    def __init__(self, total_seconds: float = RUN_BUDGET_SECONDS, started_at: float | None = None, clock: Callable[[], float] = time.time) -> None:
+        self.total_seconds = total_seconds
+        self.started_at = psutil.Process().create_time() if started_at is None else started_at
+        self.clock = clock
+        self.phases: dict[str, float] = {}
+
+    @property
+    def deadline(self) -> float:
+        return self.started_at + self.total_seconds
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started_at
+
+    def remaining(self) -> float:
+        """Seconds left for work, the shutdown reserve excluded."""
+        return max(0.0, self.deadline - SHUTDOWN_RESERVE_SECONDS - self.clock())
+
+    def exhausted(self) -> bool:
+        return self.remaining() <= 0
+
+    def can_afford(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def timeout_ms(self, timeout_ms: float, minimum_ms: float = 1000) -> float:
+        """The timeout, shortened to what is left of the budget, but not below minimum_ms (or the timeout itself when that is shorter)."""
+        return min(timeout_ms, max(minimum_ms, self.remaining() * 1000))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to the phase, also when the block fails."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + self.clock() - start
+
+    def report(self) -> dict:
+        elapsed = self.elapsed()
+        # Python startup, imports and anything else outside a phase
+        phases = {**self.phases, "other": max(0.0, elapsed - sum(self.phases.values()))}
+        return {
+            "budget_seconds": self.total_seconds,
+            "elapsed_seconds": round(elapsed, 3),
+            "phases": {name: {"seconds": round(seconds, 3), "budget_share": round(seconds / self.total_seconds, 3)} for name, seconds in phases.items()},
+        }
+
+    def write_report(self, report_file: Path) -> dict:
+        report = self.report()
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        with report_file.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+@cache
+def get_run_budget() -> RunBudget:
+    """Budget of the current run."""
+    return RunBudget()
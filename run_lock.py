@@ -0,0 +1,62 @@
+import os
+import time
+from pathlib import Path
+
+import psutil
+
+RUN_LOCK_FILE = Path("work_directory/run.lock")
+# Held by the whole pipeline, the robot and the archiving of its output directory
+PIPELINE_LOCK_FILE = Path("work_directory/pipeline.lock")
+
+
+class RunLock:
+    """
+    Exclusive lock based on a lock file holding the pid of the owner.
+
+    A lock left behind by a process that is no longer running (e.g. killed by Task Scheduler) is taken over.
+    """
+
+    # A lock file without pid is only trusted this long, the owner may still be writing its pid
+    UNWRITTEN_GRACE_SECONDS = 10
+
+    def __init__(self, path: Path = RUN_LOCK_FILE) -> None:
+        self.path = path
+        self.acquired = False
+
+    def _owner_alive(self) -> bool:
+        try:
+            content = self.path.read_text().strip()
+            age = time.time() - self.path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if not content.isdigit():
+            return age < self.UNWRITTEN_GRACE_SECONDS
+        return psutil.pid_exists(int(content))
+
+    def acquire(self) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._owner_alive():
+                    return False
+                self.path.unlink(missing_ok=True)  # stale lock
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            self.acquired = True
+            return True
+        return False
+
+    def release(self) -> None:
+        if self.acquired:
+            self.path.unlink(missing_ok=True)
+            self.acquired = False
+
+    def __enter__(self) -> "RunLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
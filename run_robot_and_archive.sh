@@ -0,0 +1,10 @@
+#!/bin/sh
+# Linux/macOS counterpart of run_robot_and_archive.cmd
+cd "$(dirname "$0")" || exit 1
+
+# Runs the robot and archives its output to logs, under one lock so overlapping runs do not touch each other's output
+echo "[INFO] Running robot and archiving output to logs..."
+uv run python scheduler.py --once
+echo "[INFO] Robot run complete."
+
+echo "[SUCCESS] All done."
@@ -0,0 +1,66 @@
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+
+from robocorp import log
+
+from atomic_write import WriteCoalescer, atomic_write_json
+from log_attempt import FAILURE_CODES, Outcome
+from work_dir import WORK_DIR
+
+RUN_STATE_FILE = WORK_DIR / "run_state.json"
+
+
+@dataclass
+class RunState:
+    """
+    Everything a run needs to know about earlier runs, in one small file that is read once at startup.
+
+    Only today's failure counter is kept instead of the attempts history, so the file does not grow over time.
+    Changes are made in memory and written with save, which replaces the whole file at once.
+    """
+
+    registrations: list[dict] = field(default_factory=list)
+    last_scrape: str | None = None  # ISO date
+    failures: dict = field(default_factory=dict)  # {"date": ISO date, "count": failures on that date}
+    session: dict = field(default_factory=dict)  # login method and time of the last session
+
+    @classmethod
+    def load(cls, state_file: Path = RUN_STATE_FILE) -> "RunState":
+        """Read the snapshot. A damaged file is replaced by a fresh state on the next save instead of ending every run."""
+        try:
+            with state_file.open(encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except (json.JSONDecodeError, TypeError) as e:
+            log.warn(f"Run state {state_file} is damaged ({e}), starting with a fresh one.")
+            return cls()
+
+    def save(self, state_file: Path = RUN_STATE_FILE, coalescer: WriteCoalescer | None = None) -> None:
+        """Write the snapshot. With a coalescer the write is postponed until it flushes."""
+        if coalescer is not None:
+            coalescer.write_json(state_file, asdict(self), indent=2)
+        else:
+            atomic_write_json(state_file, asdict(self), indent=2)
+
+    def failures_on(self, day: date) -> int:
+        return self.failures.get("count", 0) if self.failures.get("date") == day.isoformat() else 0
+
+    def count_outcome(self, outcome: Outcome, day: date) -> None:
+        """Count the outcome towards the failures of the day, if it is a failure."""
+        if outcome.code in FAILURE_CODES:
+            self.failures = {"date": day.isoformat(), "count": self.failures_on(day) + 1}
+
+    def should_scrape(self, day: date, interval_days: int = 1) -> bool:
+        """True when the last full scrape is interval_days or more ago, or a scrape was requested."""
+        return self.last_scrape is None or (day - date.fromisoformat(self.last_scrape)).days >= interval_days
+
+    def request_scrape(self) -> None:
+        """Scrape on the next occasion, e.g. because a booking could not be verified."""
+        self.last_scrape = None
+
+    def mark_scraped(self, day: date) -> None:
+        self.last_scrape = day.isoformat()
+
+    def mark_session(self, login_method: str, now: datetime) -> None:
+        self.session = {"login": login_method, "started_at": now.isoformat(timespec="seconds")}
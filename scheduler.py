@@ -0,0 +1,111 @@
+import argparse
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fill_analytics import FillAnalytics, with_estimated_windows
+from lesson_config import LESSON_CONFIG_FILE, load_lessons
+from run_lock import PIPELINE_LOCK_FILE, RunLock
+from tasks import determine_next_datetime
+
+SCHEDULER_LOCK_FILE = Path("work_directory/scheduler.lock")
+RUN_COMMAND = [sys.executable, "-m", "robocorp.tasks", "run", "tasks.py", "-t", "main"]
+ARCHIVE_COMMAND = [sys.executable, "archive_run.py", "archive"]
+
+# Start this long before a booking window opens, so interpreter, browser and login are done before the release.
+# The run itself waits for the exact release (see MAX_RELEASE_WAIT_SECONDS, which must be longer).
+LEAD_TIME = timedelta(seconds=120)
+# Lessons without a known booking window are tried this often
+RUN_INTERVAL = timedelta(hours=1)
+# Longest single sleep, so a suspended machine or a changed clock is noticed soon after
+MAX_SLEEP = 60
+
+
+def upcoming_releases(lessons: list[dict], now: datetime, resolve_datetime: Callable[[dict], str] = determine_next_datetime) -> list[tuple[datetime, dict]]:
+    """Next moment the booking window opens for each lesson with opens_before_hours, soonest first."""
+    releases = []
+    for lesson in lessons:
+        if "opens_before_hours" not in lesson:
+            continue
+        opens_before = timedelta(hours=lesson["opens_before_hours"])
+        occurrence = datetime.fromisoformat(resolve_datetime(lesson))
+        # The window for the next occurrence may be open already, then the following occurrence is the next release
+        while occurrence - opens_before <= now:
+            occurrence += timedelta(days=7)
+        releases.append((occurrence - opens_before, lesson))
+    return sorted(releases, key=lambda release: release[0])
+
+
+def next_run(releases: list[tuple[datetime, dict]], now: datetime, last_run: datetime | None, lead_time: timedelta = LEAD_TIME, interval: timedelta = RUN_INTERVAL) -> datetime:
+    """Moment of the next pipeline run: ahead of the next release, or the regular interval if that is sooner."""
+    regular = now if last_run is None else last_run + interval
+    if releases:
+        return min(regular, releases[0][0] - lead_time)
+    return regular
+
+
+def sleep_until(moment: datetime, clock: Callable[[], datetime] = datetime.now, sleep: Callable[[float], None] = time.sleep) -> None:
+    while (remaining := (moment - clock()).total_seconds()) > 0:
+        sleep(min(remaining, MAX_SLEEP))
+
+
+def run_pipeline(lock_file: Path = PIPELINE_LOCK_FILE, run: Callable[..., subprocess.CompletedProcess] = subprocess.run) -> int:
+    """
+    Run the robot and archive its output. Returns the exit code of the robot.
+
+    The lock covers both, so a second pipeline cannot overwrite or archive the output directory of a run in progress.
+    """
+    with RunLock(lock_file) as pipeline_lock:
+        if not pipeline_lock.acquired:
+            print("[WARN] Another robot run is still in progress, skipping this one.")  # noqa: T201
+            return 0
+        result = run(RUN_COMMAND, check=False)
+        run(ARCHIVE_COMMAND, check=False)
+    return result.returncode
+
+
+def serve(lead_time: timedelta = LEAD_TIME, interval: timedelta = RUN_INTERVAL, config_file: Path = LESSON_CONFIG_FILE) -> None:
+    last_run = None
+    while True:
+        # Reload every time, so edits of the config take effect without a restart
+        now = datetime.now()
+        # Lessons without a configured booking window use the window estimated from earlier attempts, if any
+        releases = upcoming_releases(with_estimated_windows(load_lessons(config_file), FillAnalytics().update()), now)
+        moment = next_run(releases, now, last_run, lead_time=lead_time, interval=interval)
+        if releases and moment == releases[0][0] - lead_time:
+            print(f"[INFO] Next run {moment:%Y-%m-%d %H:%M:%S} for {releases[0][1]['name']}, window opens {releases[0][0]:%H:%M:%S}.")  # noqa: T201
+        else:
+            print(f"[INFO] Next regular run {moment:%Y-%m-%d %H:%M:%S}.")  # noqa: T201
+        sleep_until(moment)
+        last_run = datetime.now()
+        print(f"[INFO] Robot run finished with exit code {run_pipeline()}.")  # noqa: T201
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the robot ahead of the booking windows of the configured lessons")
+    parser.add_argument("--lead-seconds", type=int, default=int(LEAD_TIME.total_seconds()), help="Start the robot this long before a window opens")
+    parser.add_argument("--interval-minutes", type=int, default=int(RUN_INTERVAL.total_seconds() // 60), help="Regular run interval")
+    parser.add_argument("--plan", action="store_true", help="Print the upcoming booking windows and exit")
+    parser.add_argument("--once", action="store_true", help="Run the robot and archive its output once, as run_robot_and_archive does")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        sys.exit(run_pipeline())
+
+    if args.plan:
+        for release, lesson in upcoming_releases(with_estimated_windows(load_lessons(), FillAnalytics().update()), datetime.now()):
+            print(f"{release:%Y-%m-%d %H:%M} {lesson['lesson_type']} {lesson['name']} {lesson['day']} {lesson['time']}")  # noqa: T201
+        return
+
+    with RunLock(SCHEDULER_LOCK_FILE) as scheduler_lock:
+        if not scheduler_lock.acquired:
+            print("[WARN] Scheduler is already running.")  # noqa: T201
+            return
+        serve(lead_time=timedelta(seconds=args.lead_seconds), interval=timedelta(minutes=args.interval_minutes))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,10 +1,19 @@
 import os
 import warnings
+from collections.abc import MutableMapping
 
 import truststore  # type: ignore # Om een of andere reden herkent pyright dit package niet, terwijl die wel in environment zit
 from dotenv import load_dotenv
 
 
+def isolate_replay(environ: MutableMapping[str, str] = os.environ) -> None:
+    """A HAR replay keeps its state, attempts and metrics in a work directory of its own, away from those of real runs."""
+    if environ.get("OLYMPOS_HAR_MODE") != "replay":
+        return
+    work_dir = environ.setdefault("OLYMPOS_WORK_DIR", "work_directory/replay")
+    environ["METRICS_TEXTFILE"] = f"{work_dir}/olympos_robot.prom"
+
+
 def check_environment() -> None:
     if os.getenv("OLYMPOS_USERNAME") is None:
         raise ValueError("Please set env variables. Did you load the .env file?")
@@ -15,11 +24,13 @@ def setup() -> None:
     1. Suppress unnecessary warnings (so needs te in front of imports generating warnings)
     2. Certificate management: Injects truststore
     3. Loads environment variables from .env file
-    4. Checks the environment is 32-bit
+    4. Gives a HAR replay its own work directory, before the modules that use it are imported
+    5. Checks the environment is 32-bit
     """
     warnings.filterwarnings("ignore", message="Apply externally defined coinit_flags", module="pywinauto")
     truststore.inject_into_ssl()
     load_dotenv()
+    isolate_replay()
     check_environment()
 
 
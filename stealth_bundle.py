@@ -0,0 +1,89 @@
+import argparse
+import hashlib
+import json
+import statistics
+import time
+from functools import cache
+from importlib.metadata import version
+from pathlib import Path
+
+from playwright.sync_api import BrowserContext, sync_playwright
+
+from atomic_write import atomic_write_text
+
+STEALTH_CACHE_DIR = Path("work_directory/stealth")
+# StealthConfig options. The user agent is left alone, the browser's own is more convincing.
+STEALTH_OPTIONS: dict = {"navigator_user_agent": False}
+
+
+def bundle_key(options: dict) -> str:
+    """Changes with the options and with the installed playwright-stealth, so an update rebuilds the bundle."""
+    source = json.dumps({"options": options, "version": version("playwright-stealth")}, sort_keys=True)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def build_bundle(options: dict) -> str:
+    """All stealth patches as one script. Playwright runs the separate init scripts in one scope too, so they can share `opts`."""
+    # Only imported on a cache miss, importing it takes a few hundred ms
+    from playwright_stealth import StealthConfig  # noqa: PLC0415
+
+    return "\n;\n".join(StealthConfig(**options).enabled_scripts)
+
+
+@cache
+def _cached_bundle(options_json: str, cache_dir: Path) -> str:
+    options = json.loads(options_json)
+    bundle_file = cache_dir / f"{bundle_key(options)}.js"
+    if bundle_file.exists():
+        return bundle_file.read_text(encoding="utf-8")
+    bundle = build_bundle(options)
+    atomic_write_text(bundle_file, bundle)
+    return bundle
+
+
+def stealth_bundle(options: dict | None = None, cache_dir: Path | None = None) -> str:
+    """The stealth init script for the options, built once and then read from the cache directory."""
+    return _cached_bundle(json.dumps(STEALTH_OPTIONS if options is None else options, sort_keys=True), cache_dir if cache_dir is not None else STEALTH_CACHE_DIR)
+
+
+def apply_stealth(context: BrowserContext, options: dict | None = None) -> None:
+    """Register the stealth patches once for the context, every page opened in it gets them."""
+    context.add_init_script(stealth_bundle(options))
+
+
+def measure_setup(runs: int = 10, pages: int = 3) -> dict:
+    """Median ms to set up a context with a few pages, with per-page stealth scripts and with the context-level bundle."""
+    from playwright_stealth import StealthConfig, stealth_sync  # noqa: PLC0415
+
+    timings: dict[str, list[float]] = {"per_page_scripts": [], "context_bundle": []}
+    with sync_playwright() as playwright:
+        browser = playwright.chromium.launch(headless=True)
+        for _ in range(runs):
+            start = time.perf_counter()
+            context = browser.new_context()
+            for _ in range(pages):
+                stealth_sync(context.new_page(), StealthConfig(**STEALTH_OPTIONS))
+            timings["per_page_scripts"].append((time.perf_counter() - start) * 1000)
+            context.close()
+
+            start = time.perf_counter()
+            context = browser.new_context()
+            apply_stealth(context)
+            for _ in range(pages):
+                context.new_page()
+            timings["context_bundle"].append((time.perf_counter() - start) * 1000)
+            context.close()
+        browser.close()
+    return {name: round(statistics.median(values), 1) for name, values in timings.items()}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare context setup time with per-page stealth scripts and with the cached bundle")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=3, help="Pages per context, like the main page and the prefetched tabs")
+    args = parser.parse_args(argv)
+    print(json.dumps(measure_setup(args.runs, args.pages), indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -6,99 +6,277 @@ setup()
 import argparse
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 from robocorp import log
+from robocorp.tasks import setup as task_setup
 from robocorp.tasks import task, teardown
 from robocorp.workitems import ApplicationException, BusinessException  # noqa: F401
 
+from atomic_write import WriteCoalescer
+from browser_footprint import get_rss_monitor
+from clock_sync import CLOCK_SYNC_ERRORS, LOCAL_CLOCK, corrected_release_time, estimate_server_offset, wait_until
+from fill_analytics import FillAnalytics, lesson_key, with_estimated_releases
 from generate_robot_attempts_html import generate_robot_attempts_html
-from log_attempt import log_attempt
+from har_replay import HAR_FILE
+from lesson_config import LESSON_CONFIG_FILE, load_lesson_plan
+from lesson_priority import LessonPriority
+from log_attempt import FAILURE_CODES, Outcome, ResultCode, entry_code, log_attempt, outcome_from_exception
+from metrics import get_metrics
+from negative_cache import NegativeCache
 from olympos_class import Olympos
+from profiling import profiling_enabled, start_profiling, stop_profiling
+from run_budget import RunBudget, get_run_budget
+from run_lock import RUN_LOCK_FILE, RunLock
+from run_state import RUN_STATE_FILE, RunState
 
 DUMMY_RUN = False  # If True, no lasting changes will be made
 
+# Separate state files of earlier versions, only read once to create the run state
 REGISTRATIONS_DB = Path("work_directory/registered_lessons.json")
 LAST_SCRAPE_FILE = Path("work_directory/last_scrape.txt")
-REGISTRATIONS_DB.parent.mkdir(parents=True, exist_ok=True)
+ATTEMPTS_FILE = Path("work_directory/robot_attempts.jsonl")
+MAX_FAILURES_PER_DAY = 3
+MAX_RELEASE_WAIT = timedelta(seconds=int(os.environ.get("MAX_RELEASE_WAIT_SECONDS", "300")))
+# Rough run budget needed per lesson and for the daily scrape, to decide what still fits
+LESSON_BUDGET_SECONDS = 60
+SCRAPE_BUDGET_SECONDS = 30
+# Bookings are verified right after checkout, the full scrape only picks up changes made outside the robot
+SCRAPE_INTERVAL_DAYS = int(os.environ.get("SCRAPE_INTERVAL_DAYS", "7"))
+RUN_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+
+@task_setup
+def start_profiler(task) -> None:
+    if profiling_enabled():
+        start_profiling()
+
+
+def lost_run_lock(task) -> bool:
+    """The task did not run because another run holds the lock, its output directory is not ours to write."""
+    exception = task.exc_info[1] if task.exc_info else None
+    return getattr(exception, "code", None) == "ALREADY_RUNNING"
 
 
 @teardown
 def write_status_file(task) -> None:
+    if lost_run_lock(task):
+        return
     output_dir = Path.cwd() / "output"
     status = "FAIL" if task.failed else "SUCCESS"
     with (output_dir / "status.txt").open("w") as f:
         f.write(status)
     generate_robot_attempts_html()
 
+    budget_report = get_run_budget().write_report(output_dir / "run_budget.json")
+    log.info(f"Used {budget_report['elapsed_seconds']:.0f} s of the {budget_report['budget_seconds']:.0f} s run budget.")
+
+    memory_report = get_rss_monitor().write_report(output_dir / "memory.json")
+    log.info(
+        f"Peak memory: robot {memory_report['python']['peak_mb']:.0f} MB, browser {memory_report['browser']['peak_mb']:.0f} MB "
+        f"(steady {memory_report['python']['steady_mb']:.0f} MB and {memory_report['browser']['steady_mb']:.0f} MB)."
+    )
+
+    metrics = get_metrics()
+    metrics.inc("olympos_robot_runs_total", {"status": status})
+    metrics.set("olympos_robot_last_run_timestamp_seconds", round(time.time()))
+    for phase, usage in budget_report["phases"].items():
+        metrics.set("olympos_robot_phase_duration_seconds", usage["seconds"], {"phase": phase})
+    for process in ("python", "browser"):
+        for stat in ("peak", "steady"):
+            metrics.set("olympos_robot_memory_megabytes", memory_report[process][f"{stat}_mb"], {"process": process, "stat": stat})
+    metrics.save()
+    metrics.write_textfile()
+
+    # Last, so the teardown itself is profiled too
+    for profile_file in stop_profiling(output_dir):
+        log.info(f"Profile written to {profile_file}")
+
 
 @task
 def main() -> None:
-    if failed_today_too_many_times():
-        log_attempt({"name": "TOO_MANY_FAILED_ATTEMPTS"}, "Too many failed attempts today.")
+    # Task Scheduler queues a new instance while a run is still busy, the scheduler may start one too
+    with RunLock(RUN_LOCK_FILE) as run_lock:
+        if not run_lock.acquired:
+            raise BusinessException(code="ALREADY_RUNNING", message="Another robot run is still in progress.")
+        run_robot()
+
+
+def run_robot() -> None:
+    run_state = load_run_state()
+    if failed_today_too_many_times(run_state):
+        log_attempt({"name": "TOO_MANY_FAILED_ATTEMPTS"}, "Too many failed attempts today.", Outcome(ResultCode.TOO_MANY_FAILURES))
         raise BusinessException(code="TOO_MANY_FAILED_ATTEMPTS", message="Too many failed attempts today.")
 
-    lessons = [
-        # {"name": "POLESPORTS", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "20:15"},
-        # {"name": "POLESPORTS", "lesson_type": "GROUPLESSON", "day": "Wo", "time": "17:30"},
-        # {"name": "POLESPORTS", "lesson_type": "GROUPLESSON", "day": "Wo", "time": "18:45"},
-        # {"name": "AERIAL ACROBATIEK", "lesson_type": "GROUPLESSON", "day": "Do", "time": "18:15"},
-        # {"name": "AERIAL ACROBATIEK", "lesson_type": "COURSE", "day": "Do", "time": "18:15"},
-        # {"name": "AERIAL ACROBATIEK", "lesson_type": "COURSE", "day": "Za", "time": "09:30"},
-        # {"name": "POLESPORTS", "lesson_type": "COURSE", "day": "Wo", "time": "17:30"},
-        {"name": "CHEERLEADING", "lesson_type": "COURSE", "day": "Wo", "time": "20:00"},
-        # {"name": "POLESPORTS", "lesson_type": "COURSE", "day": "Ma", "time": "19:00"},
-    ]
+    # Lessons without a configured booking window wait for the window estimated from earlier attempts, like the scheduler
+    analytics = FillAnalytics().update()
+    lessons = with_estimated_releases(load_lesson_plan(resolve_datetime=determine_next_datetime), analytics)
     # lessons = parse_args()
 
     if not lessons:
-        raise ValueError("No lessons specified. Use --lesson to specify lessons.")
+        raise ValueError(f"No lessons specified. Add lessons to {LESSON_CONFIG_FILE}.")
+
+    run_state.registrations = delete_old_registrations(run_state.registrations)
+
+    budget = get_run_budget()
+    olympos = Olympos(
+        dummy_run=DUMMY_RUN,
+        cdp_url=os.environ.get("OLYMPOS_CDP_URL"),
+        har_mode=os.environ.get("OLYMPOS_HAR_MODE"),
+        har_path=Path(os.environ.get("OLYMPOS_HAR_PATH", str(HAR_FILE))),
+        har_latency=os.environ.get("OLYMPOS_HAR_LATENCY", "zero"),
+        budget=budget,
+    )
+    negative_cache = NegativeCache()
+    try:
+        register_lessons(olympos, lessons, run_state, negative_cache, budget, analytics)
+    finally:
+        # Keep the state and the latencies learned this run, also when the run failed halfway
+        run_state.save()
+        olympos.timeouts.save()
+        negative_cache.save()
+        olympos.close()
+
+
+def load_run_state(state_file: Path = RUN_STATE_FILE) -> RunState:
+    if state_file.exists():
+        return RunState.load(state_file)
+    # First run since the separate state files: take them over, reading the attempts log in full this one time
+    last_scrape = LAST_SCRAPE_FILE.read_text().strip() if LAST_SCRAPE_FILE.exists() else None
+    today = datetime.now().date()
+    return RunState(registrations=load_registered(REGISTRATIONS_DB), last_scrape=last_scrape, failures={"date": today.isoformat(), "count": count_failures(ATTEMPTS_FILE, today)})
 
-    for lesson in lessons:
-        if "datetime" not in lesson:
-            lesson["datetime"] = determine_next_datetime(lesson)
 
-    registered_lessons = load_registered()
+def counting_log_attempt(run_state: RunState):
+    """log_attempt that also counts failures in the run state, and asks for a full scrape when a booking was not verified."""
 
-    filtered_lessons = delete_old_registrations(registered_lessons)
-    if len(filtered_lessons) != len(registered_lessons):
-        save_registered(filtered_lessons)
-        registered_lessons = filtered_lessons
+    def log_and_count(lesson: dict, result: str, outcome: Outcome | None = None) -> None:
+        log_attempt(lesson, result, outcome)
+        if outcome is not None:
+            run_state.count_outcome(outcome, datetime.now().date())
+            if outcome.code == ResultCode.UNVERIFIED:
+                # The checkout may have gone through anyway, the scrape of the next run tells
+                run_state.request_scrape()
 
-    olympos = Olympos(dummy_run=DUMMY_RUN)
-    olympos.start_and_login()
+    return log_and_count
 
-    if should_scrape_today():
-        scraped_lessons = olympos.scrape_registered_lessons()
-        updated_lessons = append_registered(scraped_lessons, registered_lessons)
-        if len(updated_lessons) != len(registered_lessons):
-            save_registered(updated_lessons)
-            registered_lessons = updated_lessons
-        update_last_scrape()
 
-    lessons_to_process = []
+def skip_cached_lessons(lessons: list[dict], negative_cache: NegativeCache, log_attempt_func=log_attempt) -> list[dict]:
+    """Lessons that have to be tried, leaving out those that were recently full or not found."""
+    lessons_to_try = []
     for lesson in lessons:
-        if is_registered(lesson, registered_lessons):
-            log_attempt(lesson, "Already registered")
+        cached_code = negative_cache.lookup(lesson)
+        if cached_code is None:
+            lessons_to_try.append(lesson)
+        else:
+            log_attempt_func(lesson, f"Skipped, recently {cached_code.value.lower().replace('_', ' ')}", Outcome(ResultCode.SKIPPED, error_code="NEGATIVE_CACHE"))
+    return lessons_to_try
+
+
+def register_lessons(olympos: Olympos, lessons: list[dict], run_state: RunState, negative_cache: NegativeCache, budget: RunBudget, analytics: FillAnalytics | None = None) -> None:
+    today = datetime.now().date()
+    # Registrations are only known for sure after the scrape, but prefetching one page too many is cheap
+    unregistered_lessons = [lesson for lesson in lessons if not is_registered(lesson, run_state.registrations)]
+    lessons_to_try = skip_cached_lessons(unregistered_lessons, negative_cache)
+    log.info("Negative cache hit rate %.0f%% over all runs.", negative_cache.hit_rate() * 100)
+    if not lessons_to_try and not run_state.should_scrape(today, SCRAPE_INTERVAL_DAYS):
+        # No browser needed at all
+        for lesson in lessons:
+            if is_registered(lesson, run_state.registrations):
+                log_attempt(lesson, "Already registered", Outcome(ResultCode.ALREADY_REGISTERED))
+        log.info("All lessons registered, or recently full or not found. Nothing to do.")
+        return
+
+    with budget.phase("login"):
+        olympos.start_and_login(prefetch_urls=olympos.prefetch_urls(lessons_to_try))
+    run_state.mark_session(olympos.login_method or "unknown", datetime.now())
+
+    if run_state.should_scrape(today, SCRAPE_INTERVAL_DAYS):
+        # The scrape is the first thing to go when time is short, the next run scrapes instead
+        if budget.can_afford(SCRAPE_BUDGET_SECONDS + LESSON_BUDGET_SECONDS * len(lessons_to_try)):
+            with budget.phase("scrape"):
+                scraped_lessons = olympos.scrape_registered_lessons()
+            run_state.registrations = append_registered(scraped_lessons, run_state.registrations)
+            run_state.mark_scraped(today)
+            run_state.save()
         else:
+            log.warn(f"Skipping the scrape of registrations, {budget.remaining():.0f} s of run budget left.")
+
+    lessons_to_process = []
+    for lesson in lessons:
+        if is_registered(lesson, run_state.registrations):
+            log_attempt(lesson, "Already registered", Outcome(ResultCode.ALREADY_REGISTERED))
+        elif lesson in lessons_to_try:
             lessons_to_process.append(lesson)
 
     if not lessons_to_process:
         log.info("All lessons already registered. Nothing to do.")
         return
 
+    with budget.phase("wait_for_release"):
+        wait_for_release(olympos, lessons_to_process, budget=budget)
+
+    # Contested lessons first: by configured priority, how soon they are and how fast they filled before
+    analytics = analytics if analytics is not None else FillAnalytics().update()
+    priority = LessonPriority(fill_minutes=lambda lesson: analytics.fill_minutes(lesson_key(lesson)))
+
     attempt = 0
-    process_lessons(olympos, lessons_to_process, attempt, registered_lessons)
+    # Every pass of process_lessons saves the state, only the final state is written
+    with budget.phase("registration"), WriteCoalescer() as registration_writes:
+        process_lessons(
+            olympos,
+            lessons_to_process,
+            attempt,
+            run_state.registrations,
+            save_func=lambda _registered: run_state.save(coalescer=registration_writes),
+            log_attempt_func=counting_log_attempt(run_state),
+            negative_cache=negative_cache,
+            budget=budget,
+            order=priority.order,
+        )
+
+
+def next_release(lessons: list[dict], max_wait: timedelta = MAX_RELEASE_WAIT) -> datetime | None:
+    """Earliest booking window that opens within max_wait, if any."""
+    now = datetime.now()
+    releases = [datetime.fromisoformat(lesson["release_at"]) for lesson in lessons if "release_at" in lesson]
+    upcoming = [release for release in releases if now < release <= now + max_wait]
+    return min(upcoming, default=None)
+
+
+def wait_for_release(olympos: Olympos, lessons: list[dict], offset_func=estimate_server_offset, wait_func=wait_until, budget: RunBudget | None = None) -> None:
+    """If a booking window opens soon, keep the connections warm and wait until it is open according to the server clock."""
+    max_wait = MAX_RELEASE_WAIT
+    if budget is not None:
+        # Only wait for a release when there is time left to register after it
+        max_wait = min(max_wait, timedelta(seconds=budget.remaining() - LESSON_BUDGET_SECONDS * len(lessons)))
+    release = next_release(lessons, max_wait=max_wait)
+    if release is None:
+        return
+    olympos.keep_alive()
+    try:
+        clock_offset = offset_func()
+    except CLOCK_SYNC_ERRORS as e:
+        log.warn(f"Could not determine the server clock offset ({e!r}), waiting on the local clock.")
+        clock_offset = LOCAL_CLOCK
+    log.info("Server clock offset %.3f s (+/- %.3f s), waiting for release at %s.", clock_offset.offset, clock_offset.uncertainty, release.isoformat())
+    wait_func(corrected_release_time(release, clock_offset), keep_alive=olympos.keep_alive)
+
 
+def failed_today_too_many_times(run_state: RunState) -> bool:
+    """Check if there are already 3 failures today."""
+    return run_state.failures_on(datetime.now().date()) >= MAX_FAILURES_PER_DAY
 
-def failed_today_too_many_times() -> bool:
-    """Check if there are already 3 failures today in robot_attempts.jsonl."""
-    attempts_file = Path("work_directory/robot_attempts.jsonl")
+
+def count_failures(attempts_file: Path, day: date) -> int:
+    """Failures of the day in robot_attempts.jsonl."""
     if not attempts_file.exists():
-        return False
+        return 0
 
-    today_str = datetime.now().strftime("%Y-%m-%d")
+    day_str = day.isoformat()
     failure_count = 0
 
     try:
@@ -107,42 +285,20 @@ def failed_today_too_many_times() -> bool:
                 try:
                     entry = json.loads(line.strip())
                     timestamp = entry.get("timestamp", "")
-                    result = entry.get("result", "")
 
-                    # Check if this entry is from today and is a failure
-                    if timestamp.startswith(today_str) and (result.startswith(("Exception:", "BusinessException:")) or "Exception:" in result):
+                    # Check if this entry is from the day and is a failure
+                    if timestamp.startswith(day_str) and entry_code(entry) in FAILURE_CODES:
                         failure_count += 1
 
-                        # Stop early if we already have 3 failures
-                        if failure_count >= 3:
-                            return True
-
                 except json.JSONDecodeError:
                     # Skip malformed lines
                     continue
 
     except OSError:
         # If we can't read the file, assume no failures
-        return False
-
-    return False
-
+        return 0
 
-def should_scrape_today(last_scrape_file: Path = LAST_SCRAPE_FILE) -> bool:
-    """Returns true if today there was no scrape of registrations yet."""
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    if not last_scrape_file.exists():
-        return True
-    with last_scrape_file.open() as f:
-        last_scrape = f.read().strip()
-    return last_scrape != today_str
-
-
-def update_last_scrape(last_scrape_file: Path = LAST_SCRAPE_FILE) -> None:
-    """Updates metadata file containing last date of scraped registrations."""
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    with last_scrape_file.open("w") as f:
-        f.write(today_str)
+    return failure_count
 
 
 def load_registered(registrations_db: Path = REGISTRATIONS_DB) -> list[dict]:
@@ -153,12 +309,6 @@ def load_registered(registrations_db: Path = REGISTRATIONS_DB) -> list[dict]:
     return []
 
 
-def save_registered(lessons: list[dict], registrations_db: Path = REGISTRATIONS_DB) -> None:
-    """Overwrites DB file with list of lessons."""
-    with registrations_db.open("w") as file:
-        json.dump(lessons, file, indent=2)
-
-
 def is_registered(lesson: dict, registered_list: list[dict]) -> bool:
     for registered in registered_list:
         if lesson.get("name") == registered.get("name") and lesson.get("time") == registered.get("time") and lesson.get("day") == registered.get("day"):
@@ -226,37 +376,74 @@ def parse_args() -> list[dict]:
 
 
 def process_lessons(
-    olympos: Olympos, lessons: list[dict], attempt: int, registered_lessons: list[dict], save_func=save_registered, log_attempt_func=log_attempt, max_retries=None, log=log
+    olympos: Olympos,
+    lessons: list[dict],
+    attempt: int,
+    registered_lessons: list[dict],
+    save_func=None,
+    log_attempt_func=log_attempt,
+    max_retries=None,
+    log=log,
+    negative_cache: NegativeCache | None = None,
+    budget: RunBudget | None = None,
+    order: Callable[[list[dict]], list[dict]] | None = None,
 ) -> None:
     if max_retries is None:
         max_retries = int(os.environ.get("MAX_RETRIES", "1"))
     if attempt > max_retries:
         log.warn("The unprocessed items are: %s", ", ".join(lesson.get("course_name", str(lesson)) for lesson in lessons))  # noqa: G010
         return
+    if order is not None:
+        # Ordered again on every pass, the retries included
+        lessons = order(lessons)
     error_lessons = []
-    for lesson in lessons:
+    for index, lesson in enumerate(lessons):
+        if budget is not None and budget.exhausted():
+            # Stop while there is still time to save the registrations and write the status
+            log.warn("Run budget exhausted. The unprocessed items are: %s", ", ".join(unprocessed.get("course_name", str(unprocessed)) for unprocessed in lessons[index:]))  # noqa: G010
+            break
+        start = time.perf_counter()
         try:
             perform_oplossing(olympos, lesson)
             registered_lessons.append(lesson)
-            log_attempt_func(lesson, "Registered")
+            if negative_cache is not None:
+                negative_cache.remove(lesson)
+            log_attempt_func(lesson, "Registered", Outcome(ResultCode.REGISTERED, duration=time.perf_counter() - start))
         except BusinessException as e:
             # no retry for BusinessException, so no error_actions.append(action)
-            msg = str(e)
-            if "vol" in msg.lower():
-                log_attempt_func(lesson, "Already full")
-            elif "niet aanwezig" in msg.lower():
-                log_attempt_func(lesson, "Not found")
+            outcome = outcome_from_exception(e, duration=time.perf_counter() - start)
+            if negative_cache is not None:
+                negative_cache.add(lesson, outcome)
+            if outcome.code == ResultCode.ALREADY_FULL:
+                log_attempt_func(lesson, "Already full", outcome)
+            elif outcome.code == ResultCode.NOT_FOUND:
+                log_attempt_func(lesson, "Not found", outcome)
             else:
-                log_attempt_func(lesson, f"BusinessException: {msg}")
+                log_attempt_func(lesson, f"BusinessException: {e}", outcome)
         except (KeyboardInterrupt, SystemExit):
             raise
         except Exception as e:  # noqa: BLE001
             error_lessons.append(lesson)
-            log_attempt_func(lesson, f"Exception: {e}")
-    save_func(registered_lessons)
+            log_attempt_func(lesson, f"Exception: {e}", outcome_from_exception(e, duration=time.perf_counter() - start))
+    if save_func is not None:
+        save_func(registered_lessons)
     if len(error_lessons) > 0:
         attempt += 1
-        process_lessons(olympos, error_lessons, attempt, registered_lessons, save_func=save_func, log_attempt_func=log_attempt_func, max_retries=max_retries, log=log)
+        if attempt <= max_retries:
+            get_metrics().inc("olympos_robot_retries_total", amount=len(error_lessons))
+        process_lessons(
+            olympos,
+            error_lessons,
+            attempt,
+            registered_lessons,
+            save_func=save_func,
+            log_attempt_func=log_attempt_func,
+            max_retries=max_retries,
+            log=log,
+            negative_cache=negative_cache,
+            budget=budget,
+            order=order,
+        )
 
 
 def perform_oplossing(olympos: Olympos, lesson: dict) -> None:
@@ -274,9 +461,9 @@ def perform_oplossing(olympos: Olympos, lesson: dict) -> None:
     #     raise BusinessException(code="DATE_FORMAT_ERROR", message=f"Date format error: {e}") from e
 
     if lesson_type == "COURSE":
-        olympos.register_into_course(name, lesson_datetime)
+        olympos.register_into_course(name, lesson_datetime, description=lesson.get("description"), option_pattern=lesson.get("option_pattern"))
     elif lesson_type == "GROUPLESSON":
-        olympos.register_into_group_lesson(name, time)
+        olympos.register_into_group_lesson(name, time, lesson_datetime=lesson_datetime)
     else:
         raise BusinessException(code="LESSON_TYPE_NOT_FOUND", message=f"Lesson type {type} kan niet verwerkt worden.")
 
@@ -0,0 +1,62 @@
+import pytest
+
+from adaptive_timeouts import AdaptiveTimeouts, percentile
+
+
+@pytest.fixture
+def timeouts(tmp_path):
+    return AdaptiveTimeouts(history_file=tmp_path / "latency_history.json", window=10, margin=2.0, min_samples=3)
+
+
+def test_percentile():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 50) == 50.0
+    assert percentile([5.0], 99) == 5.0
+
+
+def test_timeout_uses_default_until_enough_samples(timeouts):
+    timeouts.record("step", 100)
+    timeouts.record("step", 100)
+    assert timeouts.timeout("step", 5000) == 5000
+
+
+def test_timeout_is_p99_times_margin(timeouts):
+    for duration in (100, 200, 300):
+        timeouts.record("step", duration)
+    assert timeouts.timeout("step", 5000) == 600
+
+
+def test_timeout_is_clamped(timeouts):
+    for _ in range(3):
+        timeouts.record("fast", 10)
+        timeouts.record("slow", 50000)
+    assert timeouts.timeout("fast", 500, minimum_ms=500) == 500
+    assert timeouts.timeout("slow", 500, maximum_ms=5000) == 5000
+
+
+def test_history_is_rolling(timeouts):
+    for duration in range(20):
+        timeouts.record("step", duration)
+    assert timeouts.history["step"] == [float(d) for d in range(10, 20)]
+
+
+def test_measure_does_not_record_failed_steps(timeouts):
+    with timeouts.measure("step"):
+        pass
+    with pytest.raises(AssertionError), timeouts.measure("step"):
+        raise AssertionError
+    assert len(timeouts.history["step"]) == 1
+
+
+def test_history_survives_save_and_load(timeouts, tmp_path):
+    timeouts.record("step", 123)
+    timeouts.save()
+    reloaded = AdaptiveTimeouts(history_file=tmp_path / "latency_history.json")
+    assert reloaded.history == {"step": [123.0]}
+
+
+def test_corrupt_history_starts_over(tmp_path):
+    history_file = tmp_path / "latency_history.json"
+    history_file.write_text("{not json")
+    assert AdaptiveTimeouts(history_file=history_file).history == {}
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from archive_run import RunArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return RunArchive(tmp_path / "logs")
+
+
+def make_output(path, status="SUCCESS", report="same report"):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "status.txt").write_text(status)
+    (path / "report.html").write_text(report)
+    (path / "screenshots").mkdir(exist_ok=True)
+    (path / "screenshots" / "page.png").write_bytes(status.encode())
+    return path
+
+
+def test_archive_and_restore_roundtrip(archive, tmp_path):
+    output = make_output(tmp_path / "output", status="FAIL")
+    entry = archive.archive(output, now=datetime(2025, 6, 16, 20, 15, 0))
+    assert entry["run_id"] == "20250616_201500_FAIL"
+    assert entry["files"] == 3
+
+    archive.restore(entry["run_id"], tmp_path / "restored")
+    assert (tmp_path / "restored" / "report.html").read_text() == "same report"
+    assert (tmp_path / "restored" / "screenshots" / "page.png").read_bytes() == b"FAIL"
+
+
+def test_identical_files_are_stored_once(archive, tmp_path):
+    archive.archive(make_output(tmp_path / "run1", status="SUCCESS"), now=datetime(2025, 6, 16, 20, 0))
+    archive.archive(make_output(tmp_path / "run2", status="FAIL"), now=datetime(2025, 6, 16, 21, 0))
+    # report.html is shared, status.txt and page.png differ per status
+    assert len(list(archive.objects_dir.rglob("*.gz"))) == 3
+
+
+def test_find_by_status_and_date(archive, tmp_path):
+    archive.archive(make_output(tmp_path / "run1", status="FAIL"), now=datetime(2025, 5, 1))
+    archive.archive(make_output(tmp_path / "run2", status="SUCCESS"), now=datetime(2025, 6, 1))
+    archive.archive(make_output(tmp_path / "run3", status="FAIL"), now=datetime(2025, 6, 2))
+    assert [run["run_id"] for run in archive.find(status="FAIL", since=datetime(2025, 5, 15))] == ["20250602_000000_FAIL"]
+
+
+def test_retention_by_age_and_count_removes_unreferenced_files(archive, tmp_path):
+    now = datetime(2025, 6, 30)
+    archive.archive(make_output(tmp_path / "run1", status="OLD", report="old report"), now=now - timedelta(days=100))
+    archive.archive(make_output(tmp_path / "run2", status="FAIL"), now=now - timedelta(days=2))
+    archive.archive(make_output(tmp_path / "run3", status="SUCCESS"), now=now - timedelta(days=1))
+
+    removed = archive.apply_retention(max_age_days=90, max_runs=1, now=now)
+    assert removed == ["20250322_000000_OLD", "20250628_000000_FAIL"]
+    assert [run["status"] for run in archive.read_index()] == ["SUCCESS"]
+    # status.txt and page.png have the same content, report.html is the other file
+    assert len(list(archive.objects_dir.rglob("*.gz"))) == 2
+    archive.restore("20250629_000000_SUCCESS", tmp_path / "restored")
+
+
+def test_retention_by_size_keeps_latest_run(archive, tmp_path):
+    archive.archive(make_output(tmp_path / "run1", status="A", report="a" * 1000), now=datetime(2025, 6, 1))
+    archive.archive(make_output(tmp_path / "run2", status="B", report="b" * 1000), now=datetime(2025, 6, 2))
+    archive.apply_retention(max_size_mb=0)
+    assert [run["status"] for run in archive.read_index()] == ["B"]
+
+
+def test_runs_within_the_same_second_get_their_own_id(archive, tmp_path):
+    first = archive.archive(make_output(tmp_path / "run1", status="FAIL", report="first"), now=datetime(2025, 6, 16, 20, 15))
+    second = archive.archive(make_output(tmp_path / "run2", status="FAIL", report="second"), now=datetime(2025, 6, 16, 20, 15))
+    assert (first["run_id"], second["run_id"]) == ("20250616_201500_FAIL", "20250616_201500_FAIL_2")
+    archive.restore(first["run_id"], tmp_path / "restored")
+    assert (tmp_path / "restored" / "report.html").read_text() == "first"
+
+
+def test_old_xcopy_run_directories_are_imported_and_retained(archive, tmp_path):
+    archive.archive(make_output(tmp_path / "run1", status="SUCCESS"), now=datetime(2025, 6, 20))
+    make_output(archive.logs_dir / "20250301_201500_FAIL", status="FAIL")
+    make_output(archive.logs_dir / "20250615_201500_SUCCESS")
+
+    assert archive.import_legacy_runs() == ["20250301_201500_FAIL", "20250615_201500_SUCCESS"]
+    assert not (archive.logs_dir / "20250301_201500_FAIL").exists()
+    assert [run["run_id"] for run in archive.read_index()] == ["20250301_201500_FAIL", "20250615_201500_SUCCESS", "20250620_000000_SUCCESS"]
+
+    assert archive.apply_retention(max_age_days=90, now=datetime(2025, 6, 30)) == ["20250301_201500_FAIL"]
+    archive.restore("20250615_201500_SUCCESS", tmp_path / "restored")
+    assert (tmp_path / "restored" / "status.txt").read_text() == "SUCCESS"
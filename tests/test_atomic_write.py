@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from atomic_write import WriteCoalescer, atomic_write_json, atomic_write_text
+
+
+def test_atomic_write_replaces_content_and_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "state" / "last_scrape.txt"
+    atomic_write_text(path, "2025-06-15")
+    atomic_write_text(path, "2025-06-16")
+    assert path.read_text() == "2025-06-16"
+    assert [file.name for file in path.parent.iterdir()] == ["last_scrape.txt"]
+
+
+def test_failed_write_keeps_old_content(tmp_path):
+    path = tmp_path / "registered_lessons.json"
+    atomic_write_json(path, [{"name": "POLESPORTS"}])
+    with pytest.raises(TypeError):
+        atomic_write_json(path, [{"name": object()}])
+    with pytest.raises(TypeError):
+        atomic_write_text(path, None)  # type: ignore[arg-type]
+    assert json.loads(path.read_text()) == [{"name": "POLESPORTS"}]
+    assert [file.name for file in tmp_path.iterdir()] == ["registered_lessons.json"]
+
+
+def test_coalescer_writes_final_state_once(tmp_path, monkeypatch):
+    writes = []
+    monkeypatch.setattr("atomic_write.atomic_write_text", lambda path, text: writes.append((path.name, text)))
+    lessons = []
+    with WriteCoalescer() as coalescer:
+        for name in ("Yoga", "Pilates"):
+            lessons.append({"name": name})
+            coalescer.write_json(tmp_path / "registered_lessons.json", lessons)
+        coalescer.write_text(tmp_path / "last_scrape.txt", "2025-06-16")
+        assert writes == []
+        assert len(coalescer.pending) == 2
+    assert writes == [("registered_lessons.json", '[{"name": "Yoga"}, {"name": "Pilates"}]'), ("last_scrape.txt", "2025-06-16")]
+
+
+def test_coalescer_flushes_after_exception(tmp_path):
+    path = tmp_path / "registered_lessons.json"
+
+    def failing_phase() -> None:
+        with WriteCoalescer() as coalescer:
+            coalescer.write_json(path, [])
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        failing_phase()
+    assert json.loads(path.read_text()) == []
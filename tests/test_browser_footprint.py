@@ -0,0 +1,84 @@
+import json
+
+import psutil
+
+from browser_footprint import LEAN_LAUNCH_ARGS, MB, ContextPool, RssMonitor, RssSample, launch_options
+
+
+class FakeContext:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeMonitor:
+    def __init__(self, browser_mb):
+        self.browser_mb = browser_mb
+
+    def sample(self):
+        return RssSample(python_bytes=0, browser_bytes=int(self.browser_mb * MB))
+
+
+def make_pool(max_jobs=0, max_rss_mb=0, browser_mb=100):
+    created = []
+
+    def new_context():
+        created.append(FakeContext(len(created)))
+        return created[-1]
+
+    recycled = []
+    pool = ContextPool(new_context, max_jobs=max_jobs, max_rss_mb=max_rss_mb, monitor=FakeMonitor(browser_mb), before_recycle=recycled.append)
+    return pool, created, recycled
+
+
+def test_launch_options(monkeypatch):
+    assert launch_options(lean=True, headless=True) == {"headless": True, "args": list(LEAN_LAUNCH_ARGS)}
+    # Headless decided like robocorp does
+    monkeypatch.setenv("RPA_HEADLESS_MODE", "0")
+    assert launch_options(lean=False, headless=None) == {"headless": False}
+
+
+def test_context_recycled_after_max_jobs():
+    pool, created, recycled = make_pool(max_jobs=2)
+    first = pool.context()
+    assert pool.acquire() is first
+    assert pool.acquire() is first
+    third = pool.acquire()
+    assert third is created[1]
+    assert first.closed
+    assert recycled == [first]
+    assert (pool.jobs, pool.recycles) == (1, 1)
+
+
+def test_context_recycled_when_browser_uses_too_much_memory():
+    pool, created, _ = make_pool(max_rss_mb=500, browser_mb=400)
+    first = pool.acquire()
+    assert pool.acquire() is first
+    pool.monitor.browser_mb = 600
+    assert pool.acquire() is not first
+    assert len(created) == 2
+
+
+def test_never_recycled_without_limits():
+    pool, created, _ = make_pool(browser_mb=10_000)
+    for _ in range(50):
+        pool.acquire()
+    assert len(created) == 1
+
+
+def test_rss_monitor_reports_peak_and_steady_state():
+    monitor = RssMonitor()
+    # Start-up peak, then steady
+    monitor.samples = [RssSample(300 * MB, 900 * MB), RssSample(100 * MB, 400 * MB), RssSample(110 * MB, 420 * MB), RssSample(120 * MB, 440 * MB)]
+    assert monitor.report() == {"samples": 4, "python": {"peak_mb": 300.0, "steady_mb": 115.0}, "browser": {"peak_mb": 900.0, "steady_mb": 430.0}}
+
+
+def test_rss_monitor_measures_this_process(tmp_path):
+    monitor = RssMonitor(psutil.Process())
+    report = monitor.write_report(tmp_path / "memory.json")
+    assert report["samples"] == 1
+    assert report["python"]["peak_mb"] > 0
+    assert json.loads((tmp_path / "memory.json").read_text()) == report
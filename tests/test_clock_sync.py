@@ -0,0 +1,60 @@
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from clock_sync import ClockOffset, corrected_release_time, estimate_server_offset, wait_until
+
+SKEW = 42.3  # seconds the stand-in server clock runs ahead
+
+
+class SkewedClockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def date_time_string(self, timestamp=None):
+        return formatdate(time.time() + SKEW, usegmt=True)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def skewed_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SkewedClockHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_estimate_server_offset_against_skewed_server(skewed_server):
+    clock_offset = estimate_server_offset(url=skewed_server, samples=8)
+    assert abs(clock_offset.offset - SKEW) <= clock_offset.uncertainty + 0.01
+    assert clock_offset.uncertainty < 0.25
+
+
+def test_corrected_release_time_waits_for_slowest_possible_server_clock():
+    release = datetime(2025, 6, 16, 20, 0)
+    clock_offset = ClockOffset(offset=2.0, uncertainty=0.1, samples=8)
+    assert corrected_release_time(release, clock_offset) == pytest.approx(release.timestamp() - 1.9)
+
+
+def test_wait_until_calls_keep_alive_while_waiting():
+    now = [0.0]
+    keep_alive_calls = []
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    wait_until(65, keep_alive=lambda: keep_alive_calls.append(now[0]), keep_alive_interval=20, clock=lambda: now[0], sleep=sleep)
+    assert now[0] == 65
+    assert keep_alive_calls == [0, 20, 40]
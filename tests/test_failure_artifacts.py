@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+from robocorp.workitems import BusinessException
+
+from failure_artifacts import FailureArtifacts
+from generate_robot_attempts_html import render_row
+from log_attempt import outcome_from_exception
+
+
+class FakeTracing:
+    def __init__(self, trace_bytes: int = 100):
+        self.trace_bytes = trace_bytes
+        self.chunks: list[str] = []
+        self.saved = 0
+        self.discarded = 0
+        self.stopped = False
+
+    def start(self, **kwargs):
+        pass
+
+    def stop(self):
+        self.stopped = True
+
+    def start_chunk(self, title=None):
+        self.chunks.append(title)
+
+    def stop_chunk(self, path=None):
+        if path is None:
+            self.discarded += 1
+        else:
+            path.write_bytes(b"t" * self.trace_bytes)
+            self.saved += 1
+
+
+class FakeContext:
+    def __init__(self, trace_bytes: int = 100):
+        self.tracing = FakeTracing(trace_bytes)
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+    def is_closed(self):
+        return False
+
+    def screenshot(self, path, **kwargs):
+        path.write_bytes(b"jpeg")
+
+    def content(self):
+        raise PlaywrightError("Target closed")
+
+
+def make_artifacts(tmp_path, trace_bytes=100, **kwargs):
+    context = FakeContext(trace_bytes)
+    artifacts = FailureArtifacts(tmp_path / "failures", clock=lambda: datetime(2025, 6, 16, 20, 15), **kwargs)
+    artifacts.start(context)
+    return artifacts, context, FakePage(context)
+
+
+def test_successful_step_writes_nothing(tmp_path):
+    artifacts, context, page = make_artifacts(tmp_path)
+    with artifacts.capture("scrape", lambda: page):
+        pass
+    assert (context.tracing.chunks, context.tracing.discarded) == (["scrape"], 1)
+    assert not (tmp_path / "failures").exists()
+
+
+def test_expected_outcomes_write_nothing(tmp_path):
+    artifacts, context, page = make_artifacts(tmp_path)
+    with pytest.raises(BusinessException), artifacts.capture("group lesson registration", lambda: page):
+        raise BusinessException("Vol.", code="LESSON_FULL")
+    assert context.tracing.discarded == 1
+    assert not (tmp_path / "failures").exists()
+
+
+def test_failure_saves_artifacts_and_links_them_from_the_report(tmp_path):
+    artifacts, _, page = make_artifacts(tmp_path)
+    with pytest.raises(TimeoutError) as exc_info, artifacts.capture("group lesson registration", lambda: page):
+        raise TimeoutError("Timeout 30000ms exceeded")
+    # The DOM could not be read, the rest is saved anyway
+    expected = ["failures/20250616T201500_group_lesson_registration/screenshot.jpg", "failures/20250616T201500_group_lesson_registration/trace.zip"]
+    assert exc_info.value.artifacts == expected
+    outcome = outcome_from_exception(exc_info.value)
+    assert outcome.to_dict()["artifacts"] == expected
+
+    row = render_row({"timestamp": "2025-06-16T20:15:00", "result": "Exception: Timeout", "action": {}, "outcome": outcome.to_dict()})
+    assert '<a href="failures/20250616T201500_group_lesson_registration/trace.zip">trace.zip</a>' in row
+
+
+def test_large_trace_is_left_out(tmp_path):
+    artifacts, _, page = make_artifacts(tmp_path, trace_bytes=1000, max_trace_bytes=500)
+    with pytest.raises(RuntimeError) as exc_info, artifacts.capture("scrape", lambda: page):
+        raise RuntimeError("boom")
+    assert exc_info.value.artifacts == ["failures/20250616T201500_scrape/screenshot.jpg"]
+
+
+def test_oldest_failures_are_pruned(tmp_path):
+    artifacts = FailureArtifacts(tmp_path / "failures", max_total_bytes=250)
+    for name in ("20250101T000000_a", "20250102T000000_b", "20250103T000000_c"):
+        (tmp_path / "failures" / name).mkdir(parents=True)
+        (tmp_path / "failures" / name / "trace.zip").write_bytes(b"t" * 100)
+    artifacts.prune()
+    assert sorted(path.name for path in (tmp_path / "failures").iterdir()) == ["20250102T000000_b", "20250103T000000_c"]
+
+
+def test_newest_failure_is_kept_without_its_trace(tmp_path):
+    artifacts = FailureArtifacts(tmp_path / "failures", max_total_bytes=250)
+    for name in ("20250101T000000_a", "20250102T000000_b"):
+        (tmp_path / "failures" / name).mkdir(parents=True)
+        (tmp_path / "failures" / name / "screenshot.jpg").write_bytes(b"s" * 10)
+        (tmp_path / "failures" / name / "trace.zip").write_bytes(b"t" * 300)
+    artifacts.prune()
+    assert [path.name for path in (tmp_path / "failures").iterdir()] == ["20250102T000000_b"]
+    assert [path.name for path in (tmp_path / "failures" / "20250102T000000_b").iterdir()] == ["screenshot.jpg"]
+
+
+def test_failures_within_the_same_second_get_their_own_directory(tmp_path):
+    artifacts, _, page = make_artifacts(tmp_path)
+    for _ in range(2):
+        with pytest.raises(RuntimeError), artifacts.capture("scrape", lambda: page):
+            raise RuntimeError("boom")
+    assert sorted(path.name for path in (tmp_path / "failures").iterdir()) == ["20250616T201500_scrape", "20250616T201500_scrape_2"]
+
+
+def test_stop_ends_the_recording_once(tmp_path):
+    artifacts, context, page = make_artifacts(tmp_path)
+    artifacts.stop(context)
+    assert context.tracing.stopped
+    context.tracing.stopped = False
+    artifacts.stop(context)
+    assert not context.tracing.stopped
+    # Steps are no longer recorded
+    with artifacts.capture("scrape", lambda: page):
+        pass
+    assert context.tracing.chunks == []
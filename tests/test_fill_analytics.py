@@ -0,0 +1,88 @@
+import json
+from datetime import datetime, timedelta
+
+from fill_analytics import FillAnalytics, lesson_key, with_estimated_releases, with_estimated_windows
+
+LESSON = {"lesson_type": "GROUPLESSON", "name": "POLESPORTS", "day": "Ma", "time": "20:15"}
+KEY = lesson_key(LESSON)
+
+
+def attempt(lesson_datetime: datetime, hours_before: float, code: str, error_code: str | None = None) -> dict:
+    outcome = {"code": code} if error_code is None else {"code": code, "error_code": error_code}
+    timestamp = lesson_datetime - timedelta(hours=hours_before)
+    return {"timestamp": timestamp.isoformat(timespec="seconds"), "action": {**LESSON, "datetime": lesson_datetime.isoformat()}, "outcome": outcome}
+
+
+def write_attempts(path, attempts, mode="w"):
+    with path.open(mode) as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in attempts)
+
+
+def test_window_and_fill_time_estimated_from_outcomes(tmp_path):
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    week1 = datetime(2025, 6, 16, 20, 15)
+    week2 = week1 + timedelta(days=7)
+    write_attempts(
+        attempts_file,
+        [
+            # Window opens between 48.5 and 47.5 hours before, full 30 minutes later
+            attempt(week1, 48.5, "NOT_FOUND"),
+            attempt(week1, 47.5, "ALREADY_FULL"),
+            attempt(week1, 47.0, "ALREADY_FULL", error_code="NEGATIVE_CACHE"),
+            # Registered right when it opened
+            attempt(week2, 49, "NOT_FOUND"),
+            attempt(week2, 48, "REGISTERED"),
+            attempt(week2, 20, "EXCEPTION"),
+        ],
+    )
+    analytics = FillAnalytics(tmp_path / "fill_analytics.json", attempts_file).update()
+    assert analytics.opens_before_hours(KEY) == 48.25
+    assert analytics.fill_minutes(KEY) == 45.0
+    assert analytics.opens_before_hours("GROUPLESSON|YOGA|Di|10:00") is None
+
+    recommendations = analytics.recommend([LESSON], resolve_datetime=lambda lesson: "2025-06-30T20:15:00")
+    assert recommendations == [
+        {
+            "lesson": KEY,
+            "opens_before_hours": 48.25,
+            "configured": False,
+            "fill_minutes": 45.0,
+            "release": "2025-06-28T20:00:00",
+            "runs": ["2025-06-28T19:58:00", "2025-06-28T20:22:30"],
+        }
+    ]
+
+
+def test_update_only_reads_new_lines_and_persists(tmp_path):
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    state_file = tmp_path / "fill_analytics.json"
+    week1 = datetime(2025, 6, 16, 20, 15)
+    write_attempts(attempts_file, [attempt(week1, 24, "REGISTERED")])
+    FillAnalytics(state_file, attempts_file).update()
+
+    write_attempts(attempts_file, [attempt(week1 + timedelta(days=7), 26, "ALREADY_FULL")], mode="a")
+    with attempts_file.open("a") as f:
+        f.write('{"timestamp": ')  # still being written
+    analytics = FillAnalytics(state_file, attempts_file)
+    assert analytics.offset > 0
+    analytics.update()
+    assert analytics.opens_before_hours(KEY) == 25
+    assert analytics.offset < attempts_file.stat().st_size
+
+
+def test_estimated_window_only_for_lessons_without_configured_window(tmp_path):
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    write_attempts(attempts_file, [attempt(datetime(2025, 6, 16, 20, 15), 24, "REGISTERED")])
+    analytics = FillAnalytics(tmp_path / "fill_analytics.json", attempts_file).update()
+    configured = {**LESSON, "opens_before_hours": 2}
+    other = {**LESSON, "name": "YOGA"}
+    assert with_estimated_windows([LESSON, configured, other], analytics) == [{**LESSON, "opens_before_hours": 24}, configured, other]
+
+
+def test_estimated_release_for_compiled_lessons_without_one(tmp_path):
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    write_attempts(attempts_file, [attempt(datetime(2025, 6, 16, 20, 15), 24, "REGISTERED")])
+    analytics = FillAnalytics(tmp_path / "fill_analytics.json", attempts_file).update()
+    compiled = {**LESSON, "datetime": "2025-06-23T20:15:00"}
+    configured = {**compiled, "release_at": "2025-06-23T18:15:00"}
+    assert with_estimated_releases([compiled, configured], analytics) == [{**compiled, "release_at": "2025-06-22T20:15:00"}, configured]
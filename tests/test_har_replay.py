@@ -0,0 +1,77 @@
+import base64
+import json
+
+import pytest
+
+from har_replay import HarReplayer, record_context_kwargs
+
+
+def har_entry(url, text, time=0.0, encoding=None):
+    content = {"text": text}
+    if encoding:
+        content["encoding"] = encoding
+    return {
+        "request": {"method": "GET", "url": url},
+        "response": {"status": 200, "headers": [{"name": "Content-Type", "value": "text/html"}, {"name": "Content-Encoding", "value": "gzip"}], "content": content},
+        "time": time,
+    }
+
+
+class FakeRequest:
+    def __init__(self, url):
+        self.method = "GET"
+        self.url = url
+
+
+class FakeRoute:
+    def __init__(self, url):
+        self.request = FakeRequest(url)
+        self.fulfilled = None
+        self.aborted = False
+
+    def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    def abort(self):
+        self.aborted = True
+
+
+@pytest.fixture
+def har_file(tmp_path):
+    entries = [
+        har_entry("https://www.olympos.nl/tickets", "first"),
+        har_entry("https://www.olympos.nl/tickets", "second"),
+        har_entry("https://www.olympos.nl/logo.png", base64.b64encode(b"\x89PNG").decode(), encoding="base64"),
+    ]
+    path = tmp_path / "olympos.har"
+    path.write_text(json.dumps({"log": {"entries": entries}}))
+    return path
+
+
+def test_replayer_serves_responses_in_recorded_order(har_file):
+    replayer = HarReplayer(har_file)
+    bodies = []
+    for _ in range(3):
+        route = FakeRoute("https://www.olympos.nl/tickets")
+        replayer.handle(route)
+        bodies.append(route.fulfilled["body"])
+    assert bodies == [b"first", b"second", b"second"]
+
+
+def test_replayer_decodes_base64_bodies_and_drops_content_encoding(har_file):
+    route = FakeRoute("https://www.olympos.nl/logo.png")
+    HarReplayer(har_file).handle(route)
+    assert route.fulfilled["body"] == b"\x89PNG"
+    assert route.fulfilled["headers"] == {"Content-Type": "text/html"}
+
+
+def test_replayer_aborts_unrecorded_requests(har_file):
+    route = FakeRoute("https://www.olympos.nl/unknown")
+    HarReplayer(har_file).handle(route)
+    assert route.aborted
+
+
+def test_record_context_kwargs_creates_output_directory(tmp_path):
+    har_path = tmp_path / "output" / "olympos.har"
+    assert record_context_kwargs(har_path) == {"record_har_path": str(har_path), "record_har_content": "embed"}
+    assert har_path.parent.exists()
@@ -0,0 +1,56 @@
+import random
+import statistics
+
+import pytest
+
+from humanized_typing import TypingError, TypingReport, type_humanized, typing_schedule
+
+
+class FakeLocator:
+    """Runs the typing the way the page would: every key exactly on schedule, after jitter."""
+
+    def __init__(self, initial: str = "", accepts: bool = True, jitter_ms: float = 0.0):
+        self.initial = initial
+        self.accepts = accepts
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+
+    def evaluate(self, expression, arg):
+        self.calls += 1
+        times, now = [], 0.0
+        for index in range(len(arg["text"])):
+            times.append(now)
+            if index < len(arg["text"]) - 1:
+                now += arg["delays"][index] + self.jitter_ms
+        return {"times": times, "initial": self.initial, "value": self.initial + arg["text"] if self.accepts else self.initial}
+
+
+def rng() -> random.Random:
+    return random.Random(0)  # noqa: S311
+
+
+def test_schedule_has_the_distribution_of_press_sequentially_random():
+    delays = typing_schedule(5000, min_delay=40, max_delay=120, rng=rng())
+    assert min(delays) >= 0
+    assert statistics.fmean(delays) == pytest.approx(80, abs=1)
+    assert statistics.stdev(delays) == pytest.approx(80 / 6, rel=0.05)
+
+
+def test_types_all_keys_in_one_call_and_reports_deviation():
+    locator = FakeLocator(jitter_ms=2)
+    report = type_humanized(locator, "user@example.com", rng=rng())
+    assert locator.calls == 1
+    assert len(report.achieved_ms) == len("user@example.com")
+    assert report.mean_error_ms == pytest.approx(2)
+    assert report.max_error_ms == pytest.approx(2)
+    assert "16 keys" in report.summary()
+
+
+def test_rejected_text_raises():
+    with pytest.raises(TypingError):
+        type_humanized(FakeLocator(accepts=False), "secret", rng=rng())
+
+
+def test_report_of_empty_text():
+    assert type_humanized(FakeLocator(), "", rng=rng()) == TypingReport([], [])
+    assert TypingReport([], []).mean_error_ms == 0.0
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from lesson_config import compile_plan, course_option_pattern, load_lesson_plan, validate_lessons
+
+CONFIG = """
+[[lessons]]
+name = "CHEERLEADING"
+lesson_type = "COURSE"
+day = "Wo"
+time = "20:00"
+
+[[lessons]]
+name = "POLESPORTS"
+lesson_type = "GROUPLESSON"
+day = "Ma"
+time = "20:15"
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "lessons.toml"
+    path.write_text(CONFIG)
+    return path
+
+
+@pytest.fixture
+def plan_cache(tmp_path):
+    return tmp_path / "lesson_plan_cache.json"
+
+
+def fixed_datetime(lesson):
+    return {"Wo": "2099-06-10T20:00:00", "Ma": "2099-06-08T20:15:00"}[lesson["day"]]
+
+
+def test_compile_plan_resolves_course_fields(config_file):
+    plan = compile_plan(config_file, fixed_datetime)
+    assert plan[0] == {
+        "name": "CHEERLEADING",
+        "lesson_type": "COURSE",
+        "day": "Wo",
+        "time": "20:00",
+        "datetime": "2099-06-10T20:00:00",
+        "description": "Cheerleading",
+        "option_pattern": r"CHEERLEADING.*\bwe\b.*",
+    }
+    assert plan[1] == {"name": "POLESPORTS", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "20:15", "datetime": "2099-06-08T20:15:00"}
+
+
+def test_course_option_pattern_matches_option_text(config_file):
+    plan = compile_plan(config_file, fixed_datetime)
+    pattern = course_option_pattern(plan[0]["option_pattern"])
+    assert pattern.search("Cheerleading - we 20:00 - 21:00")
+    assert not pattern.search("Cheerleading - do 20:00 - 21:00")
+    assert course_option_pattern(plan[0]["option_pattern"]) is pattern
+
+
+@pytest.mark.parametrize(
+    ("lesson", "message"),
+    [
+        ({"name": "X", "lesson_type": "GROUPLESSON", "day": "Ma"}, "missing field"),
+        ({"name": "X", "lesson_type": "SQUASH", "day": "Ma", "time": "10:00"}, "lesson_type"),
+        ({"name": "X", "lesson_type": "GROUPLESSON", "day": "Monday", "time": "10:00"}, "day"),
+        ({"name": "X", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "10"}, "HH:MM"),
+        ({"name": "X", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "10:00", "extra": 1}, "unknown field"),
+        ({"name": "X", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "10:00", "priority": 0}, "priority"),
+    ],
+)
+def test_validate_lessons_rejects_invalid_lessons(lesson, message):
+    with pytest.raises(ValueError, match=message):
+        validate_lessons([lesson])
+
+
+def test_load_lesson_plan_uses_cache_for_unchanged_config(config_file, plan_cache):
+    calls = []
+
+    def resolve(lesson):
+        calls.append(lesson["name"])
+        return fixed_datetime(lesson)
+
+    first = load_lesson_plan(resolve, config_file=config_file, plan_cache=plan_cache)
+    second = load_lesson_plan(resolve, config_file=config_file, plan_cache=plan_cache)
+    assert first == second
+    assert calls == ["CHEERLEADING", "POLESPORTS"]
+
+
+def test_load_lesson_plan_recompiles_when_config_changes(config_file, plan_cache):
+    load_lesson_plan(fixed_datetime, config_file=config_file, plan_cache=plan_cache)
+    config_file.write_text(CONFIG.replace('"20:15"', '"21:15"'))
+    plan = load_lesson_plan(fixed_datetime, config_file=config_file, plan_cache=plan_cache)
+    assert plan[1]["time"] == "21:15"
+
+
+def test_load_lesson_plan_recompiles_when_lesson_has_passed(config_file, plan_cache):
+    load_lesson_plan(fixed_datetime, config_file=config_file, plan_cache=plan_cache)
+    cached = json.loads(plan_cache.read_text())
+    cached["lessons"][0]["datetime"] = "2000-01-01T20:00:00"
+    plan_cache.write_text(json.dumps(cached))
+    plan = load_lesson_plan(fixed_datetime, config_file=config_file, plan_cache=plan_cache)
+    assert plan[0]["datetime"] == "2099-06-10T20:00:00"
+
+
+def test_load_lesson_plan_missing_config(tmp_path, plan_cache):
+    with pytest.raises(ValueError, match="not found"):
+        load_lesson_plan(fixed_datetime, config_file=tmp_path / "missing.toml", plan_cache=plan_cache)
+
+
+def test_compile_plan_resolves_release_time(tmp_path):
+    config_file = tmp_path / "lessons.toml"
+    config_file.write_text(CONFIG.replace('time = "20:15"', 'time = "20:15"\nopens_before_hours = 48'))
+    plan = compile_plan(config_file, fixed_datetime)
+    assert "release_at" not in plan[0]
+    assert plan[1]["release_at"] == "2099-06-06T20:15:00"
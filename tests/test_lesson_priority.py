@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from lesson_priority import LessonPriority, priority_score
+
+NOW = datetime(2025, 6, 16, 12, 0)
+
+
+def lesson(name: str, datetime_: str, **extra) -> dict:
+    return {"name": name, "lesson_type": "GROUPLESSON", "day": "Ma", "time": "20:15", "datetime": datetime_, **extra}
+
+
+def test_score_rises_with_weight_urgency_and_scarcity():
+    base = priority_score(lesson("A", "2025-06-17T12:00:00"), NOW)
+    assert base == 0.5  # 24 hours away halves the urgency
+    assert priority_score(lesson("A", "2025-06-17T12:00:00", priority=3), NOW) == 1.5
+    assert priority_score(lesson("A", "2025-06-16T12:00:00"), NOW) == 1.0
+    # Filling in 30 minutes doubles the score, in 10 minutes quadruples it
+    assert priority_score(lesson("A", "2025-06-17T12:00:00"), NOW, fill_minutes=30) == 1.0
+    assert priority_score(lesson("A", "2025-06-17T12:00:00"), NOW, fill_minutes=10) == 2.0
+
+
+def test_order_tries_contested_lessons_first():
+    lessons = [
+        lesson("NEVER_FULL", "2025-06-16T20:00:00"),
+        lesson("LATER", "2025-06-20T20:00:00"),
+        lesson("FILLS_FAST", "2025-06-18T20:00:00"),
+        lesson("FAVOURITE", "2025-06-20T20:00:00", priority=10),
+    ]
+    fill_minutes = {"FILLS_FAST": 2}
+    priority = LessonPriority(fill_minutes=lambda lesson: fill_minutes.get(lesson["name"]), clock=lambda: NOW)
+    assert [lesson["name"] for lesson in priority.order(lessons)] == ["FILLS_FAST", "FAVOURITE", "NEVER_FULL", "LATER"]
+
+
+def test_order_keeps_config_order_for_equal_scores():
+    lessons = [lesson(name, "2025-06-17T20:00:00") for name in ("C", "A", "B")]
+    assert LessonPriority(clock=lambda: NOW).order(lessons) == lessons
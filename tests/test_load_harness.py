@@ -0,0 +1,57 @@
+import json
+import random
+
+import pytest
+from robocorp.workitems import BusinessException
+
+from load_harness import FakeOlympos, Scale, generate_attempts, generate_lessons, main, run_load
+from tasks import is_registered
+
+
+def rng() -> random.Random:
+    return random.Random(0)  # noqa: S311
+
+
+def test_generated_lessons_are_distinct():
+    lessons = generate_lessons(500, rng())
+    assert len({(lesson["name"], lesson["day"], lesson["time"]) for lesson in lessons}) == 500
+    assert not any(is_registered(lesson, lessons[:index]) for index, lesson in enumerate(lessons))
+
+
+def test_generated_attempts_are_chronological(tmp_path):
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    generate_attempts(attempts_file, 200, generate_lessons(10, rng()), rng(), history_days=30)
+    entries = [json.loads(line) for line in attempts_file.read_text(encoding="utf-8").splitlines()]
+    assert len(entries) == 200
+    timestamps = [entry["timestamp"] for entry in entries]
+    assert timestamps == sorted(timestamps)
+
+
+def test_fake_olympos_failure_rates():
+    assert FakeOlympos().register_into_group_lesson("YOGA", "10:00") == "Registered"
+    with pytest.raises(BusinessException):
+        FakeOlympos(full_rate=1).register_into_group_lesson("YOGA", "10:00")
+    with pytest.raises(RuntimeError):
+        FakeOlympos(error_rate=1).register_into_group_lesson("YOGA", "10:00")
+
+    waits = []
+    FakeOlympos(latency_ms=250, sleep=waits.append).register_into_group_lesson("YOGA", "10:00")
+    assert waits == [0.25]
+
+
+def test_run_load_reports_phases_and_counts(tmp_path):
+    report = run_load(Scale(lessons=200, registrations=100, attempts=500, seed=1), tmp_path)
+    assert list(report["phases"]) == ["generate", "filter_registered", "process_lessons", "append_registered", "report"]
+    counts = report["counts"]
+    # Every lesson gets one outcome, lessons that failed once more for their retry
+    assert sum(counts["outcomes"].values()) == counts["registration_calls"] >= counts["lessons_processed"] == 150
+    assert counts["registrations"] == 100 + counts["outcomes"].get("REGISTERED", 0)
+    assert report["throughput"]["lessons_per_second"] > 0
+    assert len((tmp_path / "robot_attempts.jsonl").read_text(encoding="utf-8").splitlines()) == 500 + counts["registration_calls"]
+    assert (tmp_path / "robot_attempts.html").exists()
+
+
+def test_main_prints_json(capsys):
+    main(["--lessons", "20", "--registrations", "10", "--attempts", "50", "--json"])
+    report = json.loads(capsys.readouterr().out)
+    assert report["scale"]["lessons"] == 20
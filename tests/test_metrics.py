@@ -0,0 +1,50 @@
+import pytest
+
+from metrics import Metrics
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    return Metrics(state_file=tmp_path / "metrics_state.json")
+
+
+def test_counters_are_updated_incrementally_across_runs(metrics, tmp_path):
+    metrics.inc("olympos_robot_runs_total", {"status": "SUCCESS"})
+    metrics.save()
+    next_run = Metrics(state_file=tmp_path / "metrics_state.json")
+    next_run.inc("olympos_robot_runs_total", {"status": "SUCCESS"})
+    next_run.inc("olympos_robot_runs_total", {"status": "FAIL"})
+    rendered = next_run.render()
+    assert 'olympos_robot_runs_total{status="SUCCESS"} 2' in rendered
+    assert 'olympos_robot_runs_total{status="FAIL"} 1' in rendered
+    assert "# TYPE olympos_robot_runs_total counter" in rendered
+
+
+def test_histogram_buckets_are_cumulative(metrics):
+    for value in (0.05, 0.3, 3.0, 500.0):
+        metrics.observe("olympos_robot_step_duration_seconds", value, {"step": "navigation"})
+    rendered = metrics.render()
+    assert 'olympos_robot_step_duration_seconds_bucket{step="navigation",le="0.1"} 1' in rendered
+    assert 'olympos_robot_step_duration_seconds_bucket{step="navigation",le="0.5"} 2' in rendered
+    assert 'olympos_robot_step_duration_seconds_bucket{step="navigation",le="120.0"} 3' in rendered
+    assert 'olympos_robot_step_duration_seconds_bucket{step="navigation",le="+Inf"} 4' in rendered
+    assert 'olympos_robot_step_duration_seconds_count{step="navigation"} 4' in rendered
+
+
+def test_label_values_are_escaped(metrics):
+    metrics.inc("olympos_robot_attempts_total", {"code": 'a"b'})
+    assert 'olympos_robot_attempts_total{code="a\\"b"} 1' in metrics.render()
+
+
+def test_write_textfile(metrics, tmp_path):
+    metrics.set("olympos_robot_last_run_timestamp_seconds", 1700000000)
+    textfile = tmp_path / "textfile" / "olympos_robot.prom"
+    metrics.write_textfile(textfile)
+    assert "olympos_robot_last_run_timestamp_seconds 1700000000" in textfile.read_text()
+    assert not textfile.with_name("olympos_robot.prom.tmp").exists()
+
+
+def test_corrupt_state_starts_from_zero(tmp_path):
+    state_file = tmp_path / "metrics_state.json"
+    state_file.write_text("{broken")
+    assert Metrics(state_file=state_file).values == {}
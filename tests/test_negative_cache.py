@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from log_attempt import Outcome, ResultCode
+from negative_cache import NegativeCache
+
+NOW = datetime(2025, 6, 16, 12, 0)
+LESSON = {"lesson_type": "GROUPLESSON", "name": "POLESPORTS", "day": "Ma", "time": "20:15", "datetime": "2025-06-16T20:15:00"}
+
+
+def test_full_lesson_is_cached_until_ttl_expires(tmp_path):
+    cache = NegativeCache(tmp_path / "cache.json", ttls={ResultCode.ALREADY_FULL: timedelta(minutes=30)})
+    cache.add(LESSON, Outcome(ResultCode.ALREADY_FULL), now=NOW)
+    assert cache.lookup(LESSON, now=NOW + timedelta(minutes=29)) == ResultCode.ALREADY_FULL
+    assert cache.lookup(LESSON, now=NOW + timedelta(minutes=30)) is None
+    assert cache.stats == {"hits": 1, "misses": 1}
+    assert cache.hit_rate() == 0.5
+
+
+def test_other_outcomes_and_other_occurrences_are_not_cached(tmp_path):
+    cache = NegativeCache(tmp_path / "cache.json")
+    cache.add(LESSON, Outcome(ResultCode.EXCEPTION), now=NOW)
+    assert cache.lookup(LESSON, now=NOW) is None
+    cache.add(LESSON, Outcome(ResultCode.NOT_FOUND), now=NOW)
+    assert cache.lookup({**LESSON, "datetime": "2025-06-23T20:15:00"}, now=NOW) is None
+    cache.remove(LESSON)
+    assert cache.lookup(LESSON, now=NOW) is None
+
+
+def test_entry_is_dropped_when_booking_window_opened_since(tmp_path):
+    cache = NegativeCache(tmp_path / "cache.json")
+    lesson = {**LESSON, "release_at": (NOW + timedelta(minutes=5)).isoformat()}
+    cache.add(lesson, Outcome(ResultCode.ALREADY_FULL), now=NOW)
+    assert cache.lookup(lesson, now=NOW + timedelta(minutes=4)) == ResultCode.ALREADY_FULL
+    assert cache.lookup(lesson, now=NOW + timedelta(minutes=6)) is None
+
+
+def test_not_found_is_only_cached_after_the_booking_window_opened(tmp_path):
+    cache = NegativeCache(tmp_path / "cache.json")
+    # Without a known window, or before it opens, the lesson is probably just not bookable yet
+    cache.add(LESSON, Outcome(ResultCode.NOT_FOUND), now=NOW)
+    assert cache.lookup(LESSON, now=NOW) is None
+    not_open = {**LESSON, "release_at": (NOW + timedelta(minutes=5)).isoformat()}
+    cache.add(not_open, Outcome(ResultCode.NOT_FOUND), now=NOW)
+    assert cache.lookup(not_open, now=NOW) is None
+
+    opened = {**LESSON, "release_at": (NOW - timedelta(minutes=5)).isoformat()}
+    cache.add(opened, Outcome(ResultCode.NOT_FOUND), now=NOW)
+    assert cache.lookup(opened, now=NOW + timedelta(hours=1)) == ResultCode.NOT_FOUND
+
+
+def test_cache_and_stats_persist_without_expired_entries(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    cache = NegativeCache(cache_file)
+    cache.add(LESSON, Outcome(ResultCode.ALREADY_FULL), now=NOW - timedelta(hours=1))
+    yoga = {**LESSON, "name": "YOGA", "release_at": (NOW - timedelta(days=1)).isoformat()}
+    cache.add(yoga, Outcome(ResultCode.NOT_FOUND), now=NOW)
+    cache.lookup(LESSON, now=NOW)
+    cache.save(now=NOW)
+
+    reloaded = NegativeCache(cache_file)
+    assert len(reloaded.entries) == 1
+    assert reloaded.stats == {"hits": 0, "misses": 1}
+    assert reloaded.lookup(yoga, now=NOW) == ResultCode.NOT_FOUND
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text("{not json")
+    assert NegativeCache(cache_file).entries == {}
@@ -0,0 +1,396 @@
+import re
+from contextlib import nullcontext
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+from robocorp.workitems import BusinessException
+
+import olympos_class
+from adaptive_timeouts import AdaptiveTimeouts
+from browser_footprint import launch_options
+from olympos_class import Olympos
+from run_budget import RunBudget
+
+
+class FakeLocator:
+    """Any chain of locator calls, narrowed down only by filters on a pattern."""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def get_by_role(self, role, **kwargs):
+        return self
+
+    def get_by_text(self, text):
+        return self
+
+    def locator(self, selector):
+        return self
+
+    def filter(self, has_text=None):
+        if isinstance(has_text, re.Pattern):
+            return FakeLocator([text for text in self.texts if has_text.search(text)])
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    def nth(self, index):
+        return self
+
+    def all(self):
+        return [FakeLocator([text]) for text in self.texts]
+
+    def inner_text(self):
+        return self.texts[0]
+
+    def get_attribute(self, name):
+        return self.texts[0] if name == "value" else None
+
+    def click(self, **kwargs):
+        pass
+
+    def select_option(self, value):
+        pass
+
+
+class FakeAssertions:
+    def __init__(self, locator):
+        self.locator = locator
+
+    def to_be_visible(self, timeout=None):
+        if not self.locator.texts:
+            raise AssertionError("not visible")
+
+    def not_to_have_class(self, pattern, timeout=None):
+        pass
+
+
+class FakePage:
+    def __init__(self, context=None, url="about:blank", reservations=(), rows=(), options=()):
+        self.context = context
+        self.url = url
+        self.reservations = list(reservations)  # texts of the group lesson reservation boxes on the products page
+        self.rows = list(rows)
+        self.options = list(options)
+        self.visited: list[str] = []
+        self.closed = False
+        self.waited = False
+        self.reloaded = False
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def goto(self, url, **kwargs):
+        self.visited.append(url)
+        self.url = url
+
+    def wait_for_load_state(self):
+        self.waited = True
+
+    def reload(self):
+        self.reloaded = True
+
+    def bring_to_front(self):
+        pass
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def get_by_role(self, role, **kwargs):
+        if role == "row":
+            return FakeLocator(self.rows)
+        if role == "strong":
+            return FakeLocator(self.reservations)
+        if role == "combobox":
+            return FakeLocator(self.options)
+        return FakeLocator([role])
+
+    def expect_navigation(self):
+        return nullcontext()
+
+
+class FakeContext:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.pages: list[FakePage] = []
+        self.closed = False
+
+    def new_page(self):
+        self.pages.append(FakePage(self))
+        return self.pages[-1]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts: list[FakeContext] = []
+        self.closed = False
+
+    def new_context(self, **kwargs):
+        self.contexts.append(FakeContext(**kwargs))
+        return self.contexts[-1]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self, launch_errors=(), cdp_browser=None):
+        self.launch_errors = list(launch_errors)
+        self.launched: list[dict] = []
+        self.browser = FakeBrowser()
+        self.cdp_browser = cdp_browser  # None: nothing listens at the CDP url
+        self.connected: list[str] = []
+
+    def connect_over_cdp(self, url, timeout=None):
+        self.connected.append(url)
+        if self.cdp_browser is None:
+            raise PlaywrightError(f"connect ECONNREFUSED {url}")
+        return self.cdp_browser
+
+    def launch(self, **options):
+        self.launched.append(options)
+        if self.launch_errors:
+            raise self.launch_errors.pop(0)
+        return self.browser
+
+
+class FakeBrowserModule:
+    """Stands in for robocorp.browser, which has no browser installed here."""
+
+    def __init__(self, chromium):
+        self.chromium = chromium
+        self.installed: list[str] = []
+
+    def playwright(self):
+        return SimpleNamespace(chromium=self.chromium)
+
+    def install(self, engine):
+        self.installed.append(engine)
+
+
+class FakeArtifacts:
+    def __init__(self):
+        self.started: list[FakeContext] = []
+        self.stopped: list[FakeContext] = []
+
+    def start(self, context):
+        self.started.append(context)
+
+    def stop(self, context):
+        self.stopped.append(context)
+
+    def capture(self, step, page):
+        return nullcontext()
+
+
+@pytest.fixture
+def fake_browser(monkeypatch, tmp_path):
+    # No saved cookies and no stealth bundle written into the repo
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(olympos_class, "apply_stealth", lambda context: None)
+
+    def install(chromium):
+        module = FakeBrowserModule(chromium)
+        monkeypatch.setattr(olympos_class, "browser", module)
+        return module
+
+    return install
+
+
+def make_olympos(tmp_path, **kwargs) -> Olympos:
+    return Olympos(
+        dummy_run=True,
+        timeouts=AdaptiveTimeouts(history_file=tmp_path / "latency.json"),
+        budget=RunBudget(600, started_at=0, clock=lambda: 0),
+        failure_artifacts=FakeArtifacts(),
+        **kwargs,
+    )
+
+
+def test_launch_passes_footprint_options_to_own_browser(fake_browser, tmp_path):
+    chromium = FakeChromium()
+    fake_browser(chromium)
+    olympos = make_olympos(tmp_path, lean=True)
+
+    page = olympos._launch()
+
+    assert chromium.launched == [launch_options(lean=True)]
+    assert chromium.launched[0]["args"]
+    assert page.context is chromium.browser.contexts[0]
+    assert olympos.failure_artifacts.started == [page.context]
+
+    olympos.close()
+    assert page.context.closed
+    assert chromium.browser.closed
+    assert olympos.failure_artifacts.stopped == []
+
+
+def test_launch_installs_a_missing_browser(fake_browser, tmp_path):
+    chromium = FakeChromium([PlaywrightError("Executable doesn't exist at /ms-playwright/chromium")])
+    module = fake_browser(chromium)
+
+    make_olympos(tmp_path)._launch()
+
+    assert module.installed == ["chromium"]
+    assert len(chromium.launched) == 2
+
+
+def test_launch_error_is_raised(fake_browser, tmp_path):
+    fake_browser(FakeChromium([PlaywrightError("Browser closed")]))
+    with pytest.raises(PlaywrightError):
+        make_olympos(tmp_path)._launch()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def booking_olympos(monkeypatch, tmp_path):
+    monkeypatch.setattr(olympos_class, "expect", FakeAssertions)
+    monkeypatch.setattr(olympos_class, "sleep", lambda seconds: None)
+    clock = Clock()
+    olympos = Olympos(
+        dummy_run=False, timeouts=AdaptiveTimeouts(history_file=tmp_path / "latency.json"), budget=RunBudget(600, started_at=0, clock=clock), failure_artifacts=FakeArtifacts()
+    )
+    olympos.page = FakePage(
+        reservations=["17 jun 2025 19:00 - 20:00 (YOGA)", "18 jun 2025 20:15 - 21:10 (POLESPORTS)"], rows=["19:00 - 20:00 YOGA"], options=["SALSA beginners Di 19:00"]
+    )
+
+    def checkout():
+        # The checkout used up what was left of the run budget
+        clock.now = 600
+
+    monkeypatch.setattr(olympos, "complete_shopping_cart", checkout)
+    return olympos
+
+
+def test_scrape_is_a_step_and_reservation_boxes_is_not():
+    assert hasattr(Olympos.scrape_registered_lessons, "__wrapped__")
+    assert not hasattr(Olympos._reservation_boxes, "__wrapped__")
+
+
+def test_booking_verified_after_checkout_used_up_the_budget(booking_olympos):
+    booking_olympos.register_into_group_lesson("YOGA", "19:00", lesson_datetime=datetime(2025, 6, 17, 19, 0))
+    assert booking_olympos.page.visited[-1] == Olympos.PRODUCTS_URL
+    assert booking_olympos.budget.exhausted()
+
+
+def test_course_booking_is_not_looked_for_among_group_lessons(booking_olympos, monkeypatch):
+    verified = []
+    monkeypatch.setattr(booking_olympos, "verify_booking", verified.append)
+    booking_olympos.register_into_course("SALSA", datetime(2026, 3, 3, 19, 0), description="Salsa")
+    assert verified == []
+
+
+def test_booking_not_on_products_page_is_unverified(booking_olympos):
+    with pytest.raises(BusinessException) as e:
+        booking_olympos.register_into_group_lesson("YOGA", "19:00", lesson_datetime=datetime(2025, 6, 24, 19, 0))
+    assert e.value.code == "REGISTRATION_UNVERIFIED"
+
+
+def test_goto_adopts_prefetched_tabs_and_reloads_a_stale_one(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(olympos_class, "perf_counter", clock)
+    olympos = make_olympos(tmp_path)
+    context = FakeContext()
+    main_page = olympos.page = context.new_page()
+
+    olympos.prefetch([Olympos.GROUP_LESSONS_URL, Olympos.TICKETS_URL])
+    group_lessons_tab, tickets_tab = context.pages[1:]
+    assert group_lessons_tab.visited == [Olympos.GROUP_LESSONS_URL]
+
+    clock.now = Olympos.PREFETCH_MAX_AGE - 1
+    olympos._goto(Olympos.GROUP_LESSONS_URL)
+    assert olympos.page is group_lessons_tab
+    assert group_lessons_tab.waited
+    assert not group_lessons_tab.reloaded
+    assert main_page.visited == []
+    # The page it replaces is not left open
+    assert main_page.closed
+
+    clock.now = Olympos.PREFETCH_MAX_AGE + 1
+    olympos._goto(Olympos.TICKETS_URL)
+    assert olympos.page is tickets_tab
+    assert tickets_tab.reloaded
+    assert group_lessons_tab.closed
+    assert olympos._prefetched == {}
+
+    # Not prefetched: loaded in the current page
+    olympos._goto(Olympos.PRODUCTS_URL)
+    assert olympos.page is tickets_tab
+    assert tickets_tab.visited == [Olympos.TICKETS_URL, Olympos.PRODUCTS_URL]
+
+
+def test_shopping_cart_is_not_prefetched(tmp_path):
+    olympos = Olympos(dummy_run=False, timeouts=AdaptiveTimeouts(history_file=tmp_path / "latency.json"), budget=RunBudget(600, started_at=0, clock=lambda: 0))
+    assert olympos.prefetch_urls([{"lesson_type": "COURSE"}, {"lesson_type": "GROUPLESSON"}]) == [Olympos.TICKETS_URL, Olympos.GROUP_LESSONS_URL]
+
+
+def test_attach_over_cdp_reuses_open_olympos_page(fake_browser, tmp_path):
+    running = FakeBrowser()
+    context = running.new_context()
+    context.new_page()
+    olympos_page = FakePage(context, url="https://www.olympos.nl/mijn-actieve-producten")
+    context.pages.append(olympos_page)
+    chromium = FakeChromium(cdp_browser=running)
+    fake_browser(chromium)
+    olympos = make_olympos(tmp_path, cdp_url="http://localhost:9222")
+
+    olympos._start()
+
+    assert chromium.connected == ["http://localhost:9222"]
+    assert chromium.launched == []
+    assert olympos.page is olympos_page
+    assert olympos_page.visited == [Olympos.LOGIN_URL]
+    assert olympos.failure_artifacts.started == [context]
+    assert olympos.timeouts.history["browser_attach"]
+    # An attached browser is not ours to close, but it is no longer traced
+    olympos.close()
+    assert not running.closed
+    assert olympos.failure_artifacts.stopped == [context]
+
+
+def test_unreachable_cdp_url_falls_back_to_a_launch(fake_browser, tmp_path):
+    chromium = FakeChromium()
+    fake_browser(chromium)
+    olympos = make_olympos(tmp_path, cdp_url="http://localhost:9222")
+
+    olympos._start()
+
+    assert chromium.connected == ["http://localhost:9222"]
+    assert len(chromium.launched) == 1
+    assert olympos.page.context is chromium.browser.contexts[0]
+    assert olympos.timeouts.history["browser_launch"]
+
+
+class TypingField:
+    def __init__(self):
+        self.pressed = []
+
+    def press_sequentially(self, key):
+        self.pressed.append(key)
+
+    def evaluate(self, script, arg):
+        raise AssertionError("typed with untrusted events")
+
+
+def test_credentials_are_typed_with_trusted_key_presses_by_default(monkeypatch, tmp_path):
+    monkeypatch.setattr(olympos_class, "sleep", lambda seconds: None)
+    field = TypingField()
+    make_olympos(tmp_path)._type(field, "secret")
+    assert field.pressed == list("secret")
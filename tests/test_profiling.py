@@ -0,0 +1,33 @@
+import time
+
+from profiling import profiling_enabled, start_profiling, stop_profiling
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profiling_is_enabled_by_the_environment(monkeypatch):
+    assert profiling_enabled({}) is False
+    assert profiling_enabled({"OLYMPOS_PROFILE": "0"}) is False
+    assert profiling_enabled({"OLYMPOS_PROFILE": "1"}) is True
+    monkeypatch.setattr("sys.argv", ["tasks.py", "--profile"])
+    monkeypatch.delenv("OLYMPOS_PROFILE", raising=False)
+    assert profiling_enabled() is False
+
+
+def test_profiler_writes_profile_and_collapsed_stacks(tmp_path):
+    start_profiling()
+    busy_wait(0.2)
+    files = stop_profiling(tmp_path)
+    assert [f.name for f in files] == ["profile.prof", "profile.collapsed"]
+    assert files[0].stat().st_size > 0
+    collapsed = files[1].read_text().splitlines()
+    assert any("busy_wait (test_profiling.py" in line for line in collapsed)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+
+
+def test_stop_without_start_writes_nothing(tmp_path):
+    assert stop_profiling(tmp_path) == []
@@ -0,0 +1,109 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from report_server import AttemptIndex, make_server, parse_query
+
+
+def attempt(timestamp: str, name: str, code: str, lesson_type: str = "GROUPLESSON") -> dict:
+    return {"timestamp": timestamp, "result": code.title(), "action": {"name": name, "lesson_type": lesson_type}, "outcome": {"code": code}}
+
+
+ATTEMPTS = [
+    attempt("2025-05-30T10:00:00", "POLESPORTS", "EXCEPTION"),
+    attempt("2025-06-01T10:00:00", "POLESPORTS", "ALREADY_FULL"),
+    attempt("2025-06-10T10:00:00", "YOGA", "EXCEPTION"),
+    attempt("2025-06-15T10:00:00", "POLESPORTS", "EXCEPTION"),
+    attempt("2025-06-30T23:59:59", "CHEERLEADING", "REGISTERED", "COURSE"),
+]
+
+
+@pytest.fixture
+def attempts_file(tmp_path):
+    path = tmp_path / "robot_attempts.jsonl"
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in ATTEMPTS))
+    return path
+
+
+def test_filters_combine_with_date_range(attempts_file):
+    index = AttemptIndex(attempts_file)
+    rows, total = index.query(name="POLESPORTS", code="EXCEPTION", since="2025-06-01", until="2025-06-30")
+    assert total == 1
+    assert rows[0]["timestamp"] == "2025-06-15T10:00:00"
+    rows, total = index.query(since="2025-06-01", until="2025-06-30", lesson_type="COURSE")
+    assert [row["action"]["name"] for row in rows] == ["CHEERLEADING"]
+
+
+def test_sorting_and_pagination(attempts_file):
+    index = AttemptIndex(attempts_file)
+    rows, total = index.query(page=2, page_size=2)
+    assert total == 5
+    assert [row["timestamp"][:10] for row in rows] == ["2025-06-10", "2025-06-01"]
+    rows, _ = index.query(sort="name", descending=False, page_size=1)
+    assert rows[0]["action"]["name"] == "CHEERLEADING"
+    with pytest.raises(ValueError):  # noqa: PT011
+        index.query(sort="result")
+
+
+def test_only_appended_lines_are_read(attempts_file):
+    index = AttemptIndex(attempts_file)
+    index.refresh()
+    with attempts_file.open("a") as f:
+        f.write(json.dumps(attempt("2025-07-01T09:00:00", "YOGA", "REGISTERED")) + "\n")
+        f.write('{"timestamp": "2025-07-01T09:01:00", "res')  # still being written
+    assert index.query(name="YOGA")[1] == 2
+    assert len(index.entries) == 6
+
+    attempts_file.write_text(json.dumps(ATTEMPTS[0]) + "\n")
+    assert index.query()[1] == 1
+
+
+def test_parse_query_defaults_and_limits():
+    query = parse_query("name=YOGA&page=0&page_size=100000&order=asc")
+    assert query["name"] == "YOGA"
+    assert query["lesson_type"] is None
+    assert query["page"] == 1
+    assert query["page_size"] == 500
+    assert not query["descending"]
+
+
+def test_server_answers_json_and_html(attempts_file):
+    server = make_server(port=0, attempts_file=attempts_file)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base_url}/api/attempts?code=EXCEPTION&page_size=2") as response:  # noqa: S310
+            data = json.load(response)
+        assert data["total"] == 3
+        assert len(data["attempts"]) == 2
+        with urllib.request.urlopen(f"{base_url}/?name=POLESPORTS") as response:  # noqa: S310
+            page = response.read().decode("utf-8")
+        assert "3 attempts" in page
+        assert 'class="result-Exception"' in page
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_server_serves_failure_artifacts_only(attempts_file):
+    failure_dir = attempts_file.parent / "failures" / "20250615T100000_scrape"
+    failure_dir.mkdir(parents=True)
+    (failure_dir / "screenshot.jpg").write_bytes(b"jpeg")
+    (attempts_file.parent / "secret.txt").write_text("secret")
+    server = make_server(port=0, attempts_file=attempts_file)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base_url}/failures/20250615T100000_scrape/screenshot.jpg") as response:  # noqa: S310
+            assert response.headers["Content-Type"] == "image/jpeg"
+            assert response.read() == b"jpeg"
+        with pytest.raises(urllib.error.HTTPError, match="404"):
+            urllib.request.urlopen(f"{base_url}/failures/%2E%2E/secret.txt")  # noqa: S310
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,62 @@
+import pytest
+
+from reservation_parser import ParseError, parse_reservation_text, parse_reservation_texts, reservation_text_pattern
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        (
+            "16 jun 2025 20:15 – 21:10 (POLESPORTS)",  # noqa: RUF001
+            {"name": "POLESPORTS", "lesson_type": "GROUPLESSON", "day": "Ma", "time": "20:15", "datetime": "2025-06-16T20:15:00"},
+        ),
+        # Dutch months that differ from the English abbreviations
+        ("5 mrt 2025 09:00 - 10:00 (YOGA)", {"name": "YOGA", "lesson_type": "GROUPLESSON", "day": "Wo", "time": "09:00", "datetime": "2025-03-05T09:00:00"}),
+        (
+            "1 mei 2025 18:30 - 19:30 (AERIAL ACROBATIEK)",
+            {"name": "AERIAL ACROBATIEK", "lesson_type": "GROUPLESSON", "day": "Do", "time": "18:30", "datetime": "2025-05-01T18:30:00"},
+        ),
+        ("12 Okt. 2025 10:00 - 11:00 (YOGA)", {"name": "YOGA", "lesson_type": "GROUPLESSON", "day": "Zo", "time": "10:00", "datetime": "2025-10-12T10:00:00"}),
+        (
+            "17 dec 2025 20:00 – 21:00 (Cursus Cheerleading)",  # noqa: RUF001
+            {"name": "CHEERLEADING", "lesson_type": "COURSE", "day": "Wo", "time": "20:00", "datetime": "2025-12-17T20:00:00"},
+        ),
+        ("3 maart 2026 19:00 - 20:00 (Cursus Salsa)", {"name": "SALSA", "lesson_type": "COURSE", "day": "Di", "time": "19:00", "datetime": "2026-03-03T19:00:00"}),
+    ],
+)
+def test_parse_reservation_text(text, expected):
+    assert parse_reservation_text(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "16 jun 2025 (POLESPORTS)", "16 foo 2025 20:15 - 21:10 (POLESPORTS)", "31 feb 2025 20:15 - 21:10 (POLESPORTS)"])
+def test_parse_reservation_text_invalid(text):
+    with pytest.raises(ValueError):  # noqa: PT011
+        parse_reservation_text(text)
+
+
+def test_batch_reports_errors_per_item():
+    texts = ["16 jun 2025 20:15 - 21:10 (POLESPORTS)", "geen reservering", "17 jun 2025 19:00 - 20:00 (YOGA)"]
+    parsed = parse_reservation_texts(texts)
+    assert [lesson["name"] for lesson in parsed.lessons] == ["POLESPORTS", "YOGA"]
+    assert parsed.errors == [ParseError(1, "geen reservering", "Could not parse reservation text: geen reservering")]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "16 jun 2025 20:15 – 21:10 (POLESPORTS)",  # noqa: RUF001
+        "5 mrt 2025 09:00 - 10:00 (YOGA)",
+        "12 Okt. 2025 10:00 - 11:00 (YOGA)",
+    ],
+)
+def test_reservation_text_pattern_matches_parsed_lesson(text):
+    assert reservation_text_pattern(parse_reservation_text(text)).search(text)
+
+
+def test_reservation_text_pattern_only_matches_that_lesson():
+    pattern = reservation_text_pattern({"name": "YOGA", "lesson_type": "GROUPLESSON", "datetime": "2025-06-17T19:00:00"})
+    assert pattern.search("Geldigheid 17 jun 2025 19:00 - 20:00 (YOGA)")
+    assert not pattern.search("17 jun 2025 19:00 - 20:00 (POLESPORTS)")
+    assert not pattern.search("27 jun 2025 19:00 - 20:00 (YOGA)")
+    assert not pattern.search("17 jun 2025 20:00 - 21:00 (YOGA)")
+    assert not pattern.search("17 jul 2025 19:00 - 20:00 (YOGA)")
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from run_budget import SHUTDOWN_RESERVE_SECONDS, RunBudget
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_remaining_keeps_shutdown_reserve():
+    clock = FakeClock()
+    budget = RunBudget(total_seconds=100, started_at=clock.now, clock=clock)
+    assert budget.remaining() == 100 - SHUTDOWN_RESERVE_SECONDS
+    clock.now += 100 - SHUTDOWN_RESERVE_SECONDS
+    assert budget.exhausted()
+    assert budget.remaining() == 0
+
+
+def test_timeout_shrinks_with_budget_but_respects_minimum():
+    clock = FakeClock()
+    budget = RunBudget(total_seconds=SHUTDOWN_RESERVE_SECONDS + 30, started_at=clock.now, clock=clock)
+    assert budget.timeout_ms(10000) == 10000
+    assert budget.timeout_ms(60000) == 30000
+    clock.now += 29.5
+    assert budget.timeout_ms(60000) == 1000
+    assert budget.timeout_ms(500) == 500
+    assert budget.can_afford(0.5)
+    assert not budget.can_afford(1)
+
+
+def test_phases_are_recorded_also_on_failure(tmp_path):
+    clock = FakeClock()
+    budget = RunBudget(total_seconds=200, started_at=clock.now - 5, clock=clock)
+    with budget.phase("login"):
+        clock.now += 10
+
+    def failing_registration() -> None:
+        with budget.phase("registration"):
+            clock.now += 20
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        failing_registration()
+    with budget.phase("login"):
+        clock.now += 5
+
+    report = budget.write_report(tmp_path / "run_budget.json")
+    assert report == json.loads((tmp_path / "run_budget.json").read_text())
+    assert report["elapsed_seconds"] == 40
+    assert report["phases"]["login"] == {"seconds": 15, "budget_share": 0.075}
+    assert report["phases"]["registration"]["seconds"] == 20
+    assert report["phases"]["other"]["seconds"] == 5
+
+
+def test_budget_starts_at_process_start():
+    assert RunBudget().elapsed() > 0
@@ -0,0 +1,32 @@
+import os
+
+from run_lock import RunLock
+
+
+def test_second_lock_is_refused_while_first_is_held(tmp_path):
+    lock_file = tmp_path / "run.lock"
+    with RunLock(lock_file) as first:
+        assert first.acquired
+        assert lock_file.read_text() == str(os.getpid())
+        with RunLock(lock_file) as second:
+            assert not second.acquired
+        assert lock_file.exists()
+    assert not lock_file.exists()
+
+
+def test_stale_lock_of_dead_process_is_taken_over(tmp_path, monkeypatch):
+    lock_file = tmp_path / "run.lock"
+    lock_file.write_text("999999")
+    monkeypatch.setattr("run_lock.psutil.pid_exists", lambda pid: False)
+    with RunLock(lock_file) as lock:
+        assert lock.acquired
+        assert lock_file.read_text() == str(os.getpid())
+
+
+def test_lock_file_without_pid_is_respected_briefly(tmp_path):
+    lock_file = tmp_path / "run.lock"
+    lock_file.write_text("")
+    assert not RunLock(lock_file).acquire()
+    old = lock_file.stat().st_mtime - 60
+    os.utime(lock_file, (old, old))
+    assert RunLock(lock_file).acquire()
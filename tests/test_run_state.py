@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from atomic_write import WriteCoalescer
+from log_attempt import Outcome, ResultCode
+from run_state import RunState
+
+TODAY = date(2025, 6, 16)
+
+
+def test_failures_are_counted_per_day():
+    run_state = RunState()
+    run_state.count_outcome(Outcome(ResultCode.TIMEOUT), TODAY - timedelta(days=1))
+    run_state.count_outcome(Outcome(ResultCode.EXCEPTION), TODAY)
+    run_state.count_outcome(Outcome(ResultCode.REGISTERED), TODAY)
+    run_state.count_outcome(Outcome(ResultCode.BUSINESS_EXCEPTION), TODAY)
+    assert run_state.failures_on(TODAY) == 2
+    assert run_state.failures_on(TODAY - timedelta(days=1)) == 0
+
+
+def test_scrape_once_a_day():
+    run_state = RunState()
+    assert run_state.should_scrape(TODAY)
+    run_state.mark_scraped(TODAY)
+    assert not run_state.should_scrape(TODAY)
+    assert run_state.should_scrape(TODAY + timedelta(days=1))
+
+
+def test_scrape_interval_and_request():
+    run_state = RunState()
+    run_state.mark_scraped(TODAY)
+    assert not run_state.should_scrape(TODAY + timedelta(days=6), interval_days=7)
+    assert run_state.should_scrape(TODAY + timedelta(days=7), interval_days=7)
+    run_state.request_scrape()
+    assert run_state.should_scrape(TODAY, interval_days=7)
+
+
+def test_snapshot_round_trip_in_one_file(tmp_path):
+    state_file = tmp_path / "run_state.json"
+    run_state = RunState(registrations=[{"name": "POLESPORTS", "day": "Ma", "time": "20:15", "datetime": "2025-06-16T20:15:00"}])
+    run_state.mark_scraped(TODAY)
+    run_state.mark_session("cookies", datetime(2025, 6, 16, 12, 0))
+    run_state.save(state_file)
+    assert [file.name for file in tmp_path.iterdir()] == ["run_state.json"]
+    assert RunState.load(state_file) == run_state
+
+
+def test_coalesced_save_writes_latest_state_on_flush(tmp_path):
+    state_file = tmp_path / "run_state.json"
+    run_state = RunState()
+    with WriteCoalescer() as coalescer:
+        run_state.registrations.append({"name": "Yoga"})
+        run_state.save(state_file, coalescer=coalescer)
+        run_state.registrations.append({"name": "Pilates"})
+        run_state.save(state_file, coalescer=coalescer)
+        assert not state_file.exists()
+    assert RunState.load(state_file).registrations == [{"name": "Yoga"}, {"name": "Pilates"}]
+
+
+@pytest.mark.parametrize("content", ['{"registrations": [', '["not", "a", "state"]', '{"unknown": 1}'])
+def test_damaged_snapshot_loads_as_fresh_state(tmp_path, content):
+    state_file = tmp_path / "run_state.json"
+    state_file.write_text(content, encoding="utf-8")
+    assert RunState.load(state_file) == RunState()
@@ -0,0 +1,71 @@
+import subprocess
+from datetime import datetime, timedelta
+
+from run_lock import RunLock
+from scheduler import ARCHIVE_COMMAND, RUN_COMMAND, next_run, run_pipeline, sleep_until, upcoming_releases
+
+NOW = datetime(2025, 6, 16, 12, 0)  # Monday
+
+
+def next_occurrence(lesson):
+    return {"Ma": "2025-06-16T20:15:00", "Wo": "2025-06-18T17:30:00"}[lesson["day"]]
+
+
+def test_upcoming_releases_sorted_and_skipping_lessons_without_window():
+    lessons = [
+        {"name": "POLESPORTS", "day": "Wo", "time": "17:30", "opens_before_hours": 24},
+        {"name": "POLESPORTS", "day": "Ma", "time": "20:15", "opens_before_hours": 2},
+        {"name": "CHEERLEADING", "day": "Ma", "time": "20:15"},
+    ]
+    releases = upcoming_releases(lessons, NOW, resolve_datetime=next_occurrence)
+    assert [release for release, _ in releases] == [datetime(2025, 6, 16, 18, 15), datetime(2025, 6, 17, 17, 30)]
+
+
+def test_upcoming_release_moves_to_next_week_when_window_already_open():
+    lessons = [{"name": "POLESPORTS", "day": "Ma", "time": "20:15", "opens_before_hours": 48}]
+    releases = upcoming_releases(lessons, NOW, resolve_datetime=next_occurrence)
+    assert releases[0][0] == datetime(2025, 6, 21, 20, 15)
+
+
+def test_next_run_is_lead_time_before_release():
+    releases = [(NOW + timedelta(minutes=30), {})]
+    assert next_run(releases, NOW, last_run=NOW, lead_time=timedelta(minutes=2), interval=timedelta(hours=1)) == NOW + timedelta(minutes=28)
+
+
+def test_next_run_falls_back_to_interval():
+    releases = [(NOW + timedelta(hours=5), {})]
+    assert next_run(releases, NOW, last_run=NOW - timedelta(minutes=10), interval=timedelta(hours=1)) == NOW + timedelta(minutes=50)
+    assert next_run([], NOW, last_run=None) == NOW
+
+
+def test_sleep_until_sleeps_in_chunks():
+    clock = [NOW]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += timedelta(seconds=seconds)
+
+    sleep_until(NOW + timedelta(seconds=150), clock=lambda: clock[0], sleep=sleep)
+    assert sleeps == [60, 60, 30]
+
+
+def test_pipeline_runs_robot_and_archive_under_one_lock(tmp_path):
+    lock_file = tmp_path / "pipeline.lock"
+    commands = []
+
+    def run(command, check):
+        commands.append((command, lock_file.exists()))
+        return subprocess.CompletedProcess(command, 3)
+
+    assert run_pipeline(lock_file, run) == 3
+    assert commands == [(RUN_COMMAND, True), (ARCHIVE_COMMAND, True)]
+    assert not lock_file.exists()
+
+
+def test_pipeline_is_skipped_while_another_one_runs(tmp_path):
+    lock_file = tmp_path / "pipeline.lock"
+    commands = []
+    with RunLock(lock_file):
+        assert run_pipeline(lock_file, lambda command, check: commands.append(command)) == 0
+    assert commands == []
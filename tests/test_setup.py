@@ -0,0 +1,14 @@
+from setup import isolate_replay
+
+
+def test_replay_gets_its_own_work_directory_and_metrics_file():
+    environ = {"OLYMPOS_HAR_MODE": "replay", "METRICS_TEXTFILE": "/var/lib/node_exporter/olympos_robot.prom"}
+    isolate_replay(environ)
+    assert environ["OLYMPOS_WORK_DIR"] == "work_directory/replay"
+    assert environ["METRICS_TEXTFILE"] == "work_directory/replay/olympos_robot.prom"
+
+
+def test_real_runs_keep_the_default_work_directory():
+    environ = {"OLYMPOS_HAR_MODE": "record"}
+    isolate_replay(environ)
+    assert environ == {"OLYMPOS_HAR_MODE": "record"}
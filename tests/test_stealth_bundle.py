@@ -0,0 +1,44 @@
+from playwright_stealth import StealthConfig
+
+import stealth_bundle
+from stealth_bundle import STEALTH_OPTIONS, apply_stealth, bundle_key
+from stealth_bundle import stealth_bundle as get_bundle
+
+
+def test_bundle_holds_all_enabled_scripts_in_order(tmp_path):
+    bundle = get_bundle(cache_dir=tmp_path)
+    scripts = list(StealthConfig(**STEALTH_OPTIONS).enabled_scripts)
+    assert bundle.startswith("const opts = ")
+    positions = [bundle.index(script) for script in scripts]
+    assert positions == sorted(positions)
+
+
+def test_bundle_is_built_once_and_read_from_the_cache(tmp_path, monkeypatch):
+    get_bundle(cache_dir=tmp_path)
+    (bundle_file,) = tmp_path.iterdir()
+    assert bundle_file.name == f"{bundle_key(STEALTH_OPTIONS)}.js"
+
+    stealth_bundle._cached_bundle.cache_clear()
+
+    def fail(options):
+        raise AssertionError("rebuilt")
+
+    monkeypatch.setattr(stealth_bundle, "build_bundle", fail)
+    assert get_bundle(cache_dir=tmp_path) == bundle_file.read_text(encoding="utf-8")
+
+
+def test_key_depends_on_options():
+    assert bundle_key({"navigator_user_agent": False}) != bundle_key({})
+
+
+def test_registered_once_per_context(tmp_path, monkeypatch):
+    monkeypatch.setattr(stealth_bundle, "STEALTH_CACHE_DIR", tmp_path)
+    scripts = []
+
+    class FakeContext:
+        def add_init_script(self, script):
+            scripts.append(script)
+
+    apply_stealth(FakeContext(), options={"webdriver": True})
+    assert len(scripts) == 1
+    assert "webdriver" in scripts[0]
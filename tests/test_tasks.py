@@ -1,23 +1,33 @@
 import json
 import sys
 from datetime import datetime, timedelta
-from pathlib import Path
 
 import pytest
 
+from generate_robot_attempts_html import get_result_class
+from log_attempt import Outcome, ResultCode, log_attempt
+from metrics import Metrics
+from negative_cache import NegativeCache
+from run_budget import SHUTDOWN_RESERVE_SECONDS, RunBudget
+from run_state import RunState
 from tasks import (
     ApplicationException,
     BusinessException,
     append_registered,
+    count_failures,
+    counting_log_attempt,
     delete_old_registrations,
     determine_next_datetime,
+    failed_today_too_many_times,
     is_registered,
     load_registered,
+    load_run_state,
+    lost_run_lock,
     parse_args,
     process_lessons,
-    save_registered,
-    should_scrape_today,
-    update_last_scrape,
+    skip_cached_lessons,
+    wait_for_release,
+    write_status_file,
 )
 
 
@@ -29,47 +39,6 @@ def sample_lessons() -> list[dict]:
     ]
 
 
-@pytest.fixture
-def temp_last_scrape_file(tmp_path):
-    return tmp_path / "last_scrape.txt"
-
-
-def test_should_scrape_today_when_file_does_not_exist(temp_last_scrape_file):
-    assert should_scrape_today(last_scrape_file=temp_last_scrape_file) is True
-
-
-def test_should_scrape_today_when_file_has_yesterdays_date(temp_last_scrape_file):
-    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    temp_last_scrape_file.write_text(yesterday)
-    assert should_scrape_today(last_scrape_file=temp_last_scrape_file) is True
-
-
-def test_should_scrape_today_when_file_has_todays_date(temp_last_scrape_file):
-    today = datetime.now().strftime("%Y-%m-%d")
-    temp_last_scrape_file.write_text(today)
-    assert should_scrape_today(last_scrape_file=temp_last_scrape_file) is False
-
-
-def test_update_last_scrape(temp_last_scrape_file):
-    # Test that old data is overwritten:
-    temp_last_scrape_file.write_text("old-date")
-
-    # New data should be today's date
-    update_last_scrape(last_scrape_file=temp_last_scrape_file)
-    content = temp_last_scrape_file.read_text().strip()
-    today = datetime.now().strftime("%Y-%m-%d")
-    assert content == today
-
-
-def test_update_last_scrape_creates_file_if_not_exists(temp_last_scrape_file):
-    assert not temp_last_scrape_file.exists()
-    update_last_scrape(last_scrape_file=temp_last_scrape_file)
-    assert temp_last_scrape_file.exists()
-    content = temp_last_scrape_file.read_text().strip()
-    today = datetime.now().strftime("%Y-%m-%d")
-    assert content == today
-
-
 @pytest.fixture
 def temp_registrations_db(tmp_path):
     return tmp_path / "sample_lessons.json"
@@ -99,32 +68,6 @@ def test_load_registered_handles_invalid_json(temp_registrations_db):
         load_registered(registrations_db=temp_registrations_db)
 
 
-def test_save_registered_creates_file_and_writes_data(temp_registrations_db, sample_lessons):
-    save_registered(sample_lessons, registrations_db=temp_registrations_db)
-    assert temp_registrations_db.exists()
-    # Check file content is valid JSON and matches input
-    with temp_registrations_db.open() as f:
-        data = json.load(f)
-    assert data == sample_lessons
-
-
-def test_save_registered_overwrites_existing_file(temp_registrations_db):
-    initial = [{"name": "Old", "time": "09:00", "day": "Sunday"}]
-    temp_registrations_db.write_text(json.dumps(initial))
-    new_lessons = [{"name": "New", "time": "10:00", "day": "Monday"}]
-    save_registered(new_lessons, registrations_db=temp_registrations_db)
-    with temp_registrations_db.open() as f:
-        data = json.load(f)
-    assert data == new_lessons
-
-
-def test_save_registered_writes_empty_list(temp_registrations_db: Path):
-    save_registered([], registrations_db=temp_registrations_db)
-    with temp_registrations_db.open() as f:
-        data = json.load(f)
-    assert data == []
-
-
 @pytest.mark.parametrize(
     ("lesson", "registered", "expected"),
     [
@@ -343,7 +286,7 @@ def test_process_lessons_success(monkeypatch, dummy_olympos):
     def fake_save(lessons_arg):
         called["saved"] = lessons_arg.copy()
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         called.setdefault("logs", []).append((lesson, msg))
 
     process_lessons(
@@ -370,7 +313,7 @@ def test_process_lessons_business_exception(monkeypatch, dummy_olympos):
 
     logs = []
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         logs.append(msg)
 
     def fake_save(lessons_arg):
@@ -398,7 +341,7 @@ def test_process_lessons_business_exception_not_found(monkeypatch, dummy_olympos
 
     logs = []
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         logs.append(msg)
 
     def fake_save(lessons_arg):
@@ -426,7 +369,7 @@ def test_process_lessons_business_exception_other(monkeypatch, dummy_olympos):
 
     logs = []
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         logs.append(msg)
 
     def fake_save(lessons_arg):
@@ -453,7 +396,7 @@ def test_process_lessons_keyboardinterrupt(monkeypatch, dummy_olympos):
 
     monkeypatch.setattr("tasks.perform_oplossing", fake_perform_oplossing)
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         pass
 
     def fake_save(lessons_arg):
@@ -491,7 +434,7 @@ def test_process_lessons_exception_and_retry(monkeypatch, dummy_olympos):
 
     logs = []
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         logs.append((lesson["name"], msg))
 
     def fake_save(lessons_arg):
@@ -522,7 +465,7 @@ def test_process_lessons_stops_after_max_retries(monkeypatch, dummy_olympos):
 
     logs = []
 
-    def fake_log(lesson, msg):
+    def fake_log(lesson, msg, outcome=None):
         logs.append(msg)
 
     def fake_save(lessons_arg):
@@ -546,3 +489,236 @@ def test_process_lessons_stops_after_max_retries(monkeypatch, dummy_olympos):
         log=DummyLog(),  # type: ignore
     )
     assert "The unprocessed items are:" in warnings["warned"]
+
+
+@pytest.mark.parametrize(
+    ("exception", "expected_msg", "expected_code"),
+    [
+        (BusinessException(code="LESSON_FULL", message="Yoga op 10:00 is vol."), "Already full", "ALREADY_FULL"),
+        (BusinessException(code="COURSE_NOT_FOUND", message="Cursus Yoga op ma niet gevonden."), "Not found", "NOT_FOUND"),
+        (BusinessException(code="ROBOT_DETECTED", message="Robot detected."), "BusinessException: ", "BUSINESS_EXCEPTION"),
+        (TimeoutError("Timeout 500ms exceeded"), "Exception: ", "TIMEOUT"),
+    ],
+)
+def test_process_lessons_logs_outcome(monkeypatch, dummy_olympos, exception, expected_msg, expected_code):
+    lessons = [{"name": "Yoga", "lesson_type": "GROUPLESSON", "time": "10:00"}]
+
+    def fake_perform_oplossing(olympos, lesson):
+        raise exception
+
+    monkeypatch.setattr("tasks.perform_oplossing", fake_perform_oplossing)
+
+    logs = []
+
+    def fake_log(lesson, msg, outcome=None):
+        logs.append((msg, outcome))
+
+    process_lessons(
+        dummy_olympos,
+        lessons,
+        attempt=0,
+        registered_lessons=[],
+        save_func=lambda lessons_arg: None,
+        log_attempt_func=fake_log,
+        max_retries=0,
+    )
+    msg, outcome = logs[0]
+    assert msg.startswith(expected_msg)
+    assert outcome.code == expected_code
+    assert outcome.error_class == type(exception).__name__
+    assert outcome.duration >= 0
+
+
+def test_process_lessons_fills_negative_cache(monkeypatch, dummy_olympos, tmp_path):
+    full = {"name": "Yoga", "lesson_type": "GROUPLESSON", "time": "10:00", "datetime": "2025-06-16T10:00:00"}
+    ok = {"name": "Pilates", "lesson_type": "GROUPLESSON", "time": "11:00", "datetime": "2025-06-16T11:00:00"}
+
+    def fake_perform_oplossing(olympos, lesson):
+        if lesson is full:
+            raise BusinessException(code="LESSON_FULL", message="Yoga op 10:00 is vol.")
+
+    monkeypatch.setattr("tasks.perform_oplossing", fake_perform_oplossing)
+    negative_cache = NegativeCache(tmp_path / "cache.json")
+    negative_cache.add(ok, Outcome(ResultCode.NOT_FOUND))
+
+    process_lessons(
+        dummy_olympos,
+        [full, ok],
+        attempt=0,
+        registered_lessons=[],
+        save_func=lambda lessons_arg: None,
+        log_attempt_func=lambda *args: None,
+        max_retries=0,
+        negative_cache=negative_cache,
+    )
+    assert negative_cache.lookup(full) == ResultCode.ALREADY_FULL
+    assert negative_cache.lookup(ok) is None
+
+    logs = []
+    assert skip_cached_lessons([full, ok], negative_cache, log_attempt_func=lambda lesson, msg, outcome: logs.append((msg, outcome))) == [ok]
+    assert logs == [("Skipped, recently already full", Outcome(ResultCode.SKIPPED, error_code="NEGATIVE_CACHE"))]
+
+
+def test_skipped_lessons_are_not_counted_as_site_outcomes(monkeypatch, tmp_path):
+    metrics = Metrics(tmp_path / "metrics.json")
+    monkeypatch.setattr("log_attempt.get_metrics", lambda: metrics)
+    full = {"name": "Yoga", "lesson_type": "GROUPLESSON", "time": "10:00", "datetime": "2025-06-16T10:00:00"}
+    negative_cache = NegativeCache(tmp_path / "negative_cache.json")
+    negative_cache.add(full, Outcome(ResultCode.ALREADY_FULL))
+
+    attempt_log = tmp_path / "robot_attempts.jsonl"
+    skip_cached_lessons([full], negative_cache, log_attempt_func=lambda lesson, result, outcome: log_attempt(lesson, result, outcome, attempt_log))
+
+    rendered = metrics.render()
+    assert 'olympos_robot_attempts_total{code="SKIPPED"} 1' in rendered
+    assert 'code="ALREADY_FULL"' not in rendered
+    assert get_result_class(ResultCode.SKIPPED) == "result-Skipped"
+
+
+def test_process_lessons_stops_when_run_budget_is_exhausted(monkeypatch, dummy_olympos):
+    clock = [0.0]
+    budget = RunBudget(total_seconds=SHUTDOWN_RESERVE_SECONDS + 10, started_at=0.0, clock=lambda: clock[0])
+    processed = []
+
+    def fake_perform_oplossing(olympos, lesson):
+        processed.append(lesson["name"])
+        clock[0] += 6
+        raise TimeoutError("Timeout exceeded")
+
+    monkeypatch.setattr("tasks.perform_oplossing", fake_perform_oplossing)
+    saved = []
+    process_lessons(
+        dummy_olympos,
+        [{"name": "Yoga"}, {"name": "Pilates"}, {"name": "Spinning"}],
+        attempt=0,
+        registered_lessons=[],
+        save_func=saved.append,
+        log_attempt_func=lambda *args: None,
+        max_retries=3,
+        budget=budget,
+    )
+    # Two lessons fit in the budget, the retries and the third lesson do not, but registrations are still saved
+    assert processed == ["Yoga", "Pilates"]
+    assert saved
+
+
+def test_load_run_state_takes_over_separate_state_files(tmp_path, monkeypatch, sample_lessons):
+    registrations_db = tmp_path / "registered_lessons.json"
+    registrations_db.write_text(json.dumps(sample_lessons))
+    last_scrape_file = tmp_path / "last_scrape.txt"
+    last_scrape_file.write_text("2025-06-15\n")
+    today = datetime.now()
+    attempts_file = tmp_path / "robot_attempts.jsonl"
+    attempts = [
+        {"timestamp": today.isoformat(), "outcome": {"code": "EXCEPTION"}},
+        {"timestamp": today.isoformat(), "outcome": {"code": "ALREADY_FULL"}},
+        {"timestamp": (today - timedelta(days=1)).isoformat(), "outcome": {"code": "TIMEOUT"}},
+    ]
+    attempts_file.write_text("\n".join(json.dumps(attempt) for attempt in attempts) + "\nnot json\n")
+    monkeypatch.setattr("tasks.REGISTRATIONS_DB", registrations_db)
+    monkeypatch.setattr("tasks.LAST_SCRAPE_FILE", last_scrape_file)
+    monkeypatch.setattr("tasks.ATTEMPTS_FILE", attempts_file)
+
+    run_state = load_run_state(tmp_path / "run_state.json")
+    assert run_state.registrations == sample_lessons
+    assert run_state.last_scrape == "2025-06-15"
+    assert run_state.failures_on(today.date()) == 1
+    assert count_failures(attempts_file, (today - timedelta(days=1)).date()) == 1
+
+    # Once saved, only the snapshot is read
+    run_state.save(tmp_path / "run_state.json")
+    registrations_db.unlink()
+    assert load_run_state(tmp_path / "run_state.json") == run_state
+
+
+def test_failed_today_too_many_times():
+    today = datetime.now().date()
+    run_state = RunState()
+    for _ in range(2):
+        run_state.count_outcome(Outcome(ResultCode.TIMEOUT), today)
+    run_state.count_outcome(Outcome(ResultCode.ALREADY_FULL), today)
+    assert not failed_today_too_many_times(run_state)
+    run_state.count_outcome(Outcome(ResultCode.EXCEPTION), today)
+    assert failed_today_too_many_times(run_state)
+
+
+def test_unverified_booking_requests_a_scrape(monkeypatch):
+    monkeypatch.setattr("tasks.log_attempt", lambda *_args: None)
+    today = datetime.now().date()
+    run_state = RunState()
+    run_state.mark_scraped(today)
+    log_and_count = counting_log_attempt(run_state)
+    log_and_count({"name": "Yoga"}, "Already full", Outcome(ResultCode.ALREADY_FULL, error_code="LESSON_FULL"))
+    assert not run_state.should_scrape(today)
+    log_and_count({"name": "Yoga"}, "BusinessException", Outcome(ResultCode.UNVERIFIED, error_code="REGISTRATION_UNVERIFIED"))
+    assert run_state.should_scrape(today)
+    # The booking may well have gone through, it does not count towards the daily failure limit
+    assert run_state.failures_on(today) == 0
+
+
+def test_process_lessons_unverified_booking_is_not_retried_and_requests_a_scrape(monkeypatch, dummy_olympos):
+    monkeypatch.setattr("tasks.log_attempt", lambda *_args: None)
+    lessons = [{"name": "Yoga", "lesson_type": "GROUPLESSON", "time": "10:00"}]
+    tries = []
+
+    def unverified(olympos, lesson):
+        tries.append(lesson)
+        raise BusinessException("Booking of Yoga not found on the products page.", code="REGISTRATION_UNVERIFIED")
+
+    monkeypatch.setattr("tasks.perform_oplossing", unverified)
+    today = datetime.now().date()
+    run_state = RunState()
+    run_state.mark_scraped(today)
+    registered = []
+
+    process_lessons(dummy_olympos, lessons, attempt=0, registered_lessons=registered, save_func=lambda _lessons: None, log_attempt_func=counting_log_attempt(run_state))
+
+    assert tries == lessons
+    assert registered == []
+    assert run_state.should_scrape(today)
+    assert run_state.failures_on(today) == 0
+
+
+def test_process_lessons_orders_every_pass(monkeypatch, dummy_olympos):
+    lessons = [{"name": name, "lesson_type": "GROUPLESSON", "time": "10:00"} for name in ("Yoga", "Pilates", "Spinning")]
+    tried = []
+
+    def fake_perform_oplossing(olympos, lesson):
+        tried.append(lesson["name"])
+        if lesson["name"] != "Pilates" and tried.count(lesson["name"]) == 1:
+            raise ApplicationException("fail")
+
+    monkeypatch.setattr("tasks.perform_oplossing", fake_perform_oplossing)
+    passes = []
+
+    def reverse_order(pass_lessons):
+        passes.append([lesson["name"] for lesson in pass_lessons])
+        return pass_lessons[::-1]
+
+    process_lessons(dummy_olympos, lessons, attempt=0, registered_lessons=[], log_attempt_func=lambda *args: None, max_retries=1, order=reverse_order)
+    assert passes == [["Yoga", "Pilates", "Spinning"], ["Spinning", "Yoga"]]
+    assert tried == ["Spinning", "Pilates", "Yoga", "Yoga", "Spinning"]
+
+
+def test_teardown_leaves_output_of_a_run_in_progress_alone(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    already_running = BusinessException(code="ALREADY_RUNNING", message="Another robot run is still in progress.")
+    task = type("Task", (), {"exc_info": (BusinessException, already_running, None), "failed": True})()
+    assert lost_run_lock(task)
+    write_status_file(task)
+    assert not (tmp_path / "output").exists()
+    assert not lost_run_lock(type("Task", (), {"exc_info": None, "failed": False})())
+
+
+def test_wait_for_release_falls_back_to_the_local_clock():
+    release = (datetime.now() + timedelta(minutes=1)).replace(microsecond=0)
+    kept_alive, deadlines = [], []
+
+    def no_date_header():
+        raise KeyError("Date")
+
+    olympos = type("FakeOlympos", (), {"keep_alive": lambda self: kept_alive.append(True)})()
+    wait_for_release(olympos, [{"release_at": release.isoformat()}], offset_func=no_date_header, wait_func=lambda deadline, keep_alive: deadlines.append(deadline))
+
+    assert deadlines == [release.timestamp()]
+    assert kept_alive
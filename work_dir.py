@@ -0,0 +1,6 @@
+import os
+from pathlib import Path
+
+# State the robot keeps between runs: attempts log, run state, caches, latency history and metrics. A HAR replay
+# gets a directory of its own (see setup), so its results do not end up in those of real runs.
+WORK_DIR = Path(os.environ.get("OLYMPOS_WORK_DIR", "work_directory"))